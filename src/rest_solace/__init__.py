@@ -1,6 +1,19 @@
 from .manager import Manager
 from .publisher import MessagingPublisher
-from .consumer import Consumer
+from .consumer import Consumer, ConsumerEvent
+from .router import Router
+from .topic_matcher import TopicMatcher
+from .dedup import DuplicateCache
+from .consumer_logging import ConsumerLogger
+from .asgi import SolaceASGIApp
+from .response import ConsumerResponse
+from .ring_buffer import RingBuffer
+from .capture import CaptureWriter
+from .semp_cache import SempCache
+from .provisioning import Plan
+from .monitor import StatsWatcher
+from .autoscale import QueueAutoscaler
+from .inventory import Inventory
 
 
 
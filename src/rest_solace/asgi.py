@@ -0,0 +1,253 @@
+"""ASGI adapter for consumer callbacks.
+
+Lets the same callback_function(event, kill_function) handlers run under an ASGI server like uvicorn or gunicorn
+(with uvicorn workers), instead of the consumer's own ThreadingHTTPServer. Responses follow the same rules:
+a string, bytes, (status_code, headers, body) tuple or ConsumerResponse returned by the callback is the response, a failing callback gives a 500 status so the broker
+redelivers the message, and unknown paths get a 404 status.
+
+Example (my_consumer.py):
+    app = Consumer().asgi_app(callback_function= handle_message)
+
+    #uvicorn my_consumer:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+from http.client import HTTPMessage
+from threading import Event
+from contextlib import nullcontext
+from typing import Callable
+import asyncio
+import inspect
+import time
+from .consumer import ConsumerEvent, AckMetrics, run_limited, cached_body
+from .response import ConsumerResponse, DEFAULT_RESPONSE_MESSAGE
+from .consumer_logging import ConsumerLogger
+from .dedup import DuplicateCache
+from .router import Router
+
+
+SOLACE_DELIVERY_MODE_HEADER = (b"solace-delivery-mode", b"direct")
+
+_DISCONNECTED = object() #returned by _read_body() when the client disconnects before the end of the body
+
+
+class SolaceASGIApp:
+    """ASGI application calling consumer callbacks for POST requests (acknowledgement after the callback, like ack_mode "after")."""
+
+    def __init__(self, callback_function:Callable|None= None, router:Router|None= None,
+                 log:bool|ConsumerLogger= False, auto_stop:bool= False,
+                 max_body_size:int|None= None, duplicate_cache:DuplicateCache|None= None,
+                 on_kill:Callable|None= None):
+        """
+        Args:
+            callback_function (Callable | None, optional): Called as callback_function(event, kill_function) for paths without a route.
+                                                           Synchronous callbacks run in a thread pool, async ones on the event loop.
+                                                           Defaults to None.
+            router (Router | None, optional): Routes with their own handlers. Defaults to None.
+            log (bool | ConsumerLogger, optional): Log requests, rejections and callback errors. Defaults to False.
+            auto_stop (bool, optional): Call kill_function after the first message. Defaults to False.
+            max_body_size (int | None, optional): Bigger request bodies get a 413 response. Defaults to None (unlimited).
+            duplicate_cache (DuplicateCache | None, optional): Answer redeliveries of handled messages from the cache. Defaults to None.
+            on_kill (Callable | None, optional): Called with the return value when a callback calls kill_function.
+                                                 The ASGI server owns the process, so stopping it is left to this function.
+                                                 The value is also kept in 'result' and 'killed' is set. Defaults to None.
+        """
+        if callback_function is None and (router is None or not len(router)):
+            raise ValueError("A callback_function or a router with at least one route is required.")
+
+        self.callback_function= callback_function
+        self.router= router if router is not None and len(router) else None
+        self.auto_stop= auto_stop
+        self.max_body_size= max_body_size
+        self.duplicate_cache= duplicate_cache
+        self.on_kill= on_kill
+
+        if log is True:
+            log= ConsumerLogger()
+        self.log= log or None
+        self._log_started= False
+
+        self.ack_metrics= AckMetrics("after")
+        self.killed= Event()
+        self.result= None
+
+        if self.router is not None:
+            self.router.compile()
+
+    def kill_function(self, return_value= None)->None:
+        self.result= return_value
+        self.killed.set()
+        if self.on_kill is not None:
+            self.on_kill(return_value)
+
+    async def __call__(self, scope:dict, receive:Callable, send:Callable)->None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] != "http":
+            return
+
+        if self.log and not self._log_started:
+            self._start_log()
+
+        if scope["method"] != "POST":
+            await self._reply(send, 405, "Only POST requests are handled.")
+            return
+
+        await self._handle_post(scope, receive, send)
+
+    async def _lifespan(self, receive:Callable, send:Callable)->None:
+        while True:
+            message= await receive()
+            if message["type"] == "lifespan.startup":
+                if self.log:
+                    self._start_log()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.log and self._log_started:
+                    self.log.stop()
+                    self._log_started= False
+                if self.duplicate_cache is not None:
+                    self.duplicate_cache.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _start_log(self)->None:
+        self._log_started= True
+        self.log.start()
+
+    async def _handle_post(self, scope:dict, receive:Callable, send:Callable)->None:
+        path= (scope.get("raw_path") or scope["path"].encode("utf-8")).decode("latin-1") #servers may send raw_path None
+        if scope.get("query_string"):
+            path= f"{path}?{scope['query_string'].decode('latin-1')}"
+
+        received_at= time.perf_counter()
+        self.ack_metrics.add(received= 1)
+
+        content= await self._read_body(receive)
+        if content is None:
+            await self._reject(send, path, received_at, 413, f"Request body is larger than the maximum of {self.max_body_size} bytes.")
+            return
+        if content is _DISCONNECTED: #the body is incomplete and nobody is left to answer
+            self.ack_metrics.add(dropped= 1)
+            return
+
+        raw_headers= HTTPMessage() #case insensitive lookups, same as in the threaded server
+        for name, value in scope["headers"]:
+            raw_headers[name.decode("latin-1")]= value.decode("latin-1")
+
+        if self.log:
+            self.log.message_received(path, raw_headers, content)
+
+        event= ConsumerEvent(path, raw_headers, content)
+
+        handler, limiter= self._resolve(event)
+        if handler is None:
+            await self._reject(send, path, received_at, 404, f"No route for path '{path}'.")
+            return
+
+        duplicate_key= None
+        if self.duplicate_cache is not None:
+            duplicate_key= self.duplicate_cache.key_for(event)
+            if duplicate_key is not None:
+                duplicate, cached_response= self.duplicate_cache.lookup(duplicate_key)
+                if duplicate:
+                    self.ack_metrics.add(acked= 1, duplicates= 1, ack_seconds= time.perf_counter() - received_at)
+                    await self._reply(send, 200, cached_response if cached_response is not None else DEFAULT_RESPONSE_MESSAGE)
+                    return
+
+        output, error= await self._run(handler, limiter, event)
+
+        if error is not None:
+            response= ConsumerResponse("Callback function failed to process the message.", status_code= 500)
+        else:
+            response= ConsumerResponse.from_output(output) or ConsumerResponse()
+
+        if response.status_code < 300:
+            if duplicate_key is not None:
+                self.duplicate_cache.record(duplicate_key, cached_body(response))
+            self.ack_metrics.add(acked= 1, ack_seconds= time.perf_counter() - received_at)
+        else:
+            self.ack_metrics.add(nacked= 1, ack_seconds= time.perf_counter() - received_at)
+
+        await self._send_response(send, response)
+
+        if self.auto_stop:
+            self.kill_function(event.to_dict())
+
+    def _resolve(self, event:ConsumerEvent)->tuple:
+        if self.router is not None:
+            route, path_params= self.router.resolve(event.path)
+            if route is not None:
+                if path_params:
+                    event.path_params= path_params
+                return route.handler, route.limiter
+
+        if self.callback_function is None:
+            return None, None
+
+        return self.callback_function, nullcontext()
+
+    async def _run(self, handler:Callable, limiter, event:ConsumerEvent)->tuple:
+        """Run a handler. Coroutine functions run on the event loop, everything else in the default thread pool."""
+        if not inspect.iscoroutinefunction(handler):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, run_limited, handler, limiter, event, self.kill_function, self.log, self.ack_metrics)
+
+        if not isinstance(limiter, nullcontext):
+            await asyncio.get_running_loop().run_in_executor(None, limiter.acquire)
+        try:
+            output= await handler(event= event, kill_function= self.kill_function)
+            self.ack_metrics.add(processed= 1)
+            return output, None
+        except Exception as e:
+            self.ack_metrics.add(processed= 1, callback_errors= 1)
+            if self.log:
+                self.log.callback_error(e, path= event.path)
+            return None, e
+        finally:
+            if not isinstance(limiter, nullcontext):
+                limiter.release()
+
+    async def _read_body(self, receive:Callable):
+        """Read the whole request body. Returns None if it is bigger than max_body_size,
+        _DISCONNECTED if the client went away before sending all of it."""
+        chunks= list()
+        size= 0
+        while True:
+            message= await receive()
+            if message["type"] == "http.disconnect":
+                return _DISCONNECTED
+            chunk= message.get("body", b"")
+            size += len(chunk)
+            if self.max_body_size is not None and size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    async def _reject(self, send:Callable, path:str, received_at:float, status_code:int, response_message:str)->None:
+        self.ack_metrics.add(nacked= 1, ack_seconds= time.perf_counter() - received_at)
+        if self.log:
+            self.log.rejected(path, status_code, response_message)
+        await self._reply(send, status_code, response_message)
+
+    @classmethod
+    async def _reply(cls, send:Callable, status_code:int, response_message:str|bytes)->None:
+        await cls._send_response(send, ConsumerResponse(response_message, status_code= status_code))
+
+    @staticmethod
+    async def _send_response(send:Callable, response:ConsumerResponse)->None:
+        body= response.encoded_body()
+        if not isinstance(body, bytes): #ASGI servers expect a bytes body
+            body= bytes(body)
+
+        headers= [(b"content-type", response.get_content_type().encode("latin-1")),
+                  (b"content-length", str(len(body)).encode("latin-1"))]
+        extra_headers= response.extra_headers()
+        if not any(name.lower() == "solace-delivery-mode" for name, _ in extra_headers):
+            headers.append(SOLACE_DELIVERY_MODE_HEADER)
+        headers.extend((name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in extra_headers)
+
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
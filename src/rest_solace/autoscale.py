@@ -0,0 +1,229 @@
+"""Scaling of consumer capacity from the backlog of a queue.
+
+QueueAutoscaler polls the monitor data of a queue through a Manager and changes the number of
+Consumer workers, and optionally the outgoing connection count of the REST consumer, between bounds:
+
+    * Scale up by scale_up_step when the backlog is at least scale_up_depth and it is not draining fast enough
+      (it grew since the previous poll, or emptying it at the current egress rate would take more than max_drain_seconds).
+    * Scale down by scale_down_step when the backlog is at most scale_down_depth.
+    * Between the two thresholds nothing changes (hysteresis).
+    * After a change there is no scale up for scale_up_cooldown seconds and no scale down for scale_down_cooldown seconds.
+
+In ack_mode "after" the consumer handles one delivery per open connection, so the RDP connection count is what
+sets its capacity. In ack_mode "immediate" the work queue workers do (see Consumer.scale_workers()).
+"""
+from threading import Event, Thread
+from typing import Callable
+import math
+import time
+
+
+class ScalingDecision:
+    """Outcome of one autoscaler poll."""
+
+    __slots__ = ("timestamp", "depth", "depth_delta", "egress_rate", "workers_before", "workers", "reason")
+
+    def __init__(self, timestamp:float, depth:float, depth_delta:float, egress_rate:float,
+                 workers_before:int, workers:int, reason:str):
+        self.timestamp= timestamp        #time.time() of the poll
+        self.depth= depth
+        self.depth_delta= depth_delta    #change of depth since the previous poll
+        self.egress_rate= egress_rate
+        self.workers_before= workers_before
+        self.workers= workers
+        self.reason= reason              #"scale_up", "scale_down", "in_band", "draining", "cooldown", "at_max", "at_min" or "queue_not_found"
+
+    def __repr__(self):
+        return (f"ScalingDecision(reason={self.reason!r}, depth={self.depth}, egress_rate={self.egress_rate}, "
+                f"workers={self.workers_before}->{self.workers})")
+
+
+class QueueAutoscaler:
+    """Scales consumer workers (and optionally RDP connections) from the depth and egress rate of a queue."""
+
+    def __init__(self, manager, queueName:str, msgVpnName:str= "default",
+                 consumer= None, scale_function:Callable|None= None,
+                 min_workers:int= 1, max_workers:int= 16, initial_workers:int|None= None,
+                 scale_up_depth:float= 10*1024*1024, scale_down_depth:float= 1024*1024,
+                 scale_up_step:int= 1, scale_down_step:int= 1,
+                 scale_up_cooldown:float= 15, scale_down_cooldown:float= 60,
+                 max_drain_seconds:float= 30, interval:float= 5,
+                 depth_field:str= "msgSpoolUsage", egress_field:str= "txByteRate",
+                 restDeliveryPointName:str|None= None, restConsumerName:str|None= None,
+                 connections_per_worker:int= 1, max_connections:int|None= None):
+        """
+        Args:
+            manager (Manager): Manager of the broker.
+            queueName (str): Queue whose backlog drives the scaling.
+            msgVpnName (str, optional): Message VPN of the queue. Defaults to "default".
+            consumer (Consumer | None, optional): Consumer whose work queue workers are scaled (ack_mode "immediate"). Defaults to None.
+            scale_function (Callable | None, optional): Called as scale_function(workers) on each change, to scale something else. Defaults to None.
+            min_workers (int, optional): Lower bound. Defaults to 1.
+            max_workers (int, optional): Upper bound. Defaults to 16.
+            initial_workers (int | None, optional): Starting count when no running consumer reports one. Defaults to min_workers.
+            scale_up_depth (float, optional): Backlog at or above which capacity is added. Defaults to 10 MiB (of msgSpoolUsage).
+            scale_down_depth (float, optional): Backlog at or below which capacity is removed. Defaults to 1 MiB.
+            scale_up_step (int, optional): Workers added per scale up. Defaults to 1.
+            scale_down_step (int, optional): Workers removed per scale down. Defaults to 1.
+            scale_up_cooldown (float, optional): Seconds after a change before the next scale up. Defaults to 15.
+            scale_down_cooldown (float, optional): Seconds after a change before the next scale down. Defaults to 60.
+            max_drain_seconds (float, optional): A backlog that the current egress rate empties within this many seconds
+                                                 is left alone even above scale_up_depth. Defaults to 30.
+            interval (float, optional): Seconds between polls when running in the background. Defaults to 5.
+            depth_field (str, optional): Monitor attribute used as the backlog. Defaults to "msgSpoolUsage" (bytes).
+            egress_field (str, optional): Monitor attribute used as the egress rate, in the unit of depth_field per second.
+                                          Defaults to "txByteRate".
+            restDeliveryPointName (str | None, optional): RDP of the REST consumer whose connection count follows the workers. Defaults to None.
+            restConsumerName (str | None, optional): REST consumer whose outgoingConnectionCount is set to
+                                                     workers * connections_per_worker. Defaults to None.
+            connections_per_worker (int, optional): RDP connections per worker. Defaults to 1.
+            max_connections (int | None, optional): Upper bound of the connection count. Defaults to None (no bound).
+
+        Raises:
+            ValueError: If the bounds or thresholds are inconsistent.
+        """
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError("Expected 1 <= min_workers <= max_workers.")
+        if scale_down_depth >= scale_up_depth:
+            raise ValueError("scale_down_depth must be lower than scale_up_depth.")
+        if (restDeliveryPointName is None) != (restConsumerName is None):
+            raise ValueError("Give both restDeliveryPointName and restConsumerName to scale the RDP connections.")
+
+        self.manager= manager
+        self.queueName= queueName
+        self.msgVpnName= msgVpnName
+        self.consumer= consumer
+        self.scale_function= scale_function
+
+        self.min_workers= min_workers
+        self.max_workers= max_workers
+        self.scale_up_depth= scale_up_depth
+        self.scale_down_depth= scale_down_depth
+        self.scale_up_step= scale_up_step
+        self.scale_down_step= scale_down_step
+        self.scale_up_cooldown= scale_up_cooldown
+        self.scale_down_cooldown= scale_down_cooldown
+        self.max_drain_seconds= max_drain_seconds
+        self.interval= interval
+        self.depth_field= depth_field
+        self.egress_field= egress_field
+
+        self.restDeliveryPointName= restDeliveryPointName
+        self.restConsumerName= restConsumerName
+        self.connections_per_worker= connections_per_worker
+        self.max_connections= max_connections
+
+        self.workers= min(max(initial_workers if initial_workers is not None else min_workers, min_workers), max_workers)
+        self.last_decision= None
+        self.last_error= None
+
+        self._last_depth= None
+        self._last_change= -math.inf
+        self._stop= Event()
+        self._thread= None
+
+    def _consumer_scalable(self)->bool:
+        return self.consumer is not None and self.consumer.get_worker_count() > 0
+
+    def current_workers(self)->int:
+        if self._consumer_scalable():
+            return self.consumer.get_worker_count()
+        return self.workers
+
+    def _apply(self, workers:int)->None:
+        """Scale to 'workers'. The broker is updated first, so if it fails nothing has changed yet.
+        'workers' is recorded as soon as the local workers changed, so if scale_function then fails
+        the next poll still starts from the actual count."""
+        if self.restConsumerName is not None:
+            connections= workers*self.connections_per_worker
+            if self.max_connections is not None:
+                connections= min(connections, self.max_connections)
+            self.manager.update_rest_consumer(self.restDeliveryPointName, self.restConsumerName,
+                                              {"outgoingConnectionCount": connections}, msgVpnName= self.msgVpnName)
+        if self._consumer_scalable():
+            self.consumer.scale_workers(workers)
+        self.workers= workers
+        if self.scale_function is not None:
+            self.scale_function(workers)
+
+    def step(self)->ScalingDecision:
+        """Poll the queue once and scale if needed.
+
+        Returns:
+            ScalingDecision: What was observed and done.
+        """
+        stats= self.manager.get_queue_stats(self.queueName, msgVpnName= self.msgVpnName,
+                                            select= f"{self.depth_field},{self.egress_field}")
+        now= time.monotonic()
+        current= self.current_workers()
+
+        if stats is None:
+            self._last_depth= None
+            self.last_decision= ScalingDecision(time.time(), math.nan, 0.0, math.nan, current, current, "queue_not_found")
+            return self.last_decision
+
+        depth= float(stats.get(self.depth_field) or 0)
+        egress_rate= float(stats.get(self.egress_field) or 0)
+        depth_delta= depth - self._last_depth if self._last_depth is not None else 0.0
+        self._last_depth= depth
+
+        target= current
+        since_change= now - self._last_change
+
+        if depth >= self.scale_up_depth:
+            draining= depth_delta <= 0 and egress_rate > 0 and depth/egress_rate <= self.max_drain_seconds
+            if draining:
+                reason= "draining"
+            elif current >= self.max_workers:
+                reason= "at_max"
+            elif since_change < self.scale_up_cooldown:
+                reason= "cooldown"
+            else:
+                target, reason= min(self.max_workers, current + self.scale_up_step), "scale_up"
+
+        elif depth <= self.scale_down_depth:
+            if current <= self.min_workers:
+                reason= "at_min"
+            elif since_change < self.scale_down_cooldown:
+                reason= "cooldown"
+            else:
+                target, reason= max(self.min_workers, current - self.scale_down_step), "scale_down"
+
+        else:
+            reason= "in_band"
+
+        if target != current:
+            try:
+                self._apply(target)
+            finally:
+                if self.workers == target: #applied, even if scale_function failed afterwards
+                    self._last_change= now
+
+        self.last_decision= ScalingDecision(time.time(), depth, depth_delta, egress_rate, current, target, reason)
+        return self.last_decision
+
+    def run(self, polls:int|None= None)->None:
+        """Poll every 'interval' seconds until stop() is called (or 'polls' polls were made).
+        Errors (broker unreachable...) are kept in last_error and the next poll is attempted as usual."""
+        count= 0
+        while not self._stop.is_set() and (polls is None or count < polls):
+            try:
+                self.step()
+                self.last_error= None
+            except Exception as e:
+                self.last_error= e
+            count += 1
+            self._stop.wait(self.interval)
+        self._stop.clear() #so it can be run again
+
+    def start(self)->None:
+        """Run in a background thread."""
+        self._stop.clear()
+        self._thread= Thread(target= self.run, daemon= True)
+        self._thread.start()
+
+    def stop(self)->None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread= None
@@ -0,0 +1,137 @@
+"""Micro-batching of consumer deliveries.
+
+Deliveries are collected until either 'max_batch_size' events are waiting or 'max_batch_latency_ms' has passed
+since the first event of the batch arrived. Then a single batch_callback(events, kill_function) call handles all of them.
+"""
+from queue import Queue, Empty
+from threading import Thread, Event
+from typing import Callable
+import time
+from .response import DEFAULT_RESPONSE_MESSAGE, is_response
+
+
+class BatchTicket:
+    """Handed out for each submitted event. Lets the request thread wait until the event's batch was handled."""
+
+    __slots__ = ("event", "done", "status_code", "response_message")
+
+    def __init__(self, event):
+        self.event= event
+        self.done= Event()
+        self.status_code= 200
+        self.response_message= DEFAULT_RESPONSE_MESSAGE #or any other response a callback can return
+
+    def wait(self, timeout:float|None= None)->bool:
+        return self.done.wait(timeout)
+
+
+class MicroBatcher:
+
+    def __init__(self, batch_callback:Callable, kill_function:Callable,
+                 max_batch_size:int= 100, max_batch_latency_ms:float= 50,
+                 log= None, auto_stop:bool= False, metrics= None, max_queue_size:int= 10000):
+        """
+        Args:
+            batch_callback (Callable): Called as batch_callback(events= [...], kill_function= kill_function).
+                                       It may return a list with one response per event (in the same order, any
+                                       response a callback_function can return, like a str or bytes);
+                                       any other return value gives every event the default response.
+                                       If it raises an exception every event in the batch gets a 500 response.
+            kill_function (Callable): Function that stops the consumer server.
+            max_batch_size (int, optional): Maximum number of events in a batch. Defaults to 100.
+            max_batch_latency_ms (float, optional): Maximum time (in milliseconds) the first event of a batch waits
+                                                    for the batch to fill up. Defaults to 50.
+            log (ConsumerLogger, optional): Logs errors raised by the batch callback. Defaults to None.
+            auto_stop (bool, optional): Stop the consumer after the first batch. Defaults to False.
+            metrics (AckMetrics, optional): Acknowledgement metrics of the consumer. Defaults to None.
+            max_queue_size (int, optional): Maximum number of events waiting for a batch. Once full, submit() waits
+                                            for space. Defaults to 10000.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+
+        self.batch_callback= batch_callback
+        self.kill_function= kill_function
+        self.max_batch_size= max_batch_size
+        self.max_batch_latency= max_batch_latency_ms/1000
+        self.log= log
+        self.auto_stop= auto_stop
+        self.metrics= metrics
+
+        self._queue= Queue(maxsize= max_queue_size)
+        self._thread= None
+
+    def start(self)->None:
+        self._thread= Thread(target= self._run, daemon= True)
+        self._thread.start()
+
+    def stop(self)->None:
+        """Handle the events that are still waiting, then stop the batching thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread= None
+
+    def submit(self, event)->BatchTicket:
+        """Queue an event for the next batch, waiting while max_queue_size events are already queued."""
+        ticket= BatchTicket(event)
+        self._queue.put(ticket)
+        return ticket
+
+    def _run(self)->None:
+        stopping= False
+
+        while not stopping:
+            ticket= self._queue.get()
+            if ticket is None:
+                break
+
+            batch= [ticket]
+            deadline= time.monotonic() + self.max_batch_latency
+
+            while len(batch) < self.max_batch_size:
+                remaining= deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    ticket= self._queue.get(timeout= remaining)
+                except Empty:
+                    break
+                if ticket is None:
+                    stopping= True
+                    break
+                batch.append(ticket)
+
+            self._flush(batch)
+
+    def _flush(self, batch:list)->None:
+        events= [ticket.event for ticket in batch]
+        started_at= time.perf_counter()
+        error= None
+
+        try:
+            output= self.batch_callback(events= events, kill_function= self.kill_function)
+
+            if isinstance(output, (list, tuple)) and len(output) == len(batch):
+                for ticket, response in zip(batch, output):
+                    if is_response(response):
+                        ticket.response_message= response
+
+        except Exception as e:
+            error= e
+            if self.log:
+                self.log.callback_error(e, batch_size= len(batch))
+            for ticket in batch:
+                ticket.status_code= 500
+                ticket.response_message= "Batch callback function failed to process the message."
+
+        if self.metrics is not None:
+            self.metrics.add(processed= len(batch), batches= 1,
+                             callback_errors= len(batch) if error is not None else 0,
+                             callback_seconds= time.perf_counter() - started_at)
+
+        for ticket in batch:
+            ticket.done.set()
+
+        if self.auto_stop:
+            self.kill_function(events[0].to_dict())
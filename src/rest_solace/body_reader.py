@@ -0,0 +1,150 @@
+"""Streaming reader for request bodies received by the consumer server.
+"""
+import io
+import asyncio
+from .exceptions import BodyTooLargeError
+
+
+class BodyReader(io.RawIOBase):
+    """File like object that reads a request body straight from the socket.
+
+    Supports bodies with a Content-Length, chunked transfer encoding, and bodies with neither (treated as empty).
+    Reading more than 'max_body_size' bytes raises BodyTooLargeError.
+    """
+
+    def __init__(self, rfile, content_length:int|None= None, chunked:bool= False,
+                 max_body_size:int|None= None):
+        """
+        Args:
+            rfile: Buffered binary file object of the connection.
+            content_length (int | None, optional): Value of the Content-Length header. Defaults to None.
+            chunked (bool, optional): Body uses chunked transfer encoding. Defaults to False.
+            max_body_size (int | None, optional): Maximum number of body bytes allowed. Defaults to None (unlimited).
+
+        Raises:
+            BodyTooLargeError: Content-Length is bigger than max_body_size.
+        """
+        super().__init__()
+        self.rfile= rfile
+        self.chunked= chunked
+        self.max_body_size= max_body_size
+        self.bytes_read= 0
+
+        if not chunked and max_body_size is not None and content_length is not None and content_length > max_body_size:
+            raise BodyTooLargeError(f"Content-Length {content_length} is bigger than the maximum body size of {max_body_size} bytes.")
+
+        self._remaining= content_length if (content_length is not None and not chunked) else 0 #bytes left (in the body or current chunk)
+        self._eof= (not chunked and not content_length)
+
+    def readable(self)->bool:
+        return True
+
+    def readinto(self, buffer)->int:
+        if self._eof or len(buffer) == 0:
+            return 0
+
+        if self.chunked and self._remaining == 0:
+            self._remaining= self._read_chunk_size()
+            if self._remaining == 0:
+                self._eof= True
+                return 0
+
+        view= memoryview(buffer).cast("B")
+        to_read= min(len(view), self._remaining)
+        n= self.rfile.readinto(view[:to_read])
+
+        if n == 0:
+            raise ConnectionError("Connection closed before the whole request body was received.")
+
+        self._remaining -= n
+        self.bytes_read += n
+
+        if self.max_body_size is not None and self.bytes_read > self.max_body_size:
+            raise BodyTooLargeError(f"Request body is bigger than the maximum body size of {self.max_body_size} bytes.")
+
+        if self._remaining == 0:
+            if self.chunked:
+                self.rfile.readline(65537) #CRLF at the end of each chunk
+            else:
+                self._eof= True
+
+        return n
+
+    def readall(self)->bytes:
+        """Read the rest of the body. A body with a Content-Length is read with a single read of the connection."""
+        if self.chunked:
+            return super().readall()
+
+        if self._eof:
+            return b""
+
+        data= self.rfile.read(self._remaining)
+        if len(data) < self._remaining:
+            raise ConnectionError("Connection closed before the whole request body was received.")
+
+        self.bytes_read += len(data)
+        self._remaining= 0
+        self._eof= True
+        return data
+
+    def _read_chunk_size(self)->int:
+        line= self.rfile.readline(65537)
+        if not line:
+            raise ConnectionError("Connection closed before the whole request body was received.")
+
+        size= int(line.split(b";", 1)[0].strip(), 16) #ignores chunk extensions
+
+        if size == 0:
+            #skip trailer headers until the empty line
+            while True:
+                trailer= self.rfile.readline(65537)
+                if trailer in (b"\r\n", b"\n", b""):
+                    break
+
+        return size
+
+    def iter_chunks(self, chunk_size:int= 65536):
+        """Yields the body in pieces of up to chunk_size bytes."""
+        while True:
+            data= self.read(chunk_size)
+            if not data:
+                break
+            yield data
+
+    def copy_to(self, file_obj, chunk_size:int= 65536)->int:
+        """Write the remaining body to a binary file object using a single reusable buffer.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        buffer= bytearray(chunk_size)
+        view= memoryview(buffer)
+        written= 0
+
+        while True:
+            n= self.readinto(buffer)
+            if not n:
+                break
+            file_obj.write(view[:n])
+            written += n
+
+        return written
+
+    def drain(self)->None:
+        """Read and discard whatever is left of the body."""
+        buffer= bytearray(65536)
+        while self.readinto(buffer):
+            pass
+
+    #async versions (the socket reads run in the default executor so the event loop is not blocked)
+
+    async def aread(self, size:int= -1)->bytes:
+        loop= asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.read, size)
+
+    async def aiter_chunks(self, chunk_size:int= 65536):
+        while True:
+            data= await self.aread(chunk_size)
+            if not data:
+                break
+            yield data
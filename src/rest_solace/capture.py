@@ -0,0 +1,291 @@
+"""Capture of consumer deliveries and their replay through a MessagingPublisher.
+
+A capture is a directory holding:
+    * segment-NNNNNN.dat files: records appended one after the other. A new segment is started once
+      the current one reaches 'segment_size' bytes.
+    * index.dat: one fixed size entry per record (timestamp, segment number, offset and length of the record).
+
+Readers memory-map the index and the segments, so captures much bigger than the available RAM can be replayed.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, BoundedSemaphore
+from typing import Callable, Iterator
+import json
+import mmap
+import os
+import struct
+import time
+
+
+INDEX_ENTRY = struct.Struct("<dIQI")   #timestamp, segment number, offset in segment, record length
+
+RECORD_HEADER = struct.Struct("<HII")  #path length, headers length, body length
+
+SEGMENT_NAME = "segment-{:06d}.dat"
+
+INDEX_NAME = "index.dat"
+
+INDEX_BATCH_SIZE = 256 * INDEX_ENTRY.size  #index entries are kept back until this many bytes are waiting
+
+#headers sent again when replaying a message, along with every Solace-User-Property-* header
+REPLAYED_HEADERS = ("Content-Type", "Content-Encoding", "Solace-Delivery-Mode", "Solace-Correlation-ID",
+                    "Solace-Time-To-Live-In-ms", "Solace-DMQ-Eligible")
+
+
+class CapturedMessage:
+    __slots__ = ("timestamp", "path", "headers", "body")
+
+    def __init__(self, timestamp:float, path:str, headers:dict, body:memoryview):
+        self.timestamp= timestamp  #time.time() when the delivery was received
+        self.path= path
+        self.headers= headers
+        self.body= body            #read only view into the memory-mapped segment
+
+    def __repr__(self):
+        return f"CapturedMessage(timestamp={self.timestamp}, path={self.path!r}, length={len(self.body)})"
+
+    def get_header(self, name:str, default= None)->str|None:
+        """Case insensitive header lookup."""
+        name= name.lower()
+        for header_name, value in self.headers.items():
+            if header_name.lower() == name:
+                return value
+        return default
+
+
+class CaptureWriter:
+    """Appends deliveries to a capture directory. Pass it as 'capture' to Consumer.startConsumer()."""
+
+    def __init__(self, directory:str, segment_size:int= 256*1024*1024):
+        """
+        Args:
+            directory (str): Capture directory. Created if needed, an existing capture is appended to.
+            segment_size (int, optional): Size in bytes after which a new segment file is started. Defaults to 256 MiB.
+        """
+        self.directory= directory
+        self.segment_size= segment_size
+        self._lock= Lock()
+
+        os.makedirs(directory, exist_ok= True)
+
+        segments= sorted(name for name in os.listdir(directory) if name.startswith("segment-"))
+        self._segment_number= int(segments[-1][8:14]) if segments else 0
+        self._segment= open(os.path.join(directory, SEGMENT_NAME.format(self._segment_number)), "ab")
+        self._offset= self._segment.tell()
+        self._index= open(os.path.join(directory, INDEX_NAME), "ab")
+        self._pending= bytearray() #index entries whose records may still sit in the segment's write buffer
+        self.records= 0
+
+    def write(self, path:str, headers, body:bytes, timestamp:float|None= None)->None:
+        """Append a delivery.
+
+        Args:
+            path (str): Request path.
+            headers (dict | HTTPMessage): Request headers.
+            body (bytes): Request body.
+            timestamp (float | None, optional): time.time() of the delivery. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp= time.time()
+
+        path_bytes= path.encode("utf-8")
+        headers_bytes= json.dumps(dict(headers.items())).encode("utf-8")
+        length= RECORD_HEADER.size + len(path_bytes) + len(headers_bytes) + len(body)
+
+        with self._lock:
+            if self._offset and self._offset + length > self.segment_size:
+                self._next_segment()
+
+            self._segment.write(RECORD_HEADER.pack(len(path_bytes), len(headers_bytes), len(body)))
+            self._segment.write(path_bytes)
+            self._segment.write(headers_bytes)
+            self._segment.write(body)
+            self._pending += INDEX_ENTRY.pack(timestamp, self._segment_number, self._offset, length)
+            if len(self._pending) >= INDEX_BATCH_SIZE:
+                self._write_index()
+
+            self._offset += length
+            self.records += 1
+
+    def write_event(self, event)->None:
+        """Append a ConsumerEvent."""
+        self.write(event.path, event._raw_headers, event.content)
+
+    def _write_index(self)->None:
+        #the segment is flushed first, so readers never see an index entry whose record is not in the file yet
+        self._segment.flush()
+        self._index.write(self._pending)
+        self._index.flush()
+        self._pending.clear()
+
+    def _next_segment(self)->None:
+        self._write_index()
+        self._segment.close()
+        self._segment_number += 1
+        self._segment= open(os.path.join(self.directory, SEGMENT_NAME.format(self._segment_number)), "ab")
+        self._offset= 0
+
+    def flush(self)->None:
+        """Write the buffered records and their index entries, making them visible to new readers."""
+        with self._lock:
+            self._write_index()
+
+    def close(self)->None:
+        with self._lock:
+            if self._index.closed:
+                return
+            self._write_index()
+            self._segment.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CaptureReader:
+    """Random access to the records of a capture directory, through memory-mapped files."""
+
+    def __init__(self, directory:str):
+        self.directory= directory
+        self._segments= dict() #segment number -> mmap
+
+        self._index_file= open(os.path.join(directory, INDEX_NAME), "rb")
+        index_size= os.fstat(self._index_file.fileno()).st_size
+        self._count= index_size // INDEX_ENTRY.size
+        self._index= mmap.mmap(self._index_file.fileno(), 0, access= mmap.ACCESS_READ) if self._count else None
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position:int)->CapturedMessage:
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("capture record out of range")
+
+        timestamp, segment_number, offset, _= INDEX_ENTRY.unpack_from(self._index, position*INDEX_ENTRY.size)
+        segment= self._segment(segment_number)
+
+        path_length, headers_length, body_length= RECORD_HEADER.unpack_from(segment, offset)
+        start= offset + RECORD_HEADER.size
+        path= segment[start:start + path_length].decode("utf-8")
+        start += path_length
+        headers= json.loads(segment[start:start + headers_length])
+        start += headers_length
+
+        return CapturedMessage(timestamp, path, headers, memoryview(segment)[start:start + body_length])
+
+    def __iter__(self)->Iterator:
+        for position in range(self._count):
+            yield self[position]
+
+    def _segment(self, segment_number:int)->mmap.mmap:
+        segment= self._segments.get(segment_number)
+        if segment is None:
+            with open(os.path.join(self.directory, SEGMENT_NAME.format(segment_number)), "rb") as segment_file:
+                segment= mmap.mmap(segment_file.fileno(), 0, access= mmap.ACCESS_READ)
+            self._segments[segment_number]= segment
+        return segment
+
+    def close(self)->None:
+        """Close the memory maps. Bodies of CapturedMessage objects can not be used after this."""
+        for segment in self._segments.values():
+            try:
+                segment.close()
+            except BufferError: #a message body is still referenced, the map is released along with it
+                pass
+        self._segments= dict()
+        if self._index is not None:
+            self._index.close()
+            self._index= None
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def topic_destination(message:CapturedMessage)->str|None:
+    """Default replay destination: the topic the message was published to (Solace-Topic header)."""
+    topic= message.get_header("Solace-Topic")
+    return f"/TOPIC/{topic}" if topic else None
+
+
+def replay_capture(capture:str|CaptureReader, publisher, speed:float|None= 1.0,
+                   destination:str|Callable= topic_destination, workers:int= 1,
+                   timeout:int|None= 120, on_result:Callable|None= None)->dict:
+    """Publish the messages of a capture again, keeping the gaps between them.
+
+    Args:
+        capture (str | CaptureReader): Capture directory or an open CaptureReader.
+        publisher (MessagingPublisher): Publisher used to send the messages (see MessagingPublisher.raw_message()).
+        speed (float | None, optional): 1.0 replays in real time, 10.0 ten times faster, None (or 0) as fast as possible.
+                                        Defaults to 1.0.
+        destination (str | Callable, optional): "/QUEUE/<name>" or "/TOPIC/<topic>" to send everything to one destination,
+                                                or a function returning the destination of a CapturedMessage (None skips it).
+                                                Defaults to the topic the message was originally published to.
+        workers (int, optional): Number of messages published at the same time. Defaults to 1.
+        timeout (int | None, optional): Request timeout of each publish. Defaults to 120.
+        on_result (Callable | None, optional): Called as on_result(message, result) after each publish. Defaults to None.
+
+    Returns:
+        dict: {"sent": ..., "failed": ..., "skipped": ..., "seconds": ...}
+    """
+    reader= CaptureReader(capture) if isinstance(capture, str) else capture
+    destination_function= destination if callable(destination) else (lambda message: destination)
+
+    stats= {"sent": 0, "failed": 0, "skipped": 0}
+    stats_lock= Lock()
+
+    def publish(message:CapturedMessage, target:str):
+        headers= {name: value for name, value in message.headers.items()
+                  if name in REPLAYED_HEADERS or name.startswith("Solace-User-Property-")}
+        headers.setdefault("Solace-Delivery-Mode", "direct")
+        try:
+            result= publisher.raw_message(target, bytes(message.body), headers= headers, timeout= timeout)
+            failed= result.get("timeout") or result.get("status_code", 500) >= 300
+        except Exception as e:
+            result, failed= {"error": e}, True
+        with stats_lock:
+            stats["failed" if failed else "sent"] += 1
+        if on_result is not None:
+            on_result(message, result)
+
+    started_at= time.monotonic()
+    first_timestamp= None
+
+    executor= ThreadPoolExecutor(max_workers= workers) if workers > 1 else None
+    in_flight= BoundedSemaphore(workers*2) #the executor's queue is unbounded, this keeps the reader from running ahead
+    try:
+        for message in reader:
+            target= destination_function(message)
+            if target is None:
+                stats["skipped"] += 1
+                continue
+
+            if speed:
+                if first_timestamp is None:
+                    first_timestamp= message.timestamp
+                delay= started_at + (message.timestamp - first_timestamp)/speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if executor is not None:
+                in_flight.acquire()
+                executor.submit(publish, message, target).add_done_callback(lambda _: in_flight.release())
+            else:
+                publish(message, target)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait= True)
+        message= None #releases the last body view before the reader is closed
+        if isinstance(capture, str):
+            reader.close()
+
+    stats["seconds"]= time.monotonic() - started_at
+    return stats
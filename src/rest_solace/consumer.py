@@ -1,153 +1,1044 @@
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from functools import partial
-from datetime import datetime
 from typing import Callable
-from queue import Queue 
-from threading import Thread 
+from collections.abc import MutableMapping
+from contextlib import nullcontext
+from types import MappingProxyType
+from queue import Queue, Full, Empty
+from threading import Thread, Lock, Event
 import time
+import asyncio
+import inspect
+from .body_reader import BodyReader
+from .exceptions import BodyTooLargeError
+from .router import Router
+from .batching import MicroBatcher
+from .dedup import DuplicateCache
+from .lanes import LanePool
+from .offload import ProcessOffloader, prewarmed_process_pool
+from .metrics import ConsumerMetrics, PROMETHEUS_CONTENT_TYPE
+from .consumer_logging import ConsumerLogger
+from .response import ConsumerResponse, DEFAULT_RESPONSE_MESSAGE, TEXT_CONTENT_TYPE, BINARY_CONTENT_TYPE
+from .ring_buffer import RingBuffer, record_delivery
+from .capture import CaptureWriter
+from concurrent.futures import Executor
 
 
+ACK_MODES = ("after", "immediate")
 
-class SolaceConsumerServer(BaseHTTPRequestHandler):  
+NO_PATH_PARAMS = MappingProxyType(dict())
 
-    def __init__(self, killer_queue, result_queue, callback_function:Callable= None, 
-                 log:bool= False, auto_stop:bool= False, *args, **kwargs):
+
+class AckMetrics:
+    """Counters describing how deliveries were acknowledged by the consumer server.
+
+    All counters are updated under a single lock and can be read at any time
+    (even from another thread while the consumer is running) using snapshot().
+    """
+
+    def __init__(self, ack_mode:str):
+        self.ack_mode= ack_mode
+        self._lock= Lock()
+        self.received= 0            #deliveries that reached do_POST
+        self.acked= 0               #deliveries answered with a 2xx status
+        self.nacked= 0              #deliveries answered with a non-2xx status (broker will redeliver)
+        self.dropped= 0             #deliveries not answered at all because the connection broke (broker will redeliver)
+        self.callback_errors= 0     #callback runs that raised an exception
+        self.processed= 0           #callback runs that finished (successfully or not)
+        self.queued= 0              #deliveries handed over to the work queue ('immediate' mode)
+        self.batches= 0             #batch callback runs (batch mode)
+        self.duplicates= 0          #redeliveries answered from the duplicate cache without running the callback
+        self.callback_seconds= 0.0  #total time spent inside the callback
+        self.ack_seconds= 0.0       #total time between receiving a delivery and sending its response
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self, work_queue:Queue= None)->dict:
+        """Returns the current value of all counters.
+
+        Args:
+            work_queue (Queue, optional): Work queue of the consumer to report its current depth. Defaults to None.
+
+        Returns:
+            dict: Counter values along with average callback and acknowledgement latency in seconds.
+        """
+        with self._lock:
+            snapshot= {"ack_mode": self.ack_mode,
+                       "received": self.received,
+                       "acked": self.acked,
+                       "nacked": self.nacked,
+                       "dropped": self.dropped,
+                       "callback_errors": self.callback_errors,
+                       "processed": self.processed,
+                       "queued": self.queued,
+                       "batches": self.batches,
+                       "duplicates": self.duplicates,
+                       "callback_seconds": self.callback_seconds,
+                       "ack_seconds": self.ack_seconds}
+
+        snapshot["avg_callback_seconds"]= snapshot["callback_seconds"]/snapshot["processed"] if snapshot["processed"] else 0.0
+        responded= snapshot["acked"] + snapshot["nacked"]
+        snapshot["avg_ack_seconds"]= snapshot["ack_seconds"]/responded if responded else 0.0
+        snapshot["work_queue_depth"]= work_queue.qsize() if work_queue is not None else 0
+
+        return snapshot
+
+
+class ConsumerEvent(MutableMapping):
+    """A delivery received by the consumer server.
+
+    Headers are only converted into a dict if the 'headers' attribute is used,
+    and the body can be read without copying through 'body' (a read only memoryview).
+    The object also behaves like the old event dict, so event["content"], event["headers"],
+    event.get("path") and dict(event) keep working. Callbacks can still store their own keys
+    (event["x"]= ...), these are kept in a separate dict that is only created when needed.
+
+    When the consumer streams bodies, 'stream' holds a BodyReader for the body and
+    'content' only reads the whole body into memory if it is accessed.
+    """
+
+    __slots__ = ("request_type", "path", "path_params", "stream", "_content", "_raw_headers", "_headers", "_extra")
+
+    _keys = ("request_type", "path", "headers", "content")
+
+    def __init__(self, path:str, raw_headers, content:bytes|None, request_type:str= "POST",
+                 stream:BodyReader|None= None):
+        self.request_type= request_type
+        self.path= path
+        self.path_params= NO_PATH_PARAMS #filled in when the path matched a parameterized route
+        self.stream= stream
+        self._content= content
+        self._raw_headers= raw_headers #http.client.HTTPMessage (case insensitive lookups) or a dict
+        self._headers= None
+        self._extra= None #keys added by callbacks
+
+    #dict style access (backward compatibility)
+
+    def __getitem__(self, key:str):
+        if key in self._keys:
+            return getattr(self, key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key:str, value):
+        if key == "headers":
+            self._headers= value
+            self._raw_headers= value
+        elif key == "content":
+            self._content= value
+        elif key in self._keys:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra= dict()
+            self._extra[key]= value
+
+    def __delitem__(self, key:str):
+        if key in self._keys:
+            raise TypeError(f"'{key}' can not be removed from a ConsumerEvent.")
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self):
+        if self._extra is None:
+            return iter(self._keys)
+        return iter(self._keys + tuple(self._extra))
+
+    def __len__(self):
+        return len(self._keys) + (len(self._extra) if self._extra is not None else 0)
+
+    def __repr__(self):
+        return f"ConsumerEvent(request_type={self.request_type!r}, path={self.path!r}, content_length={self.content_length})"
+
+    def to_dict(self)->dict:
+        """Returns the event as a regular dict (the format events had before ConsumerEvent)."""
+        event= {"request_type": self.request_type,
+                "path": self.path,
+                "headers": self.headers,
+                "content": self.content}
+        if self._extra is not None:
+            event.update(self._extra)
+        return event
+
+    #headers
+
+    @property
+    def headers(self)->dict:
+        """All request headers as a dict. Built on first access only."""
+        if self._headers is None:
+            self._headers= dict(self._raw_headers.items())
+        return self._headers
+
+    def get_header(self, name:str, default= None)->str|None:
+        """Get a single header without building the headers dict.
+        The lookup is case insensitive for headers received by the consumer server.
+        """
+        return self._raw_headers.get(name, default)
+
+    #body
+
+    @property
+    def content(self)->bytes:
+        if self._content is None:
+            self._content= self.stream.read() if self.stream is not None else b""
+        return self._content
+
+    @property
+    def body(self)->memoryview:
+        """Read only, zero-copy view of the message body."""
+        return memoryview(self.content)
+
+    @property
+    def content_length(self)->int|None:
+        """Length of the body. None for a streamed body without a Content-Length that was not read yet."""
+        if self._content is not None:
+            return len(self._content)
+        return _header_to_int(self.get_header("Content-Length"))
+
+    def text(self, encoding:str= "utf-8")->str:
+        """Message body decoded as a string."""
+        return self.content.decode(encoding)
+
+    #solace headers
+
+    @property
+    def message_id(self)->str|None:
+        return self.get_header("Solace-Message-ID")
+
+    @property
+    def correlation_id(self)->str|None:
+        return self.get_header("Solace-Correlation-ID")
+
+    @property
+    def topic(self)->str|None:
+        return self.get_header("Solace-Topic")
+
+    @property
+    def reply_to_destination(self)->str|None:
+        return self.get_header("Solace-Reply-To-Destination")
+
+    @property
+    def delivery_mode(self)->str|None:
+        return self.get_header("Solace-Delivery-Mode")
+
+    @property
+    def content_type(self)->str|None:
+        return self.get_header("Content-Type")
+
+    @property
+    def redelivered(self)->bool:
+        return _header_to_bool(self.get_header("Solace-Redelivered-Flag"))
+
+    @property
+    def dmq_eligible(self)->bool:
+        return _header_to_bool(self.get_header("Solace-DMQ-Eligible"))
+
+    @property
+    def discard_indication(self)->bool:
+        return _header_to_bool(self.get_header("Solace-Discard-Indication"))
+
+    @property
+    def time_to_live(self)->int|None:
+        """Time to live of the message in milliseconds."""
+        return _header_to_int(self.get_header("Solace-Time-To-Live-In-ms"))
+
+    @property
+    def reply_wait_time(self)->int|None:
+        """Time in milliseconds the publisher waits for a reply. None if not set or set to "FOREVER"."""
+        return _header_to_int(self.get_header("Solace-Reply-Wait-Time-In-ms"))
+
+
+def _header_to_bool(value:str|None)->bool:
+    return value is not None and value.strip().lower() == "true"
+
+
+def _header_to_int(value:str|None)->int|None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SolaceConsumerServer(BaseHTTPRequestHandler):
+
+    def __init__(self, kill_function:Callable, callback_function:Callable= None,
+                 log:ConsumerLogger|None= None, auto_stop:bool= False, *args,
+                 ack_mode:str= "after", work_queue:Queue= None,
+                 metrics:AckMetrics= None, stream_body:bool= False,
+                 max_body_size:int|None= None, router:Router|None= None,
+                 batcher:MicroBatcher|None= None, duplicate_cache:DuplicateCache|None= None,
+                 lanes:LanePool|None= None, consumer_metrics:ConsumerMetrics|None= None,
+                 metrics_path:str|None= None, event_buffer:RingBuffer|None= None,
+                 capture:CaptureWriter|None= None, **kwargs):
         self.callback_function= callback_function
         self.log= log
         self.auto_stop= auto_stop
-        self.killer_queue= killer_queue
-        self.result_queue= result_queue
+        self.kill_function= kill_function #shared by all requests instead of being redefined for each one
+        self.ack_mode= ack_mode
+        self.work_queue= work_queue
+        self.metrics= metrics
+        self.stream_body= stream_body
+        self.max_body_size= max_body_size
+        self.router= router
+        self.batcher= batcher
+        self.duplicate_cache= duplicate_cache
+        self.lanes= lanes
+        self.consumer_metrics= consumer_metrics
+        self.metrics_path= metrics_path
+        self.event_buffer= event_buffer
+        self.capture= capture
+
+        #per request state used to record the route metrics (and the event buffer entry) once the response is sent
+        self.route_metrics= None
+        self.callback_seconds= None
+        self.body_reader= None
+        self.current_event= None
+        self.received_at= None
 
         # BaseHTTPRequestHandler calls do_GET **inside** __init__ !!!
         # So we have to call super().__init__ after setting init attributes, and pass it *args and **kwargs
         super().__init__(*args, **kwargs)
 
 
-    def do_POST(self):  
-        
-        path= self.path
-        headers= self.headers
-        content_length= int(self.headers['Content-Length'])
-        content= self.rfile.read(content_length)  
+    def send_reply(self, status_code:int, response_message:str|bytes|memoryview,
+                   headers:list|None= None, content_type:str|None= None):
+        """Send the response of a delivery. Binary bodies are written without being copied.
+
+        Args:
+            status_code (int): HTTP status.
+            response_message (str | bytes | memoryview): Response body. str bodies are encoded as UTF-8.
+            headers (list | None, optional): Extra (name, value) header pairs. Defaults to None.
+            content_type (str | None, optional): Defaults to None (text/plain for str, application/octet-stream for binary bodies).
+        """
+        if isinstance(response_message, str):
+            body= response_message.encode("utf-8")
+            content_type= content_type or TEXT_CONTENT_TYPE
+        else:
+            body= response_message
+            content_type= content_type or BINARY_CONTENT_TYPE
+
+        self.send_response_only(status_code)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(body.nbytes if isinstance(body, memoryview) else len(body)))
+        if not headers or not any(name.lower() == "solace-delivery-mode" for name, _ in headers):
+            self.send_header('Solace-Delivery-Mode', 'direct')
+        for name, value in headers or ():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.record_route_metrics(status_code)
+
+        if self.event_buffer is not None and self.current_event is not None:
+            event= self.current_event
+            if event.stream is not None: #the connection is gone once the buffer is read, keep what was read of the body
+                event= ConsumerEvent(event.path, event._raw_headers, event._content if event._content is not None else b"")
+            record_delivery(self.event_buffer, event, status_code, response_message, self.received_at)
+            self.current_event= None
+
+
+    def send_callback_response(self, response:ConsumerResponse):
+        self.send_reply(response.status_code, response.encoded_body(),
+                        response.extra_headers(), response.get_content_type())
+
+
+    def record_route_metrics(self, status_code:int):
+        """Record the response of the current delivery in the metrics of its route."""
+        if self.consumer_metrics is None:
+            return
+
+        route_metrics= self.route_metrics
+        if route_metrics is None: #rejected before a handler was picked
+            route_metrics= self.consumer_metrics.route("unrouted")
+            route_metrics.start()
+
+        body_bytes= self.body_reader.bytes_read if self.body_reader is not None else None
+        route_metrics.finish(status_code, body_bytes, self.callback_seconds)
+        self.route_metrics= None
+
+
+    def do_GET(self):
+        if self.metrics_path is None or self.consumer_metrics is None or self.path.split("?", 1)[0] != self.metrics_path:
+            self.send_error(404)
+            return
+
+        ack_metrics= self.metrics.snapshot(self.work_queue) if self.metrics is not None else None
+        body= self.consumer_metrics.prometheus(ack_metrics).encode("utf-8")
 
-        if self.log:
-            print(f"==========(Message received on: {datetime.now().strftime('%d/%m/%Y at %r')})==========")
-            print(f"Path:-\n{path}\n")
-            print(f"Content:-\n{content}\n")
-            print(f"Headers:-\n{headers}")
-        
         self.send_response_only(200)
-        self.send_header("Content-type", "text/plain")
-        self.send_header('Solace-Delivery-Mode', 'direct')
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
+        self.wfile.write(body)
 
-        response_message = "Message Received!!"
-        
-        event = {
-                    "request_type": "POST",
-                    "path": path,
-                    "headers": dict(headers.items()),
-                    "content": content
-                }
-        
-        def kill_function(return_value):
-            self.result_queue.get() #clear the queue
-            self.result_queue.put(return_value)
-            self.killer_queue.put(1)
+
+    def get_body_reader(self)->BodyReader:
+        """Create a reader for the request body based on the Content-Length and Transfer-Encoding headers.
+
+        Raises:
+            ValueError: Invalid Content-Length header.
+            BodyTooLargeError: Content-Length is bigger than the maximum body size.
+        """
+        chunked= "chunked" in self.headers.get("Transfer-Encoding", "").lower()
+        content_length= self.headers.get("Content-Length")
+
+        if content_length is not None and not chunked:
+            content_length= int(content_length)
+            if content_length < 0:
+                raise ValueError("Negative Content-Length")
+        else:
+            content_length= None
+
+        return BodyReader(self.rfile, content_length= content_length,
+                          chunked= chunked, max_body_size= self.max_body_size)
+
+
+    def resolve_callback(self, event:ConsumerEvent)->tuple:
+        """Pick the function that should handle the event.
+
+        Returns:
+            tuple: (callback function or None if nothing handles the path, concurrency limiter, route label for the metrics)
+        """
+        if self.router is not None:
+            route, path_params= self.router.resolve(event.path)
+            if route is not None:
+                if path_params:
+                    event.path_params= path_params
+                return route.handler, route.limiter, route.path
+
+            if self.callback_function is None and self.batcher is None:
+                return None, None, "unrouted"
+
+        if self.batcher is not None:
+            return self.batcher, nullcontext(), "default"
+
+        return self.callback_function, nullcontext(), "default"
+
+
+    def do_POST(self):
+
+        received_at= time.perf_counter()
+
+        if self.metrics is not None:
+            self.metrics.add(received= 1)
+
+        path= self.path
+        headers= self.headers
+        self.route_metrics= None
+        self.callback_seconds= None
+        self.body_reader= None
+        self.current_event= None
+        self.received_at= received_at
 
         try:
-            if self.callback_function is not None:
+            reader= self.get_body_reader()
+            self.body_reader= reader
+            content= None if self.stream_body else reader.read()
+
+        except BodyTooLargeError as e:
+            self.reject(413, str(e), received_at)
+            return
+        except ValueError as e:
+            self.reject(400, f"Invalid request body: {str(e)}", received_at)
+            return
+        except OSError: #truncated body or client disconnect, nobody is left to answer
+            if self.metrics is not None:
+                self.metrics.add(dropped= 1)
+            self.close_connection= True
+            return
+
+        if self.log:
+            self.log.message_received(path, headers, content)
 
-                output = self.callback_function(event= event, 
-                                                kill_function= kill_function)
+        if self.capture is not None:
+            self.capture.write(path, headers, content)
 
-                if isinstance(output, str):
-                    response_message = output 
+        event = ConsumerEvent(path, headers, content,
+                              stream= reader if self.stream_body else None)
+        self.current_event= event
 
-        except Exception as e:
-            if self.log:
-                print(f"#Error encountered while running callback function:\n{str(e)}")
-        
-        self.wfile.write(bytes( response_message ,"utf-8")) 
-        
+        callback_function, limiter, route_label= self.resolve_callback(event)
+
+        if self.consumer_metrics is not None:
+            self.route_metrics= self.consumer_metrics.route(route_label)
+            self.route_metrics.start()
+
+        if limiter is None:
+            self.reject(404, f"No route for path '{event.path}'.", received_at)
+            return
+
+        duplicate_key= None
+        if self.duplicate_cache is not None:
+            duplicate_key= self.duplicate_cache.key_for(event)
+            if duplicate_key is not None:
+                duplicate, cached_response= self.duplicate_cache.lookup(duplicate_key)
+                if duplicate:
+                    self.send_reply(200, cached_response if cached_response is not None else DEFAULT_RESPONSE_MESSAGE)
+                    if self.metrics is not None:
+                        self.metrics.add(acked= 1, duplicates= 1, ack_seconds= time.perf_counter() - received_at)
+                    return
+
+        if isinstance(callback_function, MicroBatcher):
+            self.handle_batched(callback_function, event, received_at, duplicate_key)
+            return
+
+        #Acknowledge as soon as the event is queued and leave the processing to the consumer's workers.
+        #Queuing blocks while the work queue (or lane) is full, so the acknowledgement waits for space.
+        if self.ack_mode == "immediate":
+            if self.lanes is not None:
+                self.lanes.submit(event, partial(process_event, callback_function, limiter, event,
+                                                 self.kill_function, self.log, self.auto_stop, self.metrics))
+            else:
+                self.work_queue.put((callback_function, limiter, event))
+            self.send_reply(200, DEFAULT_RESPONSE_MESSAGE)
+            self.remember(duplicate_key)
+            if self.metrics is not None:
+                self.metrics.add(acked= 1, queued= 1, ack_seconds= time.perf_counter() - received_at)
+            return
+
+        #Acknowledge only after the callback has finished successfully.
+        response= None
+        callback_started_at= time.perf_counter()
+
+        if self.lanes is not None:
+            #waits for the events queued before this one in the same lane
+            try:
+                output, error= self.lanes.submit(event, partial(run_limited, callback_function, limiter, event,
+                                                                self.kill_function, self.log, self.metrics)).wait()
+            except Exception as e:
+                output, error= None, e
+        else:
+            output, error= run_limited(callback_function, limiter, event,
+                                       self.kill_function, self.log, self.metrics)
+
+        self.callback_seconds= time.perf_counter() - callback_started_at
+
+        if isinstance(error, BodyTooLargeError):
+            response= ConsumerResponse(str(error), status_code= 413)
+        elif error is not None:
+            response= ConsumerResponse("Callback function failed to process the message.", status_code= 500)
+        else:
+            response= ConsumerResponse.from_output(output) or ConsumerResponse()
+
+        self.send_callback_response(response)
+        acknowledged= response.status_code < 300
+
+        if acknowledged:
+            self.remember(duplicate_key, response)
+
+        if self.metrics is not None:
+            if acknowledged:
+                self.metrics.add(acked= 1, ack_seconds= time.perf_counter() - received_at)
+            else:
+                self.metrics.add(nacked= 1, ack_seconds= time.perf_counter() - received_at)
 
         if self.auto_stop:
-            kill_function(event)
+            self.kill_function(event.to_dict())
+
+
+    def handle_batched(self, batcher:MicroBatcher, event:ConsumerEvent, received_at:float, duplicate_key:int|None= None):
+        """Hand the event over to the batcher. In 'after' mode the response is sent once its batch was handled."""
+        ticket= batcher.submit(event)
+
+        if self.ack_mode == "immediate":
+            self.send_reply(200, DEFAULT_RESPONSE_MESSAGE)
+            self.remember(duplicate_key)
+            if self.metrics is not None:
+                self.metrics.add(acked= 1, queued= 1, ack_seconds= time.perf_counter() - received_at)
+            return
+
+        ticket.wait()
+        self.callback_seconds= time.perf_counter() - received_at
+
+        response= ConsumerResponse.from_output(ticket.response_message) or ConsumerResponse()
+        if ticket.status_code != 200: #the batch callback failed
+            response= ConsumerResponse(ticket.response_message, status_code= ticket.status_code)
+
+        self.send_callback_response(response)
+        acknowledged= response.status_code < 300
+
+        if acknowledged:
+            self.remember(duplicate_key, response)
+
+        if self.metrics is not None:
+            if acknowledged:
+                self.metrics.add(acked= 1, ack_seconds= time.perf_counter() - received_at)
+            else:
+                self.metrics.add(nacked= 1, ack_seconds= time.perf_counter() - received_at)
+
+
+    def remember(self, duplicate_key:int|None, response:ConsumerResponse|None= None):
+        """Record a successfully acknowledged delivery in the duplicate cache.
+        Only the body of the response is kept (status code and headers are not replayed for redeliveries)."""
+        if duplicate_key is not None:
+            self.duplicate_cache.record(duplicate_key, cached_body(response))
+
+
+    def reject(self, status_code:int, response_message:str, received_at:float):
+        """Answer a delivery with an error without running the callback."""
+        if self.metrics is not None:
+            self.metrics.add(nacked= 1, ack_seconds= time.perf_counter() - received_at)
+        if self.log:
+            self.log.rejected(self.path, status_code, response_message)
+        self.send_reply(status_code, response_message)
+
+
+def cached_body(response:ConsumerResponse|None)->str|bytes|None:
+    """Body of a response as stored in the duplicate cache (None for the default response)."""
+    if response is None or (isinstance(response.body, str) and response.body == DEFAULT_RESPONSE_MESSAGE):
+        return None
+    if isinstance(response.body, str):
+        return response.body
+    return bytes(response.body) #the callback might reuse its buffer
+
+
+def run_callback(callback_function:Callable, event:ConsumerEvent, kill_function:Callable,
+                 log:ConsumerLogger|None, metrics:AckMetrics= None)->tuple:
+    """Run the user callback for an event.
+    Coroutine functions (async def) are run to completion on a new event loop in the calling thread.
+
+    Returns:
+        tuple: (callback output, exception raised by the callback or None)
+    """
+
+    if callback_function is None:
+        return None, None
+
+    started_at= time.perf_counter()
+    output, error= None, None
+
+    try:
+        output = callback_function(event= event,
+                                   kill_function= kill_function)
+
+        if inspect.iscoroutine(output):
+            output = asyncio.run(output)
+
+    except Exception as e:
+        error= e
+        if log:
+            log.callback_error(e, path= event.path)
+
+    if metrics is not None:
+        metrics.add(processed= 1, callback_errors= 1 if error is not None else 0,
+                    callback_seconds= time.perf_counter() - started_at)
+
+    return output, error
+
+
+def run_limited(callback_function:Callable, limiter, event:ConsumerEvent, kill_function:Callable,
+                log:ConsumerLogger|None, metrics:AckMetrics= None)->tuple:
+    """run_callback() while holding the concurrency limiter of the event's route."""
+    with limiter:
+        return run_callback(callback_function, event, kill_function, log, metrics)
+
+
+def process_event(callback_function:Callable, limiter, event:ConsumerEvent, kill_function:Callable,
+                  log:ConsumerLogger|None, auto_stop:bool, metrics:AckMetrics= None)->None:
+    """Handle an event that was already acknowledged ('immediate' ack mode)."""
+    run_limited(callback_function, limiter, event, kill_function, log, metrics)
+
+    if auto_stop:
+        kill_function(event.to_dict())
+
+
+#seconds an idle worker waits for an event before checking if it was asked to stop
+WORKER_POLL_SECONDS = 0.5
+
+
+def work_queue_worker(work_queue:Queue, kill_function:Callable,
+                      log:ConsumerLogger|None, auto_stop:bool, metrics:AckMetrics, stop:Event|None= None):
+    """Process (callback, limiter, event) items handed over by the server in 'immediate' ack mode
+    until a None sentinel is received, or until 'stop' is set (checked between events)."""
+
+    while stop is None or not stop.is_set():
+        if stop is None:
+            item= work_queue.get()
+        else:
+            try:
+                item= work_queue.get(timeout= WORKER_POLL_SECONDS)
+            except Empty:
+                continue
+
+        if item is None:
+            break
+
+        callback_function, limiter, event= item
+        process_event(callback_function, limiter, event, kill_function, log, auto_stop, metrics)
 
 
 class Consumer:
 
-    def startConsumer(self, host:str, port:int, 
-                      callback_function:Callable= None, 
-                      log:bool= True, 
+    def __init__(self):
+        self.ack_metrics= None
+        self.work_queue= None
+        self.router= Router()
+        self.metrics= None
+
+        self._workers= list()      #(thread, stop event) of the work queue workers ("immediate" ack mode)
+        self._worker_args= None    #arguments of work_queue_worker() for the running server
+        self._worker_target= 0     #number of workers asked for, threads asked to stop may still be finishing an event
+        self._workers_lock= Lock()
+
+    def add_route(self, path:str, handler:Callable, match:str= "exact", max_concurrency:int|None= None):
+        """Handle deliveries for a path with their own handler function.
+        Useful to serve several queue bindings (each with a different 'postRequestTarget') from one consumer.
+        Deliveries for paths without a route go to the callback_function of startConsumer(), 
+        or get a 404 response if there is none.
+
+        Args:
+            path (str): Path to match. Segments written as '{name}' match any single segment,
+                        and their values are available to the handler in event.path_params.
+            handler (Callable): Function called as handler(event, kill_function), same as the callback_function.
+            match (str, optional): Either "exact" or "prefix" (longest prefix wins). Ignored for parameterized paths. Defaults to "exact".
+            max_concurrency (int | None, optional): Maximum number of deliveries handled at the same time for this route.
+                                                    Defaults to None (no limit).
+        """
+        return self.router.add_route(path, handler, match= match, max_concurrency= max_concurrency)
+
+    def route(self, path:str, match:str= "exact", max_concurrency:int|None= None)->Callable:
+        """Decorator version of add_route()."""
+        return self.router.route(path, match= match, max_concurrency= max_concurrency)
+
+    def asgi_app(self, callback_function:Callable= None, log:bool|ConsumerLogger= False, auto_stop:bool= False,
+                 max_body_size:int|None= None, duplicate_cache:DuplicateCache|None= None,
+                 on_kill:Callable|None= None):
+        """Create an ASGI application that handles deliveries with the same callbacks (and routes) as startConsumer(),
+        to run the consumer under an ASGI server like uvicorn, with several workers.
+        Deliveries are acknowledged after the callback has finished (ack_mode "after").
+
+        Args:
+            callback_function (Callable, optional): Called as callback_function(event, kill_function) for paths without a route.
+                                                    Synchronous callbacks run in a thread pool, async ones on the event loop.
+                                                    Defaults to None.
+            log (bool | ConsumerLogger, optional): Log requests, rejections and callback errors. Defaults to False.
+            auto_stop (bool, optional): Call kill_function after the first message. Defaults to False.
+            max_body_size (int | None, optional): Bigger request bodies get a 413 response. Defaults to None (unlimited).
+            duplicate_cache (DuplicateCache | None, optional): Answer redeliveries of handled messages from the cache. Defaults to None.
+            on_kill (Callable | None, optional): Called with the return value when kill_function is used,
+                                                 as the ASGI server (not the consumer) decides when to stop. Defaults to None.
+
+        Returns:
+            SolaceASGIApp: The ASGI application. Its ack_metrics, killed and result attributes can be checked while it runs.
+        """
+        from .asgi import SolaceASGIApp #imported here to avoid a circular import at module load
+
+        return SolaceASGIApp(callback_function, router= self.router, log= log, auto_stop= auto_stop,
+                             max_body_size= max_body_size, duplicate_cache= duplicate_cache, on_kill= on_kill)
+
+    def get_ack_metrics(self)->dict:
+        """Get acknowledgement metrics of the currently (or last) running consumer server.
+
+        Returns:
+            dict: Counters for received, acknowledged (acked), negatively acknowledged (nacked), dropped,
+                  queued and processed deliveries along with callback and acknowledgement latency.
+                  Empty dict if no consumer server was started yet.
+        """
+        if self.ack_metrics is None:
+            return dict()
+        return self.ack_metrics.snapshot(self.work_queue)
+
+    def get_metrics(self)->dict:
+        """Get per-route metrics of the currently (or last) running consumer server.
+        The same values are served in the Prometheus text format on the metrics_path of startConsumer().
+
+        Returns:
+            dict: {"uptime_seconds": ..., "routes": {route label: {...}}} where each route has received, in_flight,
+                  receive_rate, responses (count per status code), body_bytes and the callback_duration_seconds and
+                  body_size_bytes histograms (cumulative bucket counts, sum and count).
+                  Empty dict if no consumer server was started yet.
+        """
+        if self.metrics is None:
+            return dict()
+        return self.metrics.snapshot()
+
+    def get_worker_count(self)->int:
+        """Number of work queue workers of the running consumer ("immediate" ack mode), 0 otherwise."""
+        return self._worker_target
+
+    def scale_workers(self, count:int)->int:
+        """Change the number of work queue workers while the consumer runs ("immediate" ack mode).
+        Removed workers finish the event they are handling before stopping, the events waiting
+        on the work queue are left to the remaining workers. Never blocks, even if the work queue is full.
+
+        Args:
+            count (int): New number of workers (at least 1).
+
+        Returns:
+            int: The number of workers after the change. 0 if the consumer is not running in "immediate" mode.
+        """
+        with self._workers_lock:
+            if self._worker_args is None:
+                return 0
+
+            count= max(1, count)
+            self._workers= [(worker, stop) for worker, stop in self._workers if worker.is_alive()]
+            active= [stop for _, stop in self._workers if not stop.is_set()]
+
+            for _ in range(count - len(active)):
+                self._start_worker()
+            for stop in active[count:]:
+                stop.set() #the worker stops after its current event
+
+            self._worker_target= count
+            return count
+
+    def _start_worker(self)->None:
+        stop= Event()
+        worker= Thread(target= work_queue_worker, daemon= True, args= self._worker_args + (stop,))
+        worker.start()
+        self._workers.append((worker, stop))
+
+    def startConsumer(self, host:str, port:int,
+                      callback_function:Callable= None,
+                      log:bool|ConsumerLogger= True,
                       auto_stop:bool= False,
-                      timeout:int= None)->dict:
-        """Start a Consumer server with a given host and port value. 
+                      timeout:int= None,
+                      ack_mode:str= "after",
+                      immediate_workers:int= 1,
+                      work_queue_size:int= 10000,
+                      stream_body:bool= False,
+                      max_body_size:int|None= None,
+                      batch_callback:Callable= None,
+                      max_batch_size:int= 100,
+                      max_batch_latency_ms:float= 50,
+                      duplicate_cache:DuplicateCache|None= None,
+                      ordering_key:str|Callable|None= None,
+                      ordering_lanes:int= 8,
+                      process_pool:int|Executor|None= None,
+                      shared_memory_threshold:int= 64*1024,
+                      metrics_path:str|None= "/metrics",
+                      event_buffer:RingBuffer|None= None,
+                      capture:CaptureWriter|None= None)->dict:
+        """Start a Consumer server with a given host and port value.
         It will receive your messages if you register it as a consumer on your Rest Delivery Point.
 
         Args:
             host (str): IP address for your new consumer server.
             port (int): Port to assign your new server.
-            callback_function (Callable, optional): A function to call when a event (like POST request) happens. 
-                                                    When called, it will receive a dictionary with the request details 
-                                                    [event_type, headers, content], and a function to kill the server and return an output.
-                                                    If your callback function returns a string, that string will be used as message response, 
-                                                    otherwise any other type object is ignored and a default message is returned.
+            callback_function (Callable, optional): A function to call when a event (like POST request) happens.
+                                                    When called, it will receive a ConsumerEvent with the request details
+                                                    (usable like a dict with the keys [request_type, path, headers, content]),
+                                                    and a function to kill the server and return an output.
+                                                    If your callback function returns a string, that string will be used as message response.
+                                                    It can also return bytes / memoryview (sent without copying as application/octet-stream),
+                                                    a (status_code, headers, body) tuple, or a ConsumerResponse to set the status and headers.
+                                                    Any other type object is ignored and a default message is returned.
                                                     Defaults to None.
-            log (bool, optional): To print logging info about incoming requests. Defaults to True.
+            log (bool | ConsumerLogger, optional): To log incoming requests, rejections and callback errors.
+                                                   True logs every message as JSON lines on stdout from a background thread,
+                                                   so logging does not slow down acknowledgements. Pass a ConsumerLogger
+                                                   for log levels, sampling (1 in N messages), body truncation or your own handlers.
+                                                   Defaults to True.
             auto_stop (bool, optional): Stop after receiving a single message. Defaults to False.
             timeout (int, optional): Timeout in seconds after which the consumer will automatically shutdown.
+            ack_mode (str, optional): When to acknowledge a delivery to the broker. Can be one of:
+                                        1) "after" - Respond only after the callback function has finished (at-least-once).
+                                           If the callback raises an exception a 500 status is returned so the broker redelivers the message.
+                                        2) "immediate" - Respond right away and run the callback on an internal work queue.
+                                           Gives the maximum RDP throughput, but the callback output can not be used as a reply
+                                           and a message is not redelivered if the callback fails.
+                                      Defaults to "after".
+            immediate_workers (int, optional): Number of worker threads processing the work queue in "immediate" mode.
+                                               Can be changed while the consumer runs with scale_workers(). Defaults to 1.
+            work_queue_size (int, optional): Maximum number of events waiting on the work queue in "immediate" mode,
+                                             or waiting for a batch when batch_callback is used.
+                                             Once full, new deliveries wait for space before being acknowledged. Defaults to 10000.
+            stream_body (bool, optional): Do not read the request body into memory before calling the callback.
+                                          The callback gets a BodyReader in event.stream instead (with read(), iter_chunks(),
+                                          copy_to(), and the async aread() / aiter_chunks()) so large bodies can be piped
+                                          somewhere else using constant memory. Only works with ack_mode "after". Defaults to False.
+            max_body_size (int | None, optional): Maximum request body size in bytes. Bigger bodies are answered with status 413.
+                                                  Defaults to None (unlimited).
+            batch_callback (Callable, optional): Use instead of callback_function to handle deliveries in batches.
+                                                 Called as batch_callback(events= [...], kill_function= kill_function) once
+                                                 max_batch_size events are waiting or max_batch_latency_ms has passed.
+                                                 It may return a list of string responses (one per event, same order).
+                                                 In ack_mode "after" each delivery is only acknowledged once its batch was handled,
+                                                 and gets a 500 response if the batch callback raised an exception.
+                                                 Defaults to None.
+            max_batch_size (int, optional): Maximum number of events per batch. Defaults to 100.
+            max_batch_latency_ms (float, optional): Maximum time in milliseconds a batch waits to fill up. Defaults to 50.
+            duplicate_cache (DuplicateCache | None, optional): Remembers acknowledged deliveries (by Solace-Message-ID by default).
+                                                               Redeliveries of those are answered with the cached response
+                                                               without running the callback. Defaults to None.
+            ordering_key (str | Callable | None, optional): Process events in ordered lanes. Either a header name (like a partition key header),
+                                                            or a function returning the key of an event (see rest_solace.lanes.topic_level_key).
+                                                            Events with the same key run one at a time in arrival order,
+                                                            events with different keys run in parallel. Defaults to None.
+            ordering_lanes (int, optional): Number of lanes used with ordering_key. Defaults to 8.
+            process_pool (int | Executor | None, optional): Run callback_function in worker processes, for CPU bound callbacks
+                                                            that would otherwise hold the GIL. Either the number of worker processes
+                                                            (a pre-warmed pool is created and shut down with the consumer) or your own
+                                                            ProcessPoolExecutor. callback_function must be picklable (defined at module level),
+                                                            and only responses (str, bytes, tuples or ConsumerResponse) are sent back.
+                                                            Route handlers are not offloaded.
+                                                            Defaults to None.
+            shared_memory_threshold (int, optional): Bodies of at least this many bytes are handed to worker processes through
+                                                     shared memory instead of being pickled. Defaults to 64 KiB.
+            metrics_path (str | None, optional): Path answering GET requests with the consumer metrics in the Prometheus text format
+                                                 (per-route deliveries, in-flight deliveries, response codes, body sizes and
+                                                 callback duration histograms). None disables the endpoint, the metrics stay
+                                                 available through get_metrics(). Defaults to "/metrics".
+            event_buffer (RingBuffer | None, optional): Keeps a DeliveryRecord (event, status code, response body, latency) of the
+                                                        last deliveries. Drain it with event_buffer.drain() from another thread
+                                                        while the consumer runs. For streamed bodies only the part read by the
+                                                        callback is kept. Defaults to None.
+            capture (CaptureWriter | None, optional): Record every delivery (timestamp, path, headers, body) to a capture directory,
+                                                      to replay the traffic later with rest_solace.capture.replay_capture().
+                                                      Can not be used with stream_body. Closed when the server stops.
+                                                      Defaults to None.
+
+        Raises:
+            ValueError: ack_mode is not one of "after" or "immediate", stream_body is used with ack_mode "immediate" or capture,
+                        both callback_function and batch_callback are given, or ordering_key is used with batch_callback.
         """
 
+        if ack_mode not in ACK_MODES:
+            raise ValueError(f"ack_mode must be one of {ACK_MODES}, got '{ack_mode}'.")
+
+        if stream_body and ack_mode == "immediate":
+            raise ValueError("stream_body requires ack_mode 'after' as the body can only be read while the request is open.")
+
+        if stream_body and capture is not None:
+            raise ValueError("capture can not be used with stream_body as it needs the whole body.")
+
+        if batch_callback is not None and callback_function is not None:
+            raise ValueError("Use either callback_function or batch_callback, not both.")
+
+        if batch_callback is not None and ordering_key is not None:
+            raise ValueError("ordering_key can not be used with batch_callback.")
+
+        if log is True:
+            log= ConsumerLogger()
+        elif not log:
+            log= None
+
+        if log is not None:
+            log.start()
+
         killer_queue = Queue(maxsize= 1)
         result_queue = Queue(maxsize= 1)
         result_queue.put(dict())
 
+        self.ack_metrics= AckMetrics(ack_mode)
+        self.metrics= ConsumerMetrics()
+        self.work_queue= Queue(maxsize= work_queue_size) if ack_mode == "immediate" else None
+
+        def kill_function(return_value):
+            result_queue.get() #clear the queue
+            result_queue.put(return_value)
+            try:
+                killer_queue.put_nowait(1)
+            except Full: #server is already being stopped
+                pass
+
+        lanes= None
+        if ordering_key is not None:
+            lanes= LanePool(ordering_key, num_lanes= ordering_lanes)
+            lanes.start()
+
+        #Starting workers for the work queue (lanes take their place when used)
+        with self._workers_lock:
+            self._workers= list()
+            self._worker_args= None
+            self._worker_target= 0
+            if ack_mode == "immediate" and lanes is None:
+                self._worker_args= (self.work_queue, kill_function, log, auto_stop, self.ack_metrics)
+                for _ in range(immediate_workers):
+                    self._start_worker()
+                self._worker_target= immediate_workers
+
+        self.router.compile()
+
+        owned_pool= None
+        if process_pool is not None and callback_function is not None:
+            if isinstance(process_pool, int):
+                owned_pool= prewarmed_process_pool(process_pool)
+                process_pool= owned_pool
+            callback_function= ProcessOffloader(process_pool, callback_function,
+                                                shared_memory_threshold= shared_memory_threshold)
+
+        batcher= None
+        if batch_callback is not None:
+            batcher= MicroBatcher(batch_callback, kill_function,
+                                  max_batch_size= max_batch_size,
+                                  max_batch_latency_ms= max_batch_latency_ms,
+                                  log= log, auto_stop= auto_stop, metrics= self.ack_metrics,
+                                  max_queue_size= work_queue_size)
+            batcher.start()
+
         server_address = (host, port)
 
-        handler_class = partial(SolaceConsumerServer, killer_queue, result_queue, callback_function, log, auto_stop)
+        handler_class = partial(SolaceConsumerServer, kill_function, callback_function, log, auto_stop,
+                                ack_mode= ack_mode, work_queue= self.work_queue, metrics= self.ack_metrics,
+                                stream_body= stream_body, max_body_size= max_body_size,
+                                router= self.router if len(self.router) else None,
+                                batcher= batcher, duplicate_cache= duplicate_cache, lanes= lanes,
+                                consumer_metrics= self.metrics, metrics_path= metrics_path,
+                                event_buffer= event_buffer, capture= capture)
         #httpd = HTTPServer(server_address, handler_class)
         httpd = ThreadingHTTPServer(server_address, handler_class)
 
+        def stop_server():
+            httpd.shutdown()
+            if batcher is not None:
+                batcher.stop() #handles the events still waiting for a batch
+            httpd.server_close()
+            with self._workers_lock:
+                workers= [worker for worker, _ in self._workers if worker.is_alive()]
+                self._worker_args= None
+                self._worker_target= 0
+            for _ in workers:
+                self.work_queue.put(None) #lets the workers finish the events already acknowledged before stopping
+            for worker in workers:
+                worker.join()
+            if lanes is not None:
+                lanes.stop()
+            if owned_pool is not None:
+                owned_pool.shutdown()
+            if capture is not None:
+                capture.close()
+            if log:
+                log.info("Server stopped.", event= "server_stopped")
+                log.stop()
 
-        if log: print("Running Consumer Server...\n")
+        if log: log.info("Running Consumer Server...", event= "server_started", host= host, port= port, ack_mode= ack_mode)
 
         #Creating server thread
-        server_thread = Thread(target = httpd.serve_forever) 
+        server_thread = Thread(target = httpd.serve_forever)
         server_thread.start()
-        
+
         #Add these in a thread with sleep func in the future so that the while loops do not hog cpu.
         try:
             if (timeout == None):
                 while True:
                     if killer_queue.get() == 1:
-                        if log: print("\nStopping server to return output...")
-                        httpd.shutdown()
-                        httpd.server_close()
-                        if log: print("Server stopped.")
+                        if log: log.info("Stopping server to return output...", event= "server_stopping")
+                        stop_server()
                         break
-            
+
             else:
                 timeout = time.time() + timeout
                 while True:
                     if killer_queue.get() == 1 or time.time() > timeout:
-                        if log: print("\nStopping server to return output...")
-                        httpd.shutdown()
-                        httpd.server_close()
-                        if log: print("Server stopped.")
+                        if log: log.info("Stopping server to return output...", event= "server_stopping")
+                        stop_server()
                         break
 
         except KeyboardInterrupt: #It is expected that the user might want to only use ctrl+c to close the server in some cases.
-            if log: print("\nStopping server due to keyboard interrupt...")
-            httpd.shutdown()
-            httpd.server_close()
-            if log: print("Server stopped.")
-            
-        
+            if log: log.info("Stopping server due to keyboard interrupt...", event= "server_stopping")
+            stop_server()
+
+
         return result_queue.get()
 
 
-    
+
 
 
 
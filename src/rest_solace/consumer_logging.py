@@ -0,0 +1,165 @@
+"""Structured, non-blocking logging for the consumer server.
+
+Request threads only put a LogRecord on a queue. Formatting and writing happen on a QueueListener thread,
+so logging does not delay acknowledging deliveries. Per-message records can be sampled (1 in N) and
+bodies are truncated before they are logged.
+"""
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue, Full
+from datetime import datetime, timezone
+import itertools
+import logging
+import json
+import sys
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, with the structured fields of the record merged in."""
+
+    def format(self, record:logging.LogRecord)->str:
+        entry= {"time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec= "milliseconds"),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage()}
+
+        for name, value in getattr(record, "fields", dict()).items():
+            entry[name]= _to_json_value(value)
+
+        if record.exc_text:
+            entry["exception"]= record.exc_text
+
+        return json.dumps(entry, default= str)
+
+
+def _to_json_value(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8", errors= "replace")
+    if hasattr(value, "items") and not isinstance(value, dict): #http.client.HTTPMessage
+        return dict(value.items())
+    return value
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking or raising."""
+
+    def __init__(self, queue:Queue):
+        super().__init__(queue)
+        self.dropped= 0
+
+    def prepare(self, record:logging.LogRecord)->logging.LogRecord:
+        #the default prepare() formats the record on the calling thread, the listener does it here instead
+        return record
+
+    def enqueue(self, record:logging.LogRecord)->None:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class ConsumerLogger:
+    """Logger used by the consumer server when log is enabled.
+
+    Records go to the "rest_solace.consumer" logger through a bounded queue and are written by a background thread.
+    Each record carries its details in 'record.fields' (path, status_code, headers, body...).
+    """
+
+    def __init__(self, level:int|str= logging.INFO, sample_rate:int= 1, max_body_bytes:int= 1024,
+                 log_headers:bool= True, handlers:list|None= None, queue_size:int= 10000,
+                 logger_name:str= "rest_solace.consumer"):
+        """
+        Args:
+            level (int | str, optional): Minimum level logged. Received messages are logged at INFO,
+                                         rejected deliveries at WARNING and callback errors at ERROR. Defaults to INFO.
+            sample_rate (int, optional): Only log 1 in every 'sample_rate' received messages.
+                                         Errors and rejections are always logged. Defaults to 1 (every message).
+            max_body_bytes (int, optional): Bodies are truncated to this many bytes in the log, 0 leaves them out.
+                                            Defaults to 1024.
+            log_headers (bool, optional): Include the request headers in received message records. Defaults to True.
+            handlers (list | None, optional): logging.Handler objects that write the records. Defaults to None,
+                                              which writes JSON lines (see StructuredFormatter) to stdout.
+            queue_size (int, optional): Maximum number of records waiting to be written.
+                                        Records are dropped (and counted in 'dropped') when it is full. Defaults to 10000.
+            logger_name (str, optional): Name of the logger used. Defaults to "rest_solace.consumer".
+        """
+        if sample_rate < 1:
+            raise ValueError("sample_rate must be at least 1.")
+
+        self.logger= logging.getLogger(logger_name)
+        self.level= logging.getLevelName(level) if isinstance(level, str) else level
+        self.sample_rate= sample_rate
+        self.max_body_bytes= max_body_bytes
+        self.log_headers= log_headers
+
+        if handlers is None:
+            handler= logging.StreamHandler(sys.stdout)
+            handler.setFormatter(StructuredFormatter())
+            handlers= [handler]
+        self.handlers= handlers
+
+        self._queue_handler= _DroppingQueueHandler(Queue(maxsize= queue_size))
+        self._listener= None
+        self._sample_counter= itertools.count()
+
+    @property
+    def dropped(self)->int:
+        """Number of records dropped because the queue was full."""
+        return self._queue_handler.dropped
+
+    def start(self)->None:
+        if self._listener is not None:
+            return
+        self.logger.setLevel(self.level)
+        self.logger.propagate= False
+        self.logger.addHandler(self._queue_handler)
+        self._listener= QueueListener(self._queue_handler.queue, *self.handlers, respect_handler_level= True)
+        self._listener.start()
+
+    def stop(self)->None:
+        """Write the records still waiting on the queue, then stop the listener thread."""
+        if self._listener is None:
+            return
+        self.logger.removeHandler(self._queue_handler)
+        self._listener.stop()
+        self._listener= None
+
+    def info(self, message:str, **fields)->None:
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(message, extra= {"fields": fields})
+
+    def message_received(self, path:str, headers, content:bytes|None)->None:
+        """Log a received delivery (sampled). Headers are only turned into a dict on the listener thread."""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        if self.sample_rate > 1 and next(self._sample_counter) % self.sample_rate:
+            return
+
+        fields= {"event": "message_received", "path": path}
+        if self.log_headers:
+            fields["headers"]= headers
+
+        if content is None:
+            fields["body"]= "<streamed>"
+        else:
+            fields["content_length"]= len(content)
+            if self.max_body_bytes:
+                fields["body"]= content[:self.max_body_bytes]
+                if len(content) > self.max_body_bytes:
+                    fields["body_truncated"]= True
+
+        self.logger.info("Message received", extra= {"fields": fields})
+
+    def rejected(self, path:str, status_code:int, reason:str)->None:
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning("Request rejected", extra= {"fields": {"event": "rejected", "path": path,
+                                                                        "status_code": status_code, "reason": reason}})
+
+    def callback_error(self, error:Exception, path:str|None= None, batch_size:int|None= None)->None:
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
+        fields= {"event": "callback_error", "error": f"{type(error).__name__}: {error}"}
+        if path is not None:
+            fields["path"]= path
+        if batch_size is not None:
+            fields["batch_size"]= batch_size
+        self.logger.error("Callback function failed", extra= {"fields": fields})
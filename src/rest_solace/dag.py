@@ -0,0 +1,215 @@
+"""Runs steps that depend on each other, as many at a time as their dependencies allow.
+
+A step starts as soon as every step it depends on has completed, so independent chains
+(for example the objects of different queues) progress in parallel. When a step fails,
+the steps that depend on it (directly or not) are skipped, the others keep running.
+
+With rollback, no new step is started after a failure and the completed steps are undone
+in reverse dependency order (a step is undone once every step depending on it has been undone).
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Hashable, Iterable
+
+
+class Step:
+    """A unit of work identified by a unique key."""
+
+    __slots__ = ("key", "function", "depends_on", "undo")
+
+    def __init__(self, key:Hashable, function:Callable, depends_on:Iterable= (), undo:Callable|None= None):
+        """
+        Args:
+            key (Hashable): Unique key of the step.
+            function (Callable): Called without arguments to run the step. Its return value is kept in the results.
+            depends_on (Iterable, optional): Keys of the steps that must complete first.
+                                             Keys that are not part of the run are ignored. Defaults to ().
+            undo (Callable | None, optional): Called with the return value of function to revert the step during a rollback.
+                                              Defaults to None (nothing to revert).
+        """
+        self.key= key
+        self.function= function
+        self.depends_on= tuple(depends_on)
+        self.undo= undo
+
+    def __repr__(self):
+        return f"Step({self.key!r})"
+
+
+def merge_steps(steps:Iterable[Step])->list:
+    """Merge steps sharing a key (for example an RDP used by several setups) into one step.
+    The first step's function and undo are kept, its dependencies become the union of every copy's,
+    so the merged step still waits for everything each copy was waiting for.
+
+    Args:
+        steps (Iterable[Step]): Steps, possibly with repeated keys.
+
+    Returns:
+        list[Step]: One step per key, in order of first appearance.
+    """
+    merged= dict()
+    for step in steps:
+        first= merged.get(step.key)
+        if first is None:
+            merged[step.key]= Step(step.key, step.function, step.depends_on, undo= step.undo)
+        else:
+            first.depends_on= tuple(dict.fromkeys(first.depends_on + step.depends_on))
+    return list(merged.values())
+
+
+def run_steps(steps:Iterable[Step], workers:int= 8, rollback:bool= False)->dict:
+    """Run steps in dependency order.
+
+    Args:
+        steps (Iterable[Step]): Steps to run.
+        workers (int, optional): Maximum number of steps running at the same time. Defaults to 8.
+        rollback (bool, optional): If a step fails, stop starting new steps and undo the completed ones. Defaults to False.
+
+    Returns:
+        dict: {"completed": {key: return value}, "failed": {key: exception}, "skipped": [keys]}
+              Completed keys are in completion order.
+              With rollback, also "rolled_back": [keys] and "rollback_failed": {key: exception}.
+
+    Raises:
+        ValueError: If two steps have the same key or the dependencies contain a cycle.
+    """
+    steps= {step.key: step for step in _unique(steps)}
+
+    dependents= {key: list() for key in steps}
+    waiting_on= dict()
+    for key, step in steps.items():
+        dependencies= {dependency for dependency in step.depends_on if dependency in steps}
+        waiting_on[key]= len(dependencies)
+        for dependency in dependencies:
+            dependents[dependency].append(key)
+
+    _check_acyclic(steps, dependents, waiting_on)
+
+    completed= dict()
+    failed= dict()
+    skipped= list()
+
+    ready= [key for key, count in waiting_on.items() if count == 0]
+    running= dict() #future -> key
+
+    with ThreadPoolExecutor(max_workers= max(1, workers)) as executor:
+        while ready or running:
+            if rollback and failed:
+                ready= list()
+                if not running:
+                    break
+
+            while ready:
+                key= ready.pop()
+                running[executor.submit(steps[key].function)]= key
+
+            done, _= wait(running, return_when= FIRST_COMPLETED)
+
+            for future in done:
+                key= running.pop(future)
+                error= future.exception()
+
+                if error is not None:
+                    failed[key]= error
+                    skipped.extend(_descendants(key, dependents))
+                    continue
+
+                completed[key]= future.result()
+                for dependent in dependents[key]:
+                    waiting_on[dependent] -= 1
+                    if waiting_on[dependent] == 0 and dependent not in failed:
+                        ready.append(dependent)
+
+    if rollback and failed:
+        #steps that never started because of the failure
+        skipped.extend(key for key in steps if key not in completed and key not in failed)
+
+    #a step depending on two failed branches is reported once
+    skipped= list(dict.fromkeys(key for key in skipped if key not in completed))
+    result= {"completed": completed, "failed": failed, "skipped": skipped}
+
+    if rollback:
+        result["rolled_back"], result["rollback_failed"]= _rollback(steps, completed, dependents, workers) if failed else (list(), dict())
+
+    return result
+
+
+def _rollback(steps:dict, completed:dict, dependents:dict, workers:int)->tuple:
+    """Undo the completed steps, dependents first. Returns (undone keys, {key: exception})."""
+    #number of completed dependents each step has to wait for
+    waiting_on= {key: sum(1 for dependent in dependents[key] if dependent in completed) for key in completed}
+
+    undone= list()
+    undo_failed= dict()
+
+    ready= [key for key, count in waiting_on.items() if count == 0]
+    running= dict()
+
+    def undo(key):
+        if steps[key].undo is not None:
+            steps[key].undo(completed[key])
+            return True
+        return False
+
+    with ThreadPoolExecutor(max_workers= max(1, workers)) as executor:
+        while ready or running:
+            while ready:
+                key= ready.pop()
+                running[executor.submit(undo, key)]= key
+
+            done, _= wait(running, return_when= FIRST_COMPLETED)
+
+            for future in done:
+                key= running.pop(future)
+                error= future.exception()
+                if error is not None:
+                    undo_failed[key]= error
+                elif future.result():
+                    undone.append(key)
+
+                #dependencies are undone even if this undo failed, to leave as little behind as possible
+                for dependency in set(steps[key].depends_on):
+                    if dependency in waiting_on:
+                        waiting_on[dependency] -= 1
+                        if waiting_on[dependency] == 0:
+                            ready.append(dependency)
+
+    return undone, undo_failed
+
+
+def _unique(steps:Iterable[Step])->list:
+    steps= list(steps)
+    keys= set()
+    for step in steps:
+        if step.key in keys:
+            raise ValueError(f"Duplicate step key: {step.key!r}")
+        keys.add(step.key)
+    return steps
+
+
+def _descendants(key, dependents:dict)->list:
+    found= list()
+    pending= list(dependents[key])
+    seen= set()
+    while pending:
+        dependent= pending.pop()
+        if dependent in seen:
+            continue
+        seen.add(dependent)
+        found.append(dependent)
+        pending.extend(dependents[dependent])
+    return found
+
+
+def _check_acyclic(steps:dict, dependents:dict, waiting_on:dict)->None:
+    remaining= dict(waiting_on)
+    ready= [key for key, count in remaining.items() if count == 0]
+    visited= 0
+    while ready:
+        key= ready.pop()
+        visited += 1
+        for dependent in dependents[key]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if visited != len(steps):
+        raise ValueError("Step dependencies contain a cycle.")
@@ -0,0 +1,155 @@
+"""Duplicate suppression for redelivered messages.
+
+The RDP redelivers messages that were not acknowledged (consumer restarts, timeouts...).
+DuplicateCache remembers which messages were already handled, and their response,
+so the consumer can answer a redelivery right away without calling the callback again.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+import hashlib
+import sqlite3
+import time
+
+
+class DuplicateCache:
+    """Bounded LRU + TTL cache of handled message keys, optionally backed by an sqlite file.
+
+    Keys (by default the Solace-Message-ID header) are stored as 64 bit hashes instead of the full id strings,
+    so an entry costs the same whatever the length of the ids (roughly 150 bytes with its expiry time),
+    and only responses that differ from the default response are kept.
+    """
+
+    def __init__(self, max_entries:int= 1_000_000, ttl_seconds:float= 3600,
+                 key_header:str= "Solace-Message-ID", key_function:Callable|None= None,
+                 persist_path:str|None= None):
+        """
+        Args:
+            max_entries (int, optional): Maximum number of keys kept in memory. The least recently used are dropped first.
+                                         Defaults to 1_000_000.
+            ttl_seconds (float, optional): How long a handled message is remembered. Defaults to 3600.
+            key_header (str, optional): Header identifying a message. Defaults to "Solace-Message-ID".
+            key_function (Callable | None, optional): Function returning the key (str or bytes) for an event.
+                                                      Used instead of key_header if given. Defaults to None.
+            persist_path (str | None, optional): Path to an sqlite file that keeps the keys across consumer restarts.
+                                                 Defaults to None (memory only).
+        """
+        self.max_entries= max_entries
+        self.ttl_seconds= ttl_seconds
+        self.key_header= key_header
+        self.key_function= key_function
+
+        self._lock= Lock()
+        self._expiry= OrderedDict() #key hash -> expiry time (int seconds), least recently used first
+        self._responses= dict()  #key hash -> response, only for non default responses
+
+        self.hits= 0
+        self.misses= 0
+
+        self._db= None
+        if persist_path is not None:
+            self._db= sqlite3.connect(persist_path, check_same_thread= False, isolation_level= None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS handled (key INTEGER PRIMARY KEY, expiry INTEGER, response BLOB)")
+            self.purge_expired()
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def key_for(self, event)->int|None:
+        """Hash of the key of an event, or None if the event has no key (it is then never treated as a duplicate)."""
+        if self.key_function is not None:
+            key= self.key_function(event)
+        else:
+            key= event.get_header(self.key_header) if hasattr(event, "get_header") else event["headers"].get(self.key_header)
+
+        if not key:
+            return None
+        if isinstance(key, str):
+            key= key.encode("utf-8")
+
+        #signed so it fits an sqlite INTEGER
+        return int.from_bytes(hashlib.blake2b(key, digest_size= 8).digest(), "big", signed= True)
+
+    def lookup(self, key:int)->tuple:
+        """Check if a key was handled already.
+
+        Returns:
+            tuple: (True, cached response or None for the default response) for a duplicate, else (False, None).
+        """
+        now= int(time.time())
+
+        with self._lock:
+            expiry= self._expiry.get(key)
+
+            if expiry is not None and expiry > now:
+                self._expiry.move_to_end(key)
+                self.hits += 1
+                return True, self._responses.get(key)
+
+            if expiry is not None:
+                del self._expiry[key]
+                self._responses.pop(key, None)
+
+            if self._db is not None:
+                row= self._db.execute("SELECT expiry, response FROM handled WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[0] > now:
+                    self._insert(key, row[0], row[1])
+                    self.hits += 1
+                    return True, row[1]
+
+            self.misses += 1
+            return False, None
+
+    def record(self, key:int, response= None)->None:
+        """Remember a handled message along with its response (None for the default response)."""
+        expiry= int(time.time() + self.ttl_seconds)
+
+        with self._lock:
+            self._insert(key, expiry, response)
+
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO handled (key, expiry, response) VALUES (?, ?, ?)",
+                                 (key, expiry, response))
+
+    def _insert(self, key:int, expiry:int, response)->None:
+        self._expiry[key]= expiry
+        self._expiry.move_to_end(key)
+        if response is not None:
+            self._responses[key]= response
+        else:
+            self._responses.pop(key, None)
+
+        while len(self._expiry) > self.max_entries:
+            oldest, _= self._expiry.popitem(last= False)
+            self._responses.pop(oldest, None)
+
+    def purge_expired(self)->int:
+        """Drop expired keys from memory and from the sqlite file.
+
+        Returns:
+            int: Number of keys dropped from memory.
+        """
+        now= int(time.time())
+
+        with self._lock:
+            expired= [key for key, expiry in self._expiry.items() if expiry <= now]
+            for key in expired:
+                del self._expiry[key]
+                self._responses.pop(key, None)
+
+            if self._db is not None:
+                self._db.execute("DELETE FROM handled WHERE expiry <= ?", (now,))
+
+        return len(expired)
+
+    def stats(self)->dict:
+        with self._lock:
+            return {"entries": len(self._expiry), "hits": self.hits, "misses": self.misses,
+                    "persistent": self._db is not None}
+
+    def close(self)->None:
+        if self._db is not None:
+            self._db.close()
+            self._db= None
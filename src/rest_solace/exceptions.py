@@ -3,3 +3,25 @@
 
 class CustomException(Exception):
     """Raised when a thing happens"""
+
+
+class BodyTooLargeError(Exception):
+    """Raised when a request body received by the consumer is bigger than the allowed maximum size"""
+
+
+class SetupError(Exception):
+    """Raised when a messaging setup or teardown fails. The 'result' attribute holds the step results
+    (completed, failed, skipped and rolled back steps)"""
+
+    def __init__(self, message:str, result:dict):
+        super().__init__(message)
+        self.result = result
+
+
+class BulkOperationError(Exception):
+    """Raised when some of the requests of a bulk operation fail. The 'result' attribute holds the counts
+    and the errors of the failed items"""
+
+    def __init__(self, message:str, result:dict):
+        super().__init__(message)
+        self.result = result
@@ -23,6 +23,14 @@ class HttpClient:
                                      "plain_text": {'Content-Type': 'text/plain'},
                                      "binary": {'Content-Type':'application/octet-stream'}}
 
+        self.session = None #created on first use by http_post_raw
+
+        self.write_listener = None #called with the endpoint after each post/patch/put/delete (used by Manager's cache)
+
+    def _notify_write(self, endpoint:str):
+        if self.write_listener is not None:
+            self.write_listener(endpoint)
+
 
     def http_get(self, endpoint: str, headers:dict= None, timeout=None):
         """method to get the http endpoint
@@ -56,14 +64,41 @@ class HttpClient:
 
         url = f"{self.base_url}{endpoint}"
     
-        return requests.post(url= url, 
-                             auth=self.authHeader, 
-                             data=json.dumps(payload),
-                             headers=headers, 
-                             verify=self.verify_ssl, 
-                             timeout= timeout)
+        res = requests.post(url= url, 
+                            auth=self.authHeader, 
+                            data=json.dumps(payload),
+                            headers=headers, 
+                            verify=self.verify_ssl, 
+                            timeout= timeout)
+        self._notify_write(endpoint)
+        return res
         
 
+    def http_post_raw(self, endpoint: str, data:bytes, headers:dict, timeout=None):
+        """method for http post of a body that is sent as is (not json encoded).
+        Uses a persistent session so many posts reuse the same connection.
+        Args:
+            endpoint: endpoint string
+            data: request body
+
+        Raises:
+            HTTP POST request failed. with response status code or
+            HTTP error occurred while HTTP POST exception
+        """
+
+        url = f"{self.base_url}{endpoint}"
+
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.auth = self.authHeader
+            self.session.verify = self.verify_ssl
+
+        return self.session.post(url= url,
+                                 data= data,
+                                 headers= headers,
+                                 timeout= timeout)
+
+
     def http_patch(self, endpoint:str, payload, headers:dict= {'Content-Type': 'application/json'}, timeout=None):
         """method to update at the http endpoint
         Args:
@@ -76,12 +111,14 @@ class HttpClient:
         """
         url = f"{self.base_url}{endpoint}"
         
-        return requests.patch(url= url, 
-                              auth= self.authHeader, 
-                              data= json.dumps(payload),
-                              headers= headers, 
-                              verify= self.verify_ssl, 
-                              timeout= timeout)
+        res = requests.patch(url= url, 
+                             auth= self.authHeader, 
+                             data= json.dumps(payload),
+                             headers= headers, 
+                             verify= self.verify_ssl, 
+                             timeout= timeout)
+        self._notify_write(endpoint)
+        return res
 
 
     def http_put(self, endpoint:str, payload, headers:dict= {'Content-Type': 'application/json'}, timeout=None):
@@ -96,12 +133,14 @@ class HttpClient:
         """
         url = f"{self.base_url}{endpoint}"
         
-        return requests.put(url= url, 
-                            auth= self.authHeader, 
-                            ata= json.dumps(payload),
-                            headers= headers, 
-                            verify= self.verify_ssl, 
-                            timeout= timeout)
+        res = requests.put(url= url, 
+                           auth= self.authHeader, 
+                           data= json.dumps(payload),
+                           headers= headers, 
+                           verify= self.verify_ssl, 
+                           timeout= timeout)
+        self._notify_write(endpoint)
+        return res
     
 
     def http_delete(self, endpoint:str, headers:dict= {'Content-Type': 'application/json'}):
@@ -115,10 +154,12 @@ class HttpClient:
         """
         url = f"{self.base_url}{endpoint}"
         
-        return requests.delete(url= url, 
-                               auth= self.authHeader, 
-                               headers= headers,
-                               verify= self.verify_ssl)
+        res = requests.delete(url= url, 
+                              auth= self.authHeader, 
+                              headers= headers,
+                              verify= self.verify_ssl)
+        self._notify_write(endpoint)
+        return res
     
     ##Commented out as it is not needed. Keeping it for references.
     # async def async_http_get(self, endpoint: str, headers:dict= None, timeout=None):
@@ -139,6 +180,14 @@ class HttpClient:
 
     #         return await session.get(url= url)
         
+    def async_session(self, timeout=None)->aiohttp.ClientSession:
+        """aiohttp session using the client's credentials, to make many async requests over the same connections.
+        Use it as 'async with http_client.async_session() as session:'."""
+
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(verify_ssl=self.verify_ssl),
+                                     auth= self.authHeaderAsync,
+                                     timeout= aiohttp.ClientTimeout(total= float(timeout) if timeout is not None else None))
+
     async def async_http_post(self, endpoint: str, payload:dict|str, 
                               headers:dict= {'Content-Type': 'application/json'}, timeout=None):
         """async method for http post
@@ -158,7 +207,9 @@ class HttpClient:
                                          headers= headers,
                                          timeout= aiohttp.ClientTimeout(total= float(timeout))) as session:
 
-            return await session.post(url= url, data= json.dumps(payload))
+            res = await session.post(url= url, data= json.dumps(payload))
+        self._notify_write(endpoint)
+        return res
     
 
     
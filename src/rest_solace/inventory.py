@@ -0,0 +1,256 @@
+"""Compact columnar tables of SEMP objects, for inventories of large brokers.
+
+Only the requested fields are fetched (pushed down as 'select'), one page at a time, and each
+page is folded into one column per field before the next one is requested:
+
+    * integers, floats and booleans are kept in typed arrays, with a byte per row marking missing values
+      (only allocated once a value is missing),
+    * strings are dictionary encoded: an array of integer codes plus the list of distinct values,
+      which are interned so that repeated values (enums, VPN names...) are stored once,
+    * anything else (lists, nested objects, mixed types) falls back to a plain list.
+
+Rows are materialized only on access, through InventoryRow views.
+"""
+from array import array
+from collections import Counter
+from typing import Iterable, Iterator
+import sys
+
+
+_TYPECODES = {"int": "q", "float": "d", "bool": "b", "str": "i"}
+
+
+def _kind(value)->str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int" if -2**63 <= value < 2**63 else "object"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "object"
+
+
+class _Column:
+    """Values of one field. The kind is set by the first value that is not None and widened
+    (int to float, anything else to object) when a later value does not fit."""
+
+    __slots__ = ("kind", "data", "nulls", "categories", "_codes", "length")
+
+    def __init__(self):
+        self.kind= None         #None while every value seen so far is None
+        self.data= None
+        self.nulls= None        #bytearray, 1 for missing values of int/float/bool columns
+        self.categories= None   #distinct values of a str column, indexed by code
+        self._codes= None       #value -> code, dropped once loading is done
+        self.length= 0
+
+    def _target(self, kind:str)->str:
+        if self.kind is None or self.kind == kind:
+            return kind
+        if {self.kind, kind} == {"int", "float"}:
+            return "float"
+        return "object"
+
+    def _retype(self, kind:str)->None:
+        if self.kind is None:
+            if kind == "object":
+                self.data= [None]*self.length
+            elif kind == "str":
+                self.data= array("i", [-1])*self.length
+                self.categories= list()
+                self._codes= dict()
+            else:
+                self.data= array(_TYPECODES[kind], [0])*self.length
+                if self.length:
+                    self.nulls= bytearray(b"\x01")*self.length
+        elif kind == "float":
+            self.data= array("d", self.data)
+        else:
+            self.data= self.values()
+            self.nulls= None
+            self.categories= None
+            self._codes= None
+        self.kind= kind
+
+    def _lookup(self)->dict:
+        if self._codes is None:
+            self._codes= {category: code for code, category in enumerate(self.categories)}
+        return self._codes
+
+    def _code(self, value:str)->int:
+        code= self._lookup().get(value)
+        if code is None:
+            code= len(self.categories)
+            value= sys.intern(value)
+            self.categories.append(value)
+            self._codes[value]= code
+        return code
+
+    def append(self, value)->None:
+        if value is not None:
+            kind= self._target(_kind(value))
+            if kind != self.kind:
+                self._retype(kind)
+
+        if self.kind == "object":
+            self.data.append(value)
+        elif self.kind == "str":
+            self.data.append(-1 if value is None else self._code(value))
+        elif self.kind is not None:
+            if value is None:
+                if self.nulls is None:
+                    self.nulls= bytearray(self.length)
+                self.nulls.append(1)
+                self.data.append(0)
+            else:
+                if self.nulls is not None:
+                    self.nulls.append(0)
+                self.data.append(value)
+
+        self.length += 1
+
+    def freeze(self)->None:
+        """Drop the lookup dictionary of a str column, it is rebuilt when needed again (code_of(), append())."""
+        self._codes= None
+
+    def code_of(self, value:str)->int|None:
+        if self.kind != "str":
+            return None
+        return self._lookup().get(value)
+
+    def get(self, row:int):
+        if self.kind is None:
+            return None
+        if self.kind == "object":
+            return self.data[row]
+        if self.kind == "str":
+            code= self.data[row]
+            return self.categories[code] if code >= 0 else None
+        if self.nulls is not None and self.nulls[row]:
+            return None
+        return bool(self.data[row]) if self.kind == "bool" else self.data[row]
+
+    def values(self)->list:
+        if self.kind is None:
+            return [None]*self.length
+        if self.kind == "object":
+            return list(self.data)
+        if self.kind == "str":
+            categories= self.categories
+            return [categories[code] if code >= 0 else None for code in self.data]
+        return [self.get(row) for row in range(self.length)]
+
+
+class InventoryRow:
+    """View of one row of an Inventory. Values are read from the columns on access."""
+
+    __slots__ = ("_inventory", "index")
+
+    def __init__(self, inventory, index:int):
+        self._inventory= inventory
+        self.index= index
+
+    def __getitem__(self, field:str):
+        return self._inventory._columns[field].get(self.index)
+
+    def get(self, field:str, default= None):
+        column= self._inventory._columns.get(field)
+        if column is None:
+            return default
+        value= column.get(self.index)
+        return default if value is None else value
+
+    def as_dict(self)->dict:
+        return {field: column.get(self.index) for field, column in self._inventory._columns.items()}
+
+    def __repr__(self):
+        return f"InventoryRow({self.index}, {self.as_dict()})"
+
+
+class Inventory:
+    """Columnar table of the objects of a SEMP collection, see Manager.inventory()."""
+
+    def __init__(self, fields:Iterable[str]):
+        """
+        Args:
+            fields (Iterable[str]): Attribute names, one column each.
+        """
+        self.fields= tuple(dict.fromkeys(fields))
+        if not self.fields:
+            raise ValueError("Expected at least one field.")
+
+        self._columns= {field: _Column() for field in self.fields}
+        self._length= 0
+
+    def extend(self, objects:Iterable[dict])->None:
+        """Append objects as rows. Attributes missing from an object are stored as None, others are ignored."""
+        columns= tuple(self._columns.items())
+        for item in objects:
+            for field, column in columns:
+                column.append(item.get(field))
+            self._length += 1
+
+    def freeze(self)->None:
+        """Release the memory only needed while rows are being added. Rows can still be added afterwards."""
+        for column in self._columns.values():
+            column.freeze()
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self)->Iterator[InventoryRow]:
+        return (InventoryRow(self, index) for index in range(self._length))
+
+    def __getitem__(self, index:int)->InventoryRow:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Inventory row index out of range.")
+        return InventoryRow(self, index)
+
+    def __repr__(self):
+        return f"Inventory({self._length} rows, fields={self.fields})"
+
+    def kind(self, field:str)->str|None:
+        """Storage of a column: "int", "float", "bool", "str", "object", or None if every value is None."""
+        return self._columns[field].kind
+
+    def value(self, index:int, field:str):
+        return self._columns[field].get(index)
+
+    def values(self, field:str)->list:
+        """Decoded values of a column as a list (builds one Python object per row)."""
+        return self._columns[field].values()
+
+    def column(self, field:str):
+        """Raw storage of a column: the typed array (the codes for a str column) or the list of an object column.
+        For int/float/bool columns, rows marked in nulls(field) hold 0."""
+        return self._columns[field].data
+
+    def nulls(self, field:str)->bytearray|None:
+        """Missing value markers of an int/float/bool column, None if no value is missing."""
+        return self._columns[field].nulls
+
+    def categories(self, field:str)->list|None:
+        """Distinct values of a str column, indexed by the codes of column(field). None for other kinds."""
+        return self._columns[field].categories
+
+    def rows_where(self, field:str, value)->list:
+        """Indexes of the rows whose field equals value. Str columns are compared by code."""
+        column= self._columns[field]
+        if column.kind == "str":
+            code= -1 if value is None else column.code_of(value) #missing values are stored as -1
+            if code is None:
+                return list()
+            return [index for index, row_code in enumerate(column.data) if row_code == code]
+        return [index for index in range(self._length) if column.get(index) == value]
+
+    def value_counts(self, field:str)->dict:
+        """{value: number of rows} of a column, most common first."""
+        column= self._columns[field]
+        if column.kind == "str":
+            categories= column.categories
+            return {categories[code] if code >= 0 else None: count for code, count in Counter(column.data).most_common()}
+        return dict(Counter(column.get(index) for index in range(self._length)).most_common())
@@ -0,0 +1,124 @@
+"""Ordered per-key processing lanes for the consumer.
+
+Each event gets a key (a header value, a topic level, or the result of a function). The key is hashed to one of
+'num_lanes' lanes. Each lane runs its events one at a time in arrival order on its own thread, and the lanes run
+in parallel. So events with the same key are never processed concurrently or out of order.
+"""
+from queue import Queue
+from threading import Thread, Event
+from typing import Callable
+import itertools
+import zlib
+
+
+def topic_level_key(level:int)->Callable:
+    """Key function using a single level of the Solace-Topic header (0 based, negative values count from the end).
+
+    Example:
+        topic_level_key(1) gives "eu" for the topic "orders/eu/created".
+    """
+    def key_function(event):
+        topic= event.get_header("Solace-Topic")
+        if not topic:
+            return None
+        levels= topic.split("/")
+        try:
+            return levels[level]
+        except IndexError:
+            return None
+    return key_function
+
+
+class LaneJob:
+    __slots__ = ("function", "done", "result", "error")
+
+    def __init__(self, function:Callable):
+        self.function= function
+        self.done= Event()
+        self.result= None
+        self.error= None
+
+    def wait(self, timeout:float|None= None):
+        """Wait until the job ran and return what the function returned.
+
+        Raises:
+            Exception: The exception raised by the function, if any.
+        """
+        self.done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class LanePool:
+
+    def __init__(self, key:str|Callable, num_lanes:int= 8, lane_queue_size:int= 1000):
+        """
+        Args:
+            key (str | Callable): Header name whose value is the ordering key, or a function called with the event
+                                  that returns the key. Events without a key are spread over the lanes round robin.
+            num_lanes (int, optional): Number of lanes (threads). Defaults to 8.
+            lane_queue_size (int, optional): Maximum number of events waiting in a single lane. Defaults to 1000.
+        """
+        if num_lanes < 1:
+            raise ValueError("num_lanes must be at least 1.")
+
+        self.key_function= key if callable(key) else (lambda event: event.get_header(key))
+        self.num_lanes= num_lanes
+        self._queues= [Queue(maxsize= lane_queue_size) for _ in range(num_lanes)]
+        self._threads= list()
+        self._round_robin= itertools.count()
+
+    def lane_for(self, event)->int:
+        key= self.key_function(event)
+
+        if key is None or key == "":
+            return next(self._round_robin) % self.num_lanes
+
+        if isinstance(key, str):
+            key= key.encode("utf-8")
+        elif not isinstance(key, (bytes, bytearray)):
+            key= str(key).encode("utf-8")
+
+        #crc32 instead of hash() so a key maps to the same lane in every process
+        return zlib.crc32(key) % self.num_lanes
+
+    def start(self)->None:
+        for lane_queue in self._queues:
+            thread= Thread(target= self._run, args= (lane_queue,), daemon= True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self)->None:
+        """Finish the events already waiting in the lanes, then stop the lane threads."""
+        for lane_queue in self._queues:
+            lane_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads= list()
+
+    def submit(self, event, function:Callable)->LaneJob:
+        """Run function() on the lane of the event.
+
+        Returns:
+            LaneJob: Use job.wait() to wait for its result.
+        """
+        job= LaneJob(function)
+        self._queues[self.lane_for(event)].put(job)
+        return job
+
+    def depths(self)->list:
+        """Number of events waiting in each lane."""
+        return [lane_queue.qsize() for lane_queue in self._queues]
+
+    @staticmethod
+    def _run(lane_queue:Queue)->None:
+        while True:
+            job= lane_queue.get()
+            if job is None:
+                break
+            try:
+                job.result= job.function()
+            except Exception as e: #keeps the lane alive, wait() raises it in the waiting request
+                job.error= e
+            job.done.set()
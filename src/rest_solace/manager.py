@@ -1,14 +1,30 @@
 from .http_client import HttpClient
-from urllib.parse import urlsplit, urlunsplit
+from .semp_cache import SempCache
+from .provisioning import Plan, apply_plan, load_desired_state, plan_changes
+from .rest_setup import setup_steps, teardown_steps
+from .dag import merge_steps, run_steps
+from .exceptions import BulkOperationError, SetupError
+from .monitor import DEFAULT_QUEUE_FIELDS, StatsWatcher
+from .inventory import Inventory
+import asyncio
+import copy
+from typing import AsyncIterator, Iterator
+from urllib.parse import quote, urlencode, urlsplit, urlunsplit
 import warnings
 from warnings import *
 
 class Manager():
 
     config_base_path = "/SEMP/v2/config"
+
+    monitor_base_path = "/SEMP/v2/monitor"
+
+    action_base_path = "/SEMP/v2/action"
+
+    max_page_size = 1000 #largest 'count' sent to the broker by the paginator
     
     def __init__(self, user_name:str, password:str,
-                 host:str, semp_port:str= "8080", verify_ssl=False) -> None:
+                 host:str, semp_port:str= "8080", verify_ssl=False, cache:SempCache|None= None) -> None:
         """Class for creating a Manage object for communicating with a broker regarding management stuff.
 
         Args:
@@ -16,13 +32,28 @@ class Manager():
             password (str): Password for the username provided.
             host (str): Broker address (IPv4)
             SEMP_port (str): Management port used for management stuff on the broker side using Solace Element Management Protocol v2.
+            cache (SempCache | None, optional): Cache for objects fetched by name. 
+                                                Writes made through this Manager invalidate the objects they touch.
+                                                Defaults to None (every read goes to the broker).
         """
 
+        self.cache = cache
+
         self.http_client = HttpClient(host= host,
                                       port= semp_port,
                                       user_name= user_name,
                                       password= password,
                                       verify_ssl= verify_ssl)
+        self.http_client.write_listener = self._invalidate_cache
+
+    def _invalidate_cache(self, endpoint:str):
+        if self.cache is not None and endpoint.startswith(self.config_base_path):
+            self.cache.invalidate(endpoint[len(self.config_base_path):])
+
+    def get_cache_stats(self)->dict|None:
+        """Hit/miss statistics of the cache, None if the Manager has no cache."""
+
+        return self.cache.stats() if self.cache is not None else None
 
 
     #=====about functions===== (Finished)
@@ -102,6 +133,343 @@ class Manager():
         return res.json()
 
 
+    #=====pagination functions=====
+
+    def _collection_endpoint(self, collection_path:str, select:str= "*", where:str|None= None, 
+                             page_size:int= 100, opaquePassword:str|None= None, base_path:str|None= None)->str:
+        """Endpoint of the first page of a collection, with the query parameters url encoded."""
+
+        query= {"count": str(min(max(int(page_size), 1), self.max_page_size)), "select": select}
+
+        if where != None:
+            query["where"]= where
+
+        if opaquePassword != None:
+            query["opaquePassword"]= opaquePassword
+
+        base_path= self.config_base_path if base_path == None else base_path
+        return base_path + collection_path + "?" + urlencode(query, quote_via= quote, safe= ",*")
+
+    @staticmethod
+    def _next_page_endpoint(page:dict)->str|None:
+        """Endpoint of the page following this one, None if it is the last page."""
+
+        paging= page.get("meta", dict()).get("paging")
+        if paging == None:
+            return None
+
+        split= urlsplit(paging["nextPageUri"])
+        return urlunsplit(("", "", split.path, split.query, split.fragment))
+
+    @staticmethod
+    def _trim_page(page:dict, include_links:bool)->dict:
+        trimmed= {"data": page.get("data", list())}
+        if include_links:
+            trimmed["links"]= page.get("links", list())
+        return trimmed
+
+    def iterate_pages(self, collection_path:str, select:str= "*", where:str|None= None, 
+                      page_size:int= 100, opaquePassword:str|None= None,
+                      include_links:bool= False, base_path:str|None= None)->Iterator[dict]:
+        """Lazily fetch every page of a collection. The next page is only requested once the previous one has been consumed,
+        so memory use is bounded by the page size and not by the size of the collection.
+
+        Args:
+            collection_path (str): Path of the collection relative to the base path, for example "/msgVpns" or "/msgVpns/default/queues".
+            select (str, optional): Select only certain attributes to return. Defaults to "*".
+            where (str | None, optional): Filtering expressions. For more info, consult: https://docs.solace.com/Admin/SEMP/SEMP-Features.htm#Filtering
+            page_size (int, optional): Objects per page ('count'), capped at Manager.max_page_size. Defaults to 100.
+            opaquePassword (str | None, optional): Password to retrieve attributes with the opaque property.
+            include_links (bool, optional): Keep the 'links' list of each page. Defaults to False (links are dropped).
+            base_path (str | None, optional): SEMP base path. Defaults to the config API.
+
+        Yields:
+            dict: {"data": [...]} for each page, plus "links" when include_links is True.
+
+        Raises:
+            requests.HTTPError: If the broker returns an error for any page.
+        """
+
+        endpoint= self._collection_endpoint(collection_path, select, where, page_size, opaquePassword, base_path)
+
+        while endpoint != None:
+            res = self.http_client.http_get(endpoint= endpoint)
+            res.raise_for_status()
+            page = res.json()
+
+            endpoint= self._next_page_endpoint(page)
+            yield self._trim_page(page, include_links)
+
+    def iterate_objects(self, collection_path:str, select:str= "*", where:str|None= None, 
+                        page_size:int= 100, opaquePassword:str|None= None, base_path:str|None= None)->Iterator[dict]:
+        """Lazily fetch every object of a collection, one page at a time. Arguments are the same as iterate_pages().
+
+        Yields:
+            dict: Each object of the collection.
+        """
+
+        for page in self.iterate_pages(collection_path, select= select, where= where, page_size= page_size,
+                                       opaquePassword= opaquePassword, base_path= base_path):
+            yield from page["data"]
+
+    async def async_iterate_pages(self, collection_path:str, select:str= "*", where:str|None= None, 
+                                  page_size:int= 100, opaquePassword:str|None= None,
+                                  include_links:bool= False, base_path:str|None= None,
+                                  session= None)->AsyncIterator[dict]:
+        """Async version of iterate_pages(). 
+
+        Args:
+            session (aiohttp.ClientSession | None, optional): Session to make the requests with, 
+                                                              so many iterations can share connections.
+                                                              Defaults to a session opened for this iteration.
+        """
+
+        endpoint= self._collection_endpoint(collection_path, select, where, page_size, opaquePassword, base_path)
+
+        own_session= session == None
+        if own_session:
+            session= self.http_client.async_session()
+
+        try:
+            while endpoint != None:
+                async with session.get(self.http_client.base_url + endpoint) as res:
+                    res.raise_for_status()
+                    page = await res.json()
+
+                endpoint= self._next_page_endpoint(page)
+                yield self._trim_page(page, include_links)
+        finally:
+            if own_session:
+                await session.close()
+
+    async def async_iterate_objects(self, collection_path:str, select:str= "*", where:str|None= None, 
+                                    page_size:int= 100, opaquePassword:str|None= None, base_path:str|None= None,
+                                    session= None)->AsyncIterator[dict]:
+        """Async version of iterate_objects()."""
+
+        async for page in self.async_iterate_pages(collection_path, select= select, where= where, page_size= page_size,
+                                                   opaquePassword= opaquePassword, base_path= base_path, session= session):
+            for item in page["data"]:
+                yield item
+
+    def inventory(self, collection_path:str, fields, where:str|None= None, page_size:int|None= None,
+                  opaquePassword:str|None= None, base_path:str|None= None)->Inventory:
+        """Fetch some attributes of every object of a collection into a compact columnar table.
+        Only the given fields are requested from the broker, and each page is folded into the columns 
+        before the next one is fetched, so a large collection never exists as a list of dicts.
+
+        Args:
+            collection_path (str): Path of the collection, for example "/msgVpns/default/queues".
+            fields (str | Iterable[str]): Attributes to fetch, as a list or a comma separated string like "queueName,accessType".
+            where (str | None, optional): Filtering expressions. Defaults to None.
+            page_size (int | None, optional): Objects per page. Defaults to Manager.max_page_size.
+            opaquePassword (str | None, optional): Password to retrieve attributes with the opaque property.
+            base_path (str | None, optional): SEMP base path, for example Manager.monitor_base_path. Defaults to the config API.
+
+        Returns:
+            Inventory: One column per field. Use inventory.values(field), inventory.value_counts(field) or iterate over its rows.
+
+        Raises:
+            requests.HTTPError: If the broker returns an error for any page.
+        """
+
+        fields= [field.strip() for field in fields.split(",")] if isinstance(fields, str) else list(fields)
+        inventory= Inventory(fields)
+
+        for page in self.iterate_pages(collection_path, select= ",".join(inventory.fields), where= where,
+                                       page_size= self.max_page_size if page_size == None else page_size,
+                                       opaquePassword= opaquePassword, base_path= base_path):
+            inventory.extend(page["data"])
+
+        inventory.freeze()
+        return inventory
+
+    def queue_inventory(self, fields= ("queueName", "accessType", "ingressEnabled", "egressEnabled", "maxMsgSpoolUsage"),
+                        msgVpnName:str= "default", where:str|None= None, monitor:bool= False)->Inventory:
+        """Columnar table of the queues of a message VPN, see inventory().
+
+        Args:
+            fields (str | Iterable[str], optional): Attributes to fetch. Defaults to the name, access type, 
+                                                    ingress/egress state and spool quota.
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            where (str | None, optional): Filtering expressions, for example "queueName==orders*". Defaults to None.
+            monitor (bool, optional): Read the monitor API (for statistics like msgSpoolUsage) instead of the config API. Defaults to False.
+
+        Returns:
+            Inventory: One column per field.
+        """
+
+        return self.inventory(f"/msgVpns/{self._quote(msgVpnName)}/queues", fields, where= where,
+                              base_path= self.monitor_base_path if monitor else None)
+
+
+    #=====generic object functions=====
+
+    @staticmethod
+    def _quote(name:str)->str:
+        """Url encode an object name used in a path (topics contain '/', '>' and '*')."""
+        return quote(str(name), safe= "")
+
+    @staticmethod
+    def _is_not_found(res)->bool:
+        if res.status_code == 404:
+            return True
+        if res.status_code == 400: #some broker versions report missing objects as a 400 NOT_FOUND
+            try:
+                return res.json()["meta"]["error"]["status"] == "NOT_FOUND"
+            except (ValueError, KeyError, TypeError):
+                return False
+        return False
+
+    def get_object(self, object_path:str, select:str= "*", opaquePassword:str|None= None, 
+                   base_path:str|None= None)->dict|None:
+        """Fetch a single object with one GET by name.
+
+        Args:
+            object_path (str): Path of the object relative to the base path, with the names url encoded,
+                               for example "/msgVpns/default/queues/my_queue".
+            select (str, optional): Select only certain attributes to return. Defaults to "*".
+            opaquePassword (str | None, optional): Password to retrieve attributes with the opaque property.
+            base_path (str | None, optional): SEMP base path. Defaults to the config API.
+
+        Returns:
+            dict | None: The object's attributes, None if it does not exist.
+
+        Raises:
+            requests.HTTPError: If the broker returns an error other than 'not found'.
+        """
+
+        cached= self.cache is not None and base_path in (None, self.config_base_path)
+        if cached:
+            hit, data= self.cache.get(object_path, ("object", select, opaquePassword))
+            if hit:
+                return dict(data) if data != None else None
+
+        query= {"select": select}
+        if opaquePassword != None:
+            query["opaquePassword"]= opaquePassword
+
+        base_path= self.config_base_path if base_path == None else base_path
+        endpoint= base_path + object_path + "?" + urlencode(query, quote_via= quote, safe= ",*")
+
+        res = self.http_client.http_get(endpoint= endpoint)
+
+        if self._is_not_found(res):
+            data= None
+        else:
+            res.raise_for_status()
+            data= res.json()["data"]
+
+        if cached:
+            self.cache.put(object_path, ("object", select, opaquePassword), data)
+        return dict(data) if data != None else None
+
+    def object_exists(self, object_path:str, key_field:str, base_path:str|None= None)->bool:
+        """Returns True if the object exists. Only its key field is requested, so the check costs one small request.
+
+        Args:
+            object_path (str): Path of the object relative to the base path, see get_object().
+            key_field (str): Name attribute of the object type, for example "queueName".
+            base_path (str | None, optional): SEMP base path. Defaults to the config API.
+        """
+
+        return self.get_object(object_path, select= key_field, base_path= base_path) != None
+
+    def create_object(self, collection_path:str, attributes:dict, throw_exception:bool= True)->dict:
+        """Create an object in a collection of the config API.
+
+        Args:
+            collection_path (str): Path of the collection, for example "/msgVpns/default/queues".
+            attributes (dict): Attributes of the new object, including its name.
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        res = self.http_client.http_post(endpoint= self.config_base_path + collection_path, payload= attributes)
+
+        if throw_exception:
+            res.raise_for_status()
+        return res.json()
+
+    def update_object(self, object_path:str, attributes:dict, throw_exception:bool= True)->dict:
+        """Update some attributes of an object of the config API. Attributes missing from the request are left unchanged.
+
+        Args:
+            object_path (str): Path of the object, with the names url encoded.
+            attributes (dict): Attributes to change.
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        res = self.http_client.http_patch(endpoint= self.config_base_path + object_path, payload= attributes)
+
+        if throw_exception:
+            res.raise_for_status()
+        return res.json()
+
+    def delete_object(self, object_path:str, throw_exception:bool= True)->dict:
+        """Delete an object of the config API (along with the objects it contains).
+
+        Args:
+            object_path (str): Path of the object, with the names url encoded.
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        res = self.http_client.http_delete(endpoint= self.config_base_path + object_path)
+
+        if throw_exception:
+            res.raise_for_status()
+        return res.json()
+
+
+    async def _async_bulk_requests(self, session, requests:list, max_in_flight:int= 32, progress= None)->dict:
+        """Send many requests with at most 'max_in_flight' of them at the same time.
+
+        Args:
+            session (aiohttp.ClientSession): Session to send the requests with.
+            requests (list): (key, method, url, json payload or None, tolerated error status) tuples. 
+                             An error response with the tolerated SEMP status (like "ALREADY_EXISTS" or "NOT_FOUND")
+                             counts as a success.
+            max_in_flight (int, optional): Maximum number of requests at the same time. Defaults to 32.
+            progress (Callable | None, optional): Called as progress(done, total) after each request. Defaults to None.
+
+        Returns:
+            dict: {key: error} of the failed requests.
+        """
+
+        semaphore= asyncio.Semaphore(max(1, max_in_flight))
+        total= len(requests)
+        failed= dict()
+        done= 0
+
+        async def send(key, method:str, url:str, payload:dict|None, tolerated:str|None):
+            nonlocal done
+            async with semaphore:
+                try:
+                    async with session.request(method, url, json= payload) as res:
+                        if res.status >= 300:
+                            body= await res.json(content_type= None)
+                            error= body.get("meta", dict()).get("error") or dict()
+                            if error.get("status") != tolerated and not (tolerated == "NOT_FOUND" and res.status == 404):
+                                failed[key]= f"{res.status}: {error}"
+                except Exception as e:
+                    failed[key]= e
+
+            done += 1
+            if progress is not None:
+                progress(done, total)
+
+        await asyncio.gather(*(send(*request) for request in requests))
+        return failed
+
+
     #=====VPN functions===== (Pending)
 
 
@@ -168,40 +536,14 @@ class Manager():
             dict: list of pages
         """
 
-        endpoint = self.config_base_path+f"/msgVpns?count=100&select={select}"
-
-        if where != None:
-            endpoint+="&where={where}"
-
-        if opaquePassword != None:
-            endpoint+="&opaquePassword={opaquePassword}"
-
         data= list()
         links= list()
-        
-        res = self.http_client.http_get(endpoint= endpoint)
-        res.raise_for_status()
-        res = res.json()
-
-        data.extend(res["data"])
-        links.extend(res["links"])
-             
-        while True:
-            paging_url= res['meta'].get('paging')
-
-            if paging_url == None:
-                break
-            else:
-                split= urlsplit(paging_url['nextPageUri'])
-                endpoint= urlunsplit(("", "", split.path, split.query, split.fragment))
-
-                res = self.http_client.http_get(endpoint)
-                res.raise_for_status()
-                res = res.json()
-
-                data.extend(res["data"])
-                links.extend(res["links"])
-            
+
+        for page in self.iterate_pages("/msgVpns", select= select, where= where, page_size= self.max_page_size,
+                                       opaquePassword= opaquePassword, include_links= True):
+            data.extend(page["data"])
+            links.extend(page["links"])
+
         return {"data":data, "links":links}
 
     def list_message_vpns(self)->list:
@@ -211,10 +553,7 @@ class Manager():
             list: List of all the message VPNs.
         """
 
-        data = self.fetch_all_vpn_objects(select="msgVpnName")["data"]
-        names = [name["msgVpnName"] for name in data]
-
-        return names
+        return [vpn["msgVpnName"] for vpn in self.iterate_objects("/msgVpns", select= "msgVpnName", page_size= self.max_page_size)]
 
     def message_vpn_exists(self, msgVpnName:str)->bool:
         """Returns True if the message VPN specified exists, else False..
@@ -226,8 +565,12 @@ class Manager():
             bool: True if vpn exists else False.
         """
 
-        names= self.list_message_vpns()
-        return True if msgVpnName in names else False
+        return self.object_exists(f"/msgVpns/{self._quote(msgVpnName)}", "msgVpnName")
+
+    def lookup_message_vpn(self, msgVpnName:str, select:str= "*")->dict|None:
+        """Returns the attributes of the message VPN, None if it does not exist."""
+
+        return self.get_object(f"/msgVpns/{self._quote(msgVpnName)}", select= select)
 
     def create_message_vpn(self, msgVpnName:str, enabled:bool= True, 
                            maxMsgSpoolUsage:int= 1500,
@@ -319,6 +662,11 @@ class Manager():
             dict: requested data.
         """
         
+        if self.cache is not None:
+            hit, response= self.cache.get(f"/msgVpns/{msgVpnName}", ("response", select, opaquePassword))
+            if hit:
+                return copy.deepcopy(response) #the cached response is shared, callers get their own copy
+
         endpoint = self.config_base_path+f"/msgVpns/{msgVpnName}?select={select}"
 
         if opaquePassword != None:
@@ -328,7 +676,11 @@ class Manager():
         
         if throw_exception:
             res.raise_for_status()
-        return res.json()
+
+        response= res.json()
+        if self.cache is not None and res.ok:
+            self.cache.put(f"/msgVpns/{msgVpnName}", ("response", select, opaquePassword), copy.deepcopy(response))
+        return response
 
 
     def update_message_vpn(self, msgVpnName:str, update_attributes:dict,
@@ -396,50 +748,42 @@ class Manager():
 
     #client profile
 
-    def fetch_all_client_profiles(self, msgVpnName= "default", select= "*"):
+    def fetch_all_client_profiles(self, msgVpnName= "default", select= "*")->dict[list, list]:
+        """Uses pagination to fetch and compile a list of all client profile objects of a message VPN.
+
+        Args:
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            select (str, optional): selection query. Defaults to "*".
 
-        endpoint = self.config_base_path+f"/msgVpns/{msgVpnName}/clientProfiles?count=1&select={select}"
+        Returns:
+            dict: {"data": [...], "links": [...]}
+        """
 
         data= list()
         links= list()
-        
-        res = self.http_client.http_get(endpoint= endpoint)
-        res.raise_for_status()
-        res = res.json()
-
-
-        data.extend(res["data"])
-        links.extend(res["links"])
-             
-        while True:
-            paging_url= res['meta'].get('paging')
 
-            if paging_url == None:
-                break
-            else:
-                split= urlsplit(paging_url['nextPageUri'])
-                endpoint= urlunsplit(("", "", split.path, split.query, split.fragment))
+        for page in self.iterate_pages(f"/msgVpns/{msgVpnName}/clientProfiles", select= select, 
+                                       page_size= self.max_page_size, include_links= True):
+            data.extend(page["data"])
+            links.extend(page["links"])
 
-                res = self.http_client.http_get(endpoint)
-                res.raise_for_status()
-                res = res.json()
-
-                data.extend(res["data"])
-                links.extend(res["links"])
-            
         return {"data":data, "links":links}
 
     def list_all_client_profiles(self, msgVpnName= "default")->list:
 
-        data = self.fetch_all_client_profiles(select= "clientProfileName", msgVpnName= msgVpnName)["data"]
-        names = [name["clientProfileName"] for name in data]
-
-        return names
+        return [profile["clientProfileName"] for profile in 
+                self.iterate_objects(f"/msgVpns/{msgVpnName}/clientProfiles", select= "clientProfileName", page_size= self.max_page_size)]
 
     def client_profile_exists(self, msgVpnName, clientProfileName)->bool:
 
-        names= self.list_all_client_profiles(msgVpnName)
-        return True if clientProfileName in names else False
+        return self.object_exists(f"/msgVpns/{self._quote(msgVpnName)}/clientProfiles/{self._quote(clientProfileName)}", 
+                                  "clientProfileName")
+
+    def lookup_client_profile(self, clientProfileName:str, msgVpnName:str= "default", select:str= "*")->dict|None:
+        """Returns the attributes of the client profile, None if it does not exist."""
+
+        return self.get_object(f"/msgVpns/{self._quote(msgVpnName)}/clientProfiles/{self._quote(clientProfileName)}", 
+                               select= select)
 
     def update_client_profile(self, msgVpnName, clientProfileName= "default", 
                               allowGuaranteedMsgReceiveEnabled:bool= True,
@@ -587,6 +931,16 @@ class Manager():
             res.raise_for_status()
         return res.json()
 
+    def queue_exists(self, queueName:str, msgVpnName:str= "default")->bool:
+        """Returns True if the queue exists in the message VPN, else False."""
+
+        return self.object_exists(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}", "queueName")
+
+    def lookup_queue(self, queueName:str, msgVpnName:str= "default", select:str= "*")->dict|None:
+        """Returns the attributes of the queue, None if it does not exist."""
+
+        return self.get_object(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}", select= select)
+
     def subscribe_to_topic_on_queue(self, subscriptionTopic:str, queueName:str, 
                                     msgVpnName:str= "default", throw_exception:bool= True) -> dict:
         """Subscribe to a topic on a queue endpoint. 
@@ -615,6 +969,76 @@ class Manager():
             res.raise_for_status()
         return res.json()
 
+    def queue_subscription_exists(self, subscriptionTopic:str, queueName:str, msgVpnName:str= "default")->bool:
+        """Returns True if the queue is subscribed to the topic, else False (also if the queue does not exist)."""
+
+        return self.object_exists(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}"
+                                  f"/subscriptions/{self._quote(subscriptionTopic)}", "subscriptionTopic")
+
+    def iterate_queue_subscriptions(self, queueName:str, msgVpnName:str= "default")->Iterator[str]:
+        """Lazily list the topics a queue is subscribed to, one page at a time."""
+
+        for subscription in self.iterate_objects(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}/subscriptions",
+                                                 select= "subscriptionTopic", page_size= self.max_page_size):
+            yield subscription["subscriptionTopic"]
+
+    def sync_queue_subscriptions(self, queueName:str, topics, msgVpnName:str= "default", remove_missing:bool= True,
+                                 max_in_flight:int= 32, progress= None, throw_exception:bool= True)->dict:
+        """Make the subscriptions of a queue match a list of topics: subscribe to the missing ones 
+        and (optionally) remove the others, with many requests in flight at the same time.
+
+        Args:
+            queueName (str): Name of the queue.
+            topics (Iterable[str]): Topics the queue should be subscribed to.
+            msgVpnName (str, optional): Name of the VPN within which your queue exists. Defaults to "default".
+            remove_missing (bool, optional): Remove the subscriptions that are not in 'topics'. Defaults to True.
+            max_in_flight (int, optional): Maximum number of requests at the same time. Defaults to 32.
+            progress (Callable | None, optional): Called as progress(done, total) after each subscription added or removed.
+                                                  Defaults to None.
+            throw_exception (bool, optional): Raise BulkOperationError if some requests failed. Defaults to True.
+
+        Returns:
+            dict: {"added": int, "removed": int, "unchanged": int, "failed": {topic: error}}
+        """
+
+        return asyncio.run(self.async_sync_queue_subscriptions(queueName, topics, msgVpnName= msgVpnName,
+                                                               remove_missing= remove_missing, max_in_flight= max_in_flight,
+                                                               progress= progress, throw_exception= throw_exception))
+
+    async def async_sync_queue_subscriptions(self, queueName:str, topics, msgVpnName:str= "default", remove_missing:bool= True,
+                                             max_in_flight:int= 32, progress= None, throw_exception:bool= True)->dict:
+        """Async version of sync_queue_subscriptions()."""
+
+        collection_path= f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}/subscriptions"
+        collection_url= self.http_client.base_url + self.config_base_path + collection_path
+
+        desired= set(topics)
+        existing= set()
+
+        async with self.http_client.async_session() as session:
+            async for subscription in self.async_iterate_objects(collection_path, select= "subscriptionTopic",
+                                                                 page_size= self.max_page_size, session= session):
+                existing.add(subscription["subscriptionTopic"])
+
+            to_add= desired - existing
+            to_remove= existing - desired if remove_missing else set()
+
+            requests= [(topic, "POST", collection_url, 
+                        {"subscriptionTopic": topic, "queueName": queueName, "msgVpnName": msgVpnName}, "ALREADY_EXISTS")
+                       for topic in to_add]
+            requests+= [(topic, "DELETE", f"{collection_url}/{self._quote(topic)}", None, "NOT_FOUND") for topic in to_remove]
+
+            failed= await self._async_bulk_requests(session, requests, max_in_flight= max_in_flight, progress= progress)
+
+        self._invalidate_cache(self.config_base_path + collection_path)
+
+        result= {"added": len(to_add - failed.keys()), "removed": len(to_remove - failed.keys()),
+                 "unchanged": len(desired & existing), "failed": failed}
+
+        if throw_exception and failed:
+            raise BulkOperationError(f"{len(failed)} subscription changes failed on queue {queueName!r}.", result)
+        return result
+
 
     # RDP stuff
 
@@ -701,6 +1125,28 @@ class Manager():
             res.raise_for_status()
         return res.json()
     
+    def update_rest_consumer(self, restDeliveryPointName:str, restConsumerName:str, update_attributes:dict,
+                             msgVpnName:str= "default", throw_exception:bool= True)->dict:
+        """Update attributes of a REST consumer, for example {"outgoingConnectionCount": 8}. 
+        Any attribute missing from the request will be left unchanged.
+
+        For more info: 
+            https://docs.solace.com/API-Developer-Online-Ref-Documentation/swagger-ui/software-broker/config/index.html#/restDeliveryPoint/updateMsgVpnRestDeliveryPointRestConsumer
+
+        Args:
+            restDeliveryPointName (str): Name of the REST delivery point of the consumer.
+            restConsumerName (str): Name of the REST consumer.
+            update_attributes (dict): Attributes to change.
+            msgVpnName (str, optional): Name of the VPN of the REST delivery point. Defaults to "default".
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        return self.update_object(f"/msgVpns/{self._quote(msgVpnName)}/restDeliveryPoints/{self._quote(restDeliveryPointName)}"
+                                  f"/restConsumers/{self._quote(restConsumerName)}", update_attributes, throw_exception= throw_exception)
+
     def create_queue_binding(self, restDeliveryPointName:str, queueBindingName:str, postRequestTarget:str= "/",
                              requestTargetEvaluation:str= "none", msgVpnName:str= "default", throw_exception:bool= True) -> dict:
         """A Queue Binding for a REST Delivery Point attracts messages to be delivered to REST consumers.
@@ -737,6 +1183,30 @@ class Manager():
             res.raise_for_status()
         return res.json()
 
+    def rest_delivery_point_exists(self, restDeliveryPointName:str, msgVpnName:str= "default")->bool:
+        """Returns True if the REST delivery point exists in the message VPN, else False."""
+
+        return self.object_exists(f"/msgVpns/{self._quote(msgVpnName)}/restDeliveryPoints/{self._quote(restDeliveryPointName)}",
+                                  "restDeliveryPointName")
+
+    def lookup_rest_delivery_point(self, restDeliveryPointName:str, msgVpnName:str= "default", select:str= "*")->dict|None:
+        """Returns the attributes of the REST delivery point, None if it does not exist."""
+
+        return self.get_object(f"/msgVpns/{self._quote(msgVpnName)}/restDeliveryPoints/{self._quote(restDeliveryPointName)}",
+                               select= select)
+
+    def rest_consumer_exists(self, restConsumerName:str, restDeliveryPointName:str, msgVpnName:str= "default")->bool:
+        """Returns True if the REST consumer exists on the REST delivery point, else False."""
+
+        return self.object_exists(f"/msgVpns/{self._quote(msgVpnName)}/restDeliveryPoints/{self._quote(restDeliveryPointName)}"
+                                  f"/restConsumers/{self._quote(restConsumerName)}", "restConsumerName")
+
+    def queue_binding_exists(self, queueBindingName:str, restDeliveryPointName:str, msgVpnName:str= "default")->bool:
+        """Returns True if the queue is bound to the REST delivery point, else False."""
+
+        return self.object_exists(f"/msgVpns/{self._quote(msgVpnName)}/restDeliveryPoints/{self._quote(restDeliveryPointName)}"
+                                  f"/queueBindings/{self._quote(queueBindingName)}", "queueBindingName")
+
     def restart_rest_delivery_point(self, restDeliveryPointName:str, msgVpnName:str= "default"):
 
         endpoint = self.config_base_path+f"/msgVpns/{msgVpnName}/restDeliveryPoints/{restDeliveryPointName}"
@@ -748,13 +1218,195 @@ class Manager():
         self.http_client.http_patch(endpoint= endpoint, payload= {'enabled': True})
 
 
+    #=====monitor functions=====
+
+    def get_queue_stats(self, queueName:str, msgVpnName:str= "default", select:str= "*")->dict|None:
+        """Monitor data (spool usage, message counts, rates...) of a queue, None if the queue does not exist.
+
+        For more info: 
+            https://docs.solace.com/API-Developer-Online-Ref-Documentation/swagger-ui/software-broker/monitor/index.html#/queue/getMsgVpnQueue
+        """
+
+        return self.get_object(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}", 
+                               select= select, base_path= self.monitor_base_path)
+
+    def iterate_queue_stats(self, msgVpnName:str= "default", where:str|None= None, select:str= "*",
+                            page_size:int= 1000)->Iterator[dict]:
+        """Monitor data of many queues with one paginated query, instead of one request per queue.
+
+        Args:
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            where (str | None, optional): Filtering expressions, for example "queueName==orders*,msgSpoolUsage>0". Defaults to None.
+            select (str, optional): Attributes to return, for example "queueName,msgSpoolUsage,txMsgRate". Defaults to "*".
+            page_size (int, optional): Queues per page. Defaults to 1000.
+
+        Yields:
+            dict: Monitor data of each queue.
+        """
+
+        return self.iterate_objects(f"/msgVpns/{self._quote(msgVpnName)}/queues", select= select, where= where,
+                                    page_size= page_size, base_path= self.monitor_base_path)
+
+    def watch_queues(self, msgVpnName:str= "default", where:str|None= None, 
+                     fields:tuple= DEFAULT_QUEUE_FIELDS, interval:float= 1.0)->StatsWatcher:
+        """Create a watcher polling the monitor data of many queues and computing deltas and rates between polls.
+
+        Args:
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            where (str | None, optional): Filtering expressions selecting the queues. Defaults to None (every queue).
+            fields (tuple, optional): Numeric monitor attributes to watch. Defaults to DEFAULT_QUEUE_FIELDS.
+            interval (float, optional): Seconds between polls in watch(). Defaults to 1.0.
+
+        Returns:
+            StatsWatcher: Use watcher.watch() (or async_watch()) to iterate over the changed queues of each poll.
+        """
+
+        return StatsWatcher(self, f"/msgVpns/{self._quote(msgVpnName)}/queues", "queueName", fields,
+                            where= where, interval= interval, page_size= self.max_page_size)
+
+    def browse_queue_messages(self, queueName:str, msgVpnName:str= "default", select:str= "*",
+                              where:str|None= None, page_size:int= 100)->Iterator[dict]:
+        """Metadata of the messages spooled on a queue (msgId, spooledTime, contentSize, redeliveryCount...), 
+        fetched one page at a time. Message payloads are not part of the monitor API.
+
+        For more info: 
+            https://docs.solace.com/API-Developer-Online-Ref-Documentation/swagger-ui/software-broker/monitor/index.html#/queue/getMsgVpnQueueMsgs
+
+        Args:
+            queueName (str): Name of the queue.
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            select (str, optional): Attributes to return, for example "msgId,spooledTime". Defaults to "*".
+            where (str | None, optional): Filtering expressions, for example "redeliveryCount>3". Defaults to None.
+            page_size (int, optional): Messages per page. Defaults to 100.
+
+        Yields:
+            dict: Metadata of each message, oldest first.
+        """
+
+        return self.iterate_objects(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}/msgs",
+                                    select= select, where= where, page_size= page_size, base_path= self.monitor_base_path)
+
+
+    #=====action functions=====
+
+    def _action(self, action_path:str, payload:dict|None= None, throw_exception:bool= True)->dict:
+        """Run an action of the action API. Actions are sent as PUT requests to the path of the object followed by the action name."""
+
+        res = self.http_client.http_put(endpoint= self.action_base_path + action_path, payload= payload or dict())
+
+        if throw_exception:
+            res.raise_for_status()
+        return res.json()
+
+    def clear_queue_messages(self, queueName:str, msgVpnName:str= "default", throw_exception:bool= True)->dict:
+        """Delete every message spooled on a queue.
+
+        For more info: 
+            https://docs.solace.com/API-Developer-Online-Ref-Documentation/swagger-ui/software-broker/action/index.html#/queue/doMsgVpnQueueDeleteMsgs
+
+        Args:
+            queueName (str): Name of the queue.
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        return self._action(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}/deleteMsgs",
+                            throw_exception= throw_exception)
+
+    def delete_queue_message(self, msgId:int|str, queueName:str, msgVpnName:str= "default", throw_exception:bool= True)->dict:
+        """Delete one message spooled on a queue.
+
+        Args:
+            msgId (int | str): msgId of the message, as returned by browse_queue_messages().
+            queueName (str): Name of the queue.
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        return self._action(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}/msgs/{self._quote(msgId)}/delete",
+                            throw_exception= throw_exception)
+
+    def delete_queue_messages(self, queueName:str, msgIds, msgVpnName:str= "default", max_in_flight:int= 32,
+                              progress= None, throw_exception:bool= True)->dict:
+        """Delete many messages of a queue, with up to 'max_in_flight' requests at the same time.
+        Messages that are already gone count as deleted.
+
+        Args:
+            queueName (str): Name of the queue.
+            msgIds (Iterable): msgId of each message to delete.
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            max_in_flight (int, optional): Maximum number of requests at the same time. Defaults to 32.
+            progress (Callable | None, optional): Called as progress(done, total) after each request. Defaults to None.
+            throw_exception (bool, optional): Raise BulkOperationError if some deletes fail. Defaults to True.
+
+        Returns:
+            dict: {"deleted": count, "failed": {msgId: error}}
+
+        Raises:
+            BulkOperationError: If some deletes failed and throw_exception is True.
+        """
+
+        return asyncio.run(self.async_delete_queue_messages(queueName, msgIds, msgVpnName= msgVpnName, max_in_flight= max_in_flight,
+                                                            progress= progress, throw_exception= throw_exception))
+
+    async def async_delete_queue_messages(self, queueName:str, msgIds, msgVpnName:str= "default", max_in_flight:int= 32,
+                                          progress= None, throw_exception:bool= True)->dict:
+        """Async version of delete_queue_messages()."""
+
+        msgs_url= (self.http_client.base_url + self.action_base_path 
+                   + f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}/msgs")
+        requests= [(msgId, "PUT", f"{msgs_url}/{self._quote(msgId)}/delete", dict(), "NOT_FOUND") for msgId in dict.fromkeys(msgIds)]
+
+        async with self.http_client.async_session() as session:
+            failed= await self._async_bulk_requests(session, requests, max_in_flight= max_in_flight, progress= progress)
+
+        result= {"deleted": len(requests) - len(failed), "failed": failed}
+        if failed and throw_exception:
+            raise BulkOperationError(f"Failed to delete {len(failed)} of {len(requests)} messages of queue {queueName}.", result)
+        return result
+
+    def clear_queue_stats(self, queueName:str, msgVpnName:str= "default", throw_exception:bool= True)->dict:
+        """Reset the statistics (counters and rates of the monitor API) of a queue.
+
+        Args:
+            queueName (str): Name of the queue.
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        return self._action(f"/msgVpns/{self._quote(msgVpnName)}/queues/{self._quote(queueName)}/clearStats",
+                            throw_exception= throw_exception)
+
+    def clear_message_vpn_stats(self, msgVpnName:str= "default", throw_exception:bool= True)->dict:
+        """Reset the statistics of a message VPN.
+
+        Args:
+            msgVpnName (str, optional): Name of the message VPN. Defaults to "default".
+            throw_exception (bool, optional): Throw exception if the response code indicates an error. Defaults to True.
+
+        Returns:
+            dict: HTTP response converted to json format.
+        """
+
+        return self._action(f"/msgVpns/{self._quote(msgVpnName)}/clearStats", throw_exception= throw_exception)
+
+
     #miscellaneous 
 
     def auto_rest_messaging_setup_utility(self, msgVpnName:str, queueName:str, subscriptionTopic:str|None, 
                                           restDeliveryPointName:str, restConsumerName:str,
                                           remoteHost:str, remotePort:int, postRequestTarget='/',
                                           clientProfileName= "default", clientUsername= "default",
-                                          attempt_revert_if_error= True)->None:
+                                          attempt_revert_if_error= True)->dict:
         """
         A single utility function that automatically sets up a queue for you on your vpn of choice that is 
         ready to communicate with your consumer out of the box!!
@@ -766,101 +1418,178 @@ class Manager():
             * The default VPN is already set to messaging mode.
             * This function will update the UserProfile connected to the given user (which is usually the "default profile") to 
               allow guaranteed message sending and receive. IF you don't want that, update the user's profile beforehand.
+            * Objects that already exist are left as they are, so running it again is harmless.
     
-        It performs the following steps:
+        It performs the following steps (independent steps run at the same time):
+
+            1) Enable the user with the given user name on the given VPN (if not already enabled).
+            2) Update the user's client profile to allow sending and receiving persistent messages.
+            3) Create a new queue with input output enabled and permission to be used by consumers.
+            4) Have the queue subscribe to a topic (optional).
+            5) Create a new rest delivery point to manage rest message delivery.
+            6) Register your consumer to the rest delivery point.
+            7) Register a queue binding in your rest delivery point to bind your queue to your consumer.
+
+        To set up many queue/consumer pairs at once use auto_rest_messaging_setup(), and auto_rest_messaging_teardown_utility() to undo it.
+            
+        Args:
+            msgVpnName (str): The message VPN where your setup will be done. 
+            queueName (str|None): Name for new queue where the setup will be done. 
+            subscriptionTopic (str): Name of a topic you want your queue to subscribe to. This is recommended but optional. To skip pass None.
+            restDeliveryPointName (str): Name for your new rest delivery endpoint to manage rest message delivery.
+            restConsumerName (str): Assign a rest consumer to your rest delivery endpoint with the given name. This name is just for your reference.
+            remoteHost (str): IPv4 address at which your consumer is running at.
+            remotePort (int): The port that your consumer uses to listen for incoming messages.
+            postRequestTarget (str): The rest endpoint on the consumer side that will be targeted when sending the message.
+            clientProfileName (str, optional): Client Profiles are used to assign common configuration properties to clients that have been successfully authorized. Defaults to 'default'.
+            clientUsername (str, optional): A client is only authorized to connect to a Message VPN that is associated with a Client Username that the client has been assigned.
+            attempt_revert_if_error (bool, optional): If a step fails, revert the steps already performed, in reverse order. 
+                                                      Won't work if the errors were because your connection to your broker is lost.  
+
+        Returns:
+            dict: Step results, see auto_rest_messaging_setup().
+
+        Raises:
+            SetupError: If a step failed (after the revert).
+        """
+
+        return self.auto_rest_messaging_setup([{"msgVpnName": msgVpnName,
+                                                "queueName": queueName,
+                                                "subscriptionTopic": subscriptionTopic,
+                                                "restDeliveryPointName": restDeliveryPointName,
+                                                "restConsumerName": restConsumerName,
+                                                "remoteHost": remoteHost,
+                                                "remotePort": remotePort,
+                                                "postRequestTarget": postRequestTarget,
+                                                "clientProfileName": clientProfileName,
+                                                "clientUsername": clientUsername}],
+                                              rollback= attempt_revert_if_error)
+
+    def auto_rest_messaging_setup(self, setups:list, workers:int= 8, rollback:bool= True, 
+                                  throw_exception:bool= True)->dict:
+        """Run the setup of auto_rest_messaging_setup_utility() for many queue/consumer pairs at once.
+        Steps are run as soon as the steps they depend on are done, steps of different pairs in parallel,
+        and steps shared by several pairs (same client profile, same RDP...) only once.
+
+        Args:
+            setups (list): One dict per pair, with the arguments of auto_rest_messaging_setup_utility() 
+                           (except attempt_revert_if_error).
+            workers (int, optional): Maximum number of requests at the same time. Defaults to 8.
+            rollback (bool, optional): If a step fails, stop and revert every step performed by this call, 
+                                       in reverse dependency order. Defaults to True.
+            throw_exception (bool, optional): Raise SetupError if a step failed. Defaults to True.
+
+        Returns:
+            dict: {"completed": {step: result}, "failed": {step: exception}, "skipped": [steps],
+                   "rolled_back": [steps], "rollback_failed": {step: exception}}. 
+                  Steps are identified by tuples such as ("queue", msgVpnName, queueName).
 
-            record user settings
+        Raises:
+            SetupError: If a step failed and throw_exception is True.
+        """
 
-            enable user on the vpn (exit if this fails)
+        steps= merge_steps(step for setup in setups for step in setup_steps(self, **setup))
 
-            get user's profile
+        result= run_steps(steps, workers= workers, rollback= rollback)
 
-            record the profile's settings
+        if throw_exception and result["failed"]:
+            raise SetupError(f"REST messaging setup failed: {result['failed']}", result)
+        return result
 
-            update the profile to send and receive guaranteed messages (if it fails, revert user settings)
+    def auto_rest_messaging_teardown_utility(self, msgVpnName:str, queueName:str, restDeliveryPointName:str,
+                                             restConsumerName:str|None= None, subscriptionTopic:str|None= None,
+                                             delete_queue:bool= True, delete_rest_delivery_point:bool= True)->dict:
+        """Undo auto_rest_messaging_setup_utility(): delete the queue binding, the consumer, the RDP and the queue.
+        Objects that do not exist are skipped, so it can be run again after a partial failure.
+        The client username and profile are left as they are.
 
-            check if given queue exists
-            create a new queue (if it fails, revert last settings)
+        Args:
+            msgVpnName (str): The message VPN of the setup.
+            queueName (str): Queue of the setup.
+            restDeliveryPointName (str): REST delivery point of the setup.
+            restConsumerName (str | None, optional): Consumer to delete, needed if the RDP is kept. Defaults to None.
+            subscriptionTopic (str | None, optional): Subscription to delete, needed if the queue is kept. Defaults to None.
+            delete_queue (bool, optional): Delete the queue (and the messages in it). Defaults to True.
+            delete_rest_delivery_point (bool, optional): Delete the RDP (and every consumer and binding in it). Defaults to True.
 
-            subscribe to a topic on the queue
+        Returns:
+            dict: Step results, see auto_rest_messaging_teardown().
 
-            create RDP (if fails, delete the queue)
+        Raises:
+            SetupError: If a step failed.
+        """
 
-            register consumer (if fails, delete queue and rdp)
+        return self.auto_rest_messaging_teardown([{"msgVpnName": msgVpnName,
+                                                   "queueName": queueName,
+                                                   "restDeliveryPointName": restDeliveryPointName,
+                                                   "restConsumerName": restConsumerName,
+                                                   "subscriptionTopic": subscriptionTopic,
+                                                   "delete_queue": delete_queue,
+                                                   "delete_rest_delivery_point": delete_rest_delivery_point}])
 
-            register queue binding (if fails, delete queue and rdp)
+    def auto_rest_messaging_teardown(self, teardowns:list, workers:int= 8, throw_exception:bool= True)->dict:
+        """Run auto_rest_messaging_teardown_utility() for many setups at once, independent deletions in parallel.
 
+        Args:
+            teardowns (list): One dict per setup, with the arguments of auto_rest_messaging_teardown_utility().
+            workers (int, optional): Maximum number of requests at the same time. Defaults to 8.
+            throw_exception (bool, optional): Raise SetupError if a step failed. Defaults to True.
 
+        Returns:
+            dict: {"completed": {step: True if the object was deleted}, "failed": {step: exception}, "skipped": [steps]}
 
+        Raises:
+            SetupError: If a step failed and throw_exception is True.
+        """
 
+        steps= merge_steps(step for teardown in teardowns for step in teardown_steps(self, **teardown))
 
+        result= run_steps(steps, workers= workers)
 
-            1) Enable the user with the given user name on the given VPN (if not already enabled)
-            1) Updates user parameters to allow sending and receiving persistent messages.
-            1) Create a new queue with input output enabled and permission to be used by consumers.\n
-            2) Have the queue subscribe to a new topic (optional).\n
-            3) Create a new rest delivery endpoint to manage rest message delivery.\n
-            4) Register your consumer to the rest delivery endpoint.\n
-            5) Register a queue binding in your rest delivery endpoint to bind your queue to your consumer.\n
+        if throw_exception and result["failed"]:
+            raise SetupError(f"REST messaging teardown failed: {result['failed']}", result)
+        return result
+
+    def plan_desired_state(self, desired_state:dict|str, prune:bool= False, workers:int= 8,
+                           ignore_attributes:tuple= ())->Plan:
+        """Compare a desired state with the broker and return the changes needed to reach it, without applying them.
 
-            
         Args:
-            msgVpnName (str): The message VPN where your setup will be done. 
-            queueName (str|None): Name for new queue where the setup will be done. 
-            subscriptionTopic (str): Name of a topic you want your queue to subscribe to. This is recommended but optional. To skip pass None.
-            restDeliveryPointName (str): Name for your new rest delivery endpoint to manage rest message delivery.
-            restConsumerName (str): Assign a rest consumer to your rest delivery endpoint with the given name. This name is just for your reference.
-            remoteHost (str): IPv4 address at which your consumer is running at.
-            remotePort (int): The port that your consumer uses to listen for incoming messages.
-            postRequestTarget (str): The rest endpoint on the consumer side that will be targeted when sending the message.
-            clientProfileName (str, optional): Client Profiles are used to assign common configuration properties to clients that have been successfully authorized. Defaults to 'default'.
-            clientUsername (str, optional): A client is only authorized to connect to a Message VPN that is associated with a Client Username that the client has been assigned.
-            attempt_revert_if_error (bool, optional): Tries to the operations performed if one of them fails. 
-                                                      Won't work if the errors were because your connection to your broker is lost.  
+            desired_state (dict | str): Desired state (see rest_solace.provisioning), or the path of a YAML/JSON file holding it.
+            prune (bool, optional): Also delete the objects of the listed collections that are not in the desired state.
+                                    Message VPNs themselves are never deleted. Defaults to False.
+            workers (int, optional): Number of collections read at the same time. Defaults to 8.
+            ignore_attributes (tuple, optional): Attributes only set on creation and never compared (write only attributes
+                                                 such as passwords). Defaults to ().
+
+        Returns:
+            Plan: The changes. print() it to review them.
         """
 
+        if isinstance(desired_state, str):
+            desired_state= load_desired_state(desired_state)
 
-        #step0
-        self.update_client_username(msgVpnName= msgVpnName, 
-                                    clientUsername= clientUsername,
-                                    enabled= True)
+        return plan_changes(self, desired_state, prune= prune, workers= workers, ignore_attributes= ignore_attributes)
 
-        #step0 (get current client profile settings )
-        self.update_client_profile(msgVpnName= msgVpnName, clientProfileName= clientProfileName)
-        
+    def apply_desired_state(self, desired_state:dict|str|Plan, prune:bool= False, workers:int= 8,
+                            ignore_attributes:tuple= ())->dict:
+        """Make the broker match a desired state, with only the writes that are needed.
+        Changes are applied in dependency order, independent ones in parallel.
 
-        #step1
-        self.create_queue_endpoint(queueName=queueName, msgVpnName=msgVpnName, throw_exception= False)
+        Args:
+            desired_state (dict | str | Plan): Desired state, path of a YAML/JSON file, or a plan returned by plan_desired_state().
+            prune (bool, optional): See plan_desired_state(). Ignored when a plan is given. Defaults to False.
+            workers (int, optional): Maximum number of requests at the same time. Defaults to 8.
+            ignore_attributes (tuple, optional): See plan_desired_state(). Ignored when a plan is given. Defaults to ().
 
-        #step2
-        if subscriptionTopic != None:
-            self.subscribe_to_topic_on_queue(msgVpnName= msgVpnName,
-                                             subscriptionTopic= subscriptionTopic,
-                                             queueName= queueName)
-            
-        #step3
-        res = self.create_rest_delivery_point(msgVpnName= msgVpnName, 
-                                              restDeliveryPointName= restDeliveryPointName, 
-                                              throw_exception=False,
-                                              clientProfileName= clientProfileName)
-        #print(res)
-
-        #step4
-        res = self.specify_rest_consumer(msgVpnName= msgVpnName, 
-                                         restDeliveryPointName= restDeliveryPointName,
-                                        restConsumerName= restConsumerName,
-                                        remoteHost= remoteHost,
-                                        remotePort= remotePort, throw_exception= False)
-        
-        #print(res)
-        
-        # #step5
-        res = self.create_queue_binding(msgVpnName= msgVpnName,
-                                        restDeliveryPointName= restDeliveryPointName,
-                                        queueBindingName= queueName,
-                                        postRequestTarget= postRequestTarget, throw_exception= False)
-        
-        #print(res)
+        Returns:
+            dict: {"completed": {path: response}, "failed": {path: exception}, "skipped": [paths]}
+        """
+
+        plan= desired_state if isinstance(desired_state, Plan) else \
+              self.plan_desired_state(desired_state, prune= prune, workers= workers, ignore_attributes= ignore_attributes)
+
+        return apply_plan(self, plan, workers= workers)
 
     def update_parameters(self, user_name:str, password:str,
                         host:str, SEMP_port:str, verify_ssl=False):
@@ -870,4 +1599,8 @@ class Manager():
                                       user_name= user_name,
                                       password= password,
                                       verify_ssl= verify_ssl)
+        self.http_client.write_listener = self._invalidate_cache
+
+        if self.cache is not None: #could be a different broker
+            self.cache.clear()
     
@@ -0,0 +1,170 @@
+"""Per-route delivery metrics for the consumer server, with Prometheus text exposition.
+"""
+from bisect import bisect_left
+from threading import Lock
+import time
+
+
+DEFAULT_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Fixed bucket histogram. Not thread safe on its own, RouteMetrics guards it."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds:tuple):
+        self.bounds= tuple(bounds)
+        self.counts= [0]*(len(self.bounds) + 1) #last one is +Inf
+        self.sum= 0.0
+        self.count= 0
+
+    def observe(self, value:float)->None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self)->dict:
+        cumulative, buckets= 0, dict()
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            buckets[bound]= cumulative
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class RouteMetrics:
+    """Metrics of a single route. Everything a delivery changes is recorded under one (uncontended) lock acquisition."""
+
+    __slots__ = ("_lock", "received", "in_flight", "responses", "body_bytes",
+                 "callback_duration", "body_size")
+
+    def __init__(self, duration_buckets:tuple, size_buckets:tuple):
+        self._lock= Lock()
+        self.received= 0
+        self.in_flight= 0
+        self.responses= dict() #status code -> count
+        self.body_bytes= 0
+        self.callback_duration= Histogram(duration_buckets)
+        self.body_size= Histogram(size_buckets)
+
+    def start(self)->None:
+        with self._lock:
+            self.received += 1
+            self.in_flight += 1
+
+    def finish(self, status_code:int, body_bytes:int|None, callback_seconds:float|None)->None:
+        with self._lock:
+            self.in_flight -= 1
+            self.responses[status_code]= self.responses.get(status_code, 0) + 1
+            if body_bytes is not None:
+                self.body_bytes += body_bytes
+                self.body_size.observe(body_bytes)
+            if callback_seconds is not None:
+                self.callback_duration.observe(callback_seconds)
+
+    def snapshot(self)->dict:
+        with self._lock:
+            return {"received": self.received,
+                    "in_flight": self.in_flight,
+                    "responses": dict(self.responses),
+                    "body_bytes": self.body_bytes,
+                    "callback_duration_seconds": self.callback_duration.snapshot(),
+                    "body_size_bytes": self.body_size.snapshot()}
+
+
+class ConsumerMetrics:
+    """Collection of RouteMetrics keyed by route label.
+
+    The label is the registered route path (like "/orders/{region}"), "default" for deliveries handled by
+    callback_function / batch_callback, and "unrouted" for deliveries rejected before a handler was picked.
+    """
+
+    def __init__(self, duration_buckets:tuple= DEFAULT_DURATION_BUCKETS, size_buckets:tuple= DEFAULT_SIZE_BUCKETS):
+        self.duration_buckets= duration_buckets
+        self.size_buckets= size_buckets
+        self.started_at= time.monotonic()
+        self._routes= dict()
+        self._lock= Lock()
+
+    def route(self, label:str)->RouteMetrics:
+        route_metrics= self._routes.get(label)
+        if route_metrics is None:
+            with self._lock:
+                route_metrics= self._routes.setdefault(label, RouteMetrics(self.duration_buckets, self.size_buckets))
+        return route_metrics
+
+    def snapshot(self)->dict:
+        """Returns the metrics of every route, with the average receive rate (per second) since the consumer started."""
+        uptime= time.monotonic() - self.started_at
+        routes= {label: route_metrics.snapshot() for label, route_metrics in list(self._routes.items())}
+        for route_snapshot in routes.values():
+            route_snapshot["receive_rate"]= route_snapshot["received"]/uptime if uptime > 0 else 0.0
+        return {"uptime_seconds": uptime, "routes": routes}
+
+    def prometheus(self, ack_metrics:dict|None= None)->str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            ack_metrics (dict | None, optional): Snapshot of the consumer's AckMetrics to include. Defaults to None.
+        """
+        snapshot= self.snapshot()
+        lines= list()
+
+        def header(name:str, metric_type:str, help_text:str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        routes= snapshot["routes"]
+
+        header("rest_solace_consumer_received_total", "counter", "Deliveries received.")
+        for label, route in routes.items():
+            lines.append(f'rest_solace_consumer_received_total{{route="{_escape(label)}"}} {route["received"]}')
+
+        header("rest_solace_consumer_in_flight", "gauge", "Deliveries currently being handled.")
+        for label, route in routes.items():
+            lines.append(f'rest_solace_consumer_in_flight{{route="{_escape(label)}"}} {route["in_flight"]}')
+
+        header("rest_solace_consumer_responses_total", "counter", "Responses sent, by status code.")
+        for label, route in routes.items():
+            for code, count in sorted(route["responses"].items()):
+                lines.append(f'rest_solace_consumer_responses_total{{route="{_escape(label)}",code="{code}"}} {count}')
+
+        header("rest_solace_consumer_body_bytes_total", "counter", "Request body bytes received.")
+        for label, route in routes.items():
+            lines.append(f'rest_solace_consumer_body_bytes_total{{route="{_escape(label)}"}} {route["body_bytes"]}')
+
+        for name, key, help_text in (("rest_solace_consumer_callback_duration_seconds", "callback_duration_seconds",
+                                      "Time spent running the handler of a delivery."),
+                                     ("rest_solace_consumer_body_size_bytes", "body_size_bytes",
+                                      "Size of request bodies.")):
+            header(name, "histogram", help_text)
+            for label, route in routes.items():
+                histogram= route[key]
+                for bound, count in histogram["buckets"].items():
+                    le= "+Inf" if bound == float("inf") else _format_number(bound)
+                    lines.append(f'{name}_bucket{{route="{_escape(label)}",le="{le}"}} {count}')
+                lines.append(f'{name}_sum{{route="{_escape(label)}"}} {_format_number(histogram["sum"])}')
+                lines.append(f'{name}_count{{route="{_escape(label)}"}} {histogram["count"]}')
+
+        if ack_metrics:
+            for key in ("acked", "nacked", "dropped", "callback_errors", "processed", "queued", "batches", "duplicates"):
+                if key in ack_metrics:
+                    header(f"rest_solace_consumer_{key}_total", "counter", f"Acknowledgement counter '{key}'.")
+                    lines.append(f'rest_solace_consumer_{key}_total{{ack_mode="{ack_metrics["ack_mode"]}"}} {ack_metrics[key]}')
+            header("rest_solace_consumer_work_queue_depth", "gauge", "Events waiting on the work queue.")
+            lines.append(f'rest_solace_consumer_work_queue_depth {ack_metrics.get("work_queue_depth", 0)}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value:str)->str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value:float)->str:
+    value= float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
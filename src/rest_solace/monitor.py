@@ -0,0 +1,212 @@
+"""Polling of SEMP monitor statistics, with per-interval deltas and rates.
+
+A StatsWatcher fetches every matching object of a monitor collection in one paginated query
+(only the key field and the watched fields are selected), keeps the values in one array of
+floats per field, and reports only the objects whose values changed since the previous poll.
+"""
+from array import array
+from typing import AsyncIterator, Iterator
+import asyncio
+import math
+import time
+
+
+#monitor attributes of a queue watched by default
+DEFAULT_QUEUE_FIELDS = ("msgSpoolUsage", "spooledMsgCount", "spooledByteCount", "rxMsgRate", "txMsgRate", "bindCount")
+
+
+class StatsDelta:
+    """Row view of one object of a StatsWatcher poll. Values are read from the watcher's arrays on access,
+    so they are only valid until the next poll."""
+
+    __slots__ = ("name", "is_new", "_watcher", "_row")
+
+    def __init__(self, watcher, name:str, row:int, is_new:bool):
+        self.name= name
+        self.is_new= is_new  #first time the object was seen (deltas and rates are 0)
+        self._watcher= watcher
+        self._row= row
+
+    def __repr__(self):
+        return f"StatsDelta({self.name!r}, values={self.values})"
+
+    def _column_dict(self, columns:list)->dict:
+        return {field: column[self._row] for field, column in zip(self._watcher.fields, columns)}
+
+    @property
+    def values(self)->dict:
+        return self._column_dict(self._watcher._values)
+
+    @property
+    def deltas(self)->dict:
+        """Change of each field since the previous poll."""
+        return self._column_dict(self._watcher._deltas)
+
+    @property
+    def rates(self)->dict:
+        """Change of each field per second since the previous poll (for counters such as spooledMsgCount)."""
+        return self._column_dict(self._watcher._rates)
+
+    def value(self, field:str)->float:
+        return self._watcher._values[self._watcher._field_index[field]][self._row]
+
+    def delta(self, field:str)->float:
+        return self._watcher._deltas[self._watcher._field_index[field]][self._row]
+
+    def rate(self, field:str)->float:
+        return self._watcher._rates[self._watcher._field_index[field]][self._row]
+
+
+class StatsWatcher:
+    """Polls a monitor collection and computes deltas and rates of numeric fields."""
+
+    def __init__(self, manager, collection_path:str, key_field:str, fields:tuple,
+                 where:str|None= None, interval:float= 1.0, page_size:int= 1000):
+        """
+        Args:
+            manager (Manager): Manager of the broker.
+            collection_path (str): Monitor collection, for example "/msgVpns/default/queues".
+            key_field (str): Name attribute of the objects, for example "queueName".
+            fields (tuple): Numeric attributes to watch.
+            where (str | None, optional): Filtering expressions, for example "queueName==orders*". Defaults to None.
+            interval (float, optional): Seconds between polls in watch(). Defaults to 1.0.
+            page_size (int, optional): Objects per page. Defaults to 1000.
+        """
+        self.manager= manager
+        self.collection_path= collection_path
+        self.key_field= key_field
+        self.fields= tuple(fields)
+        self.where= where
+        self.interval= interval
+        self.page_size= page_size
+
+        self.select= ",".join((key_field,) + self.fields)
+
+        self._field_index= {field: column for column, field in enumerate(self.fields)}
+        self._rows= dict() #object name -> row in the arrays
+        self._names= list()
+        self._values= [array("d") for _ in self.fields]
+        self._deltas= [array("d") for _ in self.fields]
+        self._rates= [array("d") for _ in self.fields]
+
+        self._last_poll= None
+        self.removed= list() #names of the objects missing from the last poll
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _update(self, objects, now:float)->list:
+        elapsed= now - self._last_poll if self._last_poll is not None else 0.0
+        self._last_poll= now
+
+        changed= list()
+        seen= set()
+
+        for item in objects:
+            name= item[self.key_field]
+            seen.add(name)
+
+            row= self._rows.get(name)
+            is_new= row is None
+            if is_new:
+                row= len(self._names)
+                self._rows[name]= row
+                self._names.append(name)
+                for columns in (self._values, self._deltas, self._rates):
+                    for column in columns:
+                        column.append(0.0)
+
+            different= is_new
+            for column, field in enumerate(self.fields):
+                value= item.get(field)
+                value= float(value) if value is not None else math.nan
+
+                previous= self._values[column][row]
+                if is_new or previous != value:
+                    delta= 0.0 if is_new else value - previous
+                    self._values[column][row]= value
+                    self._deltas[column][row]= delta
+                    self._rates[column][row]= delta/elapsed if elapsed > 0 else 0.0
+                    different= different or not (math.isnan(value) and math.isnan(previous))
+                else:
+                    self._deltas[column][row]= 0.0
+                    self._rates[column][row]= 0.0
+
+            if different:
+                changed.append(StatsDelta(self, name, row, is_new))
+
+        self.removed= [name for name in self._rows if name not in seen]
+        if self.removed:
+            self._forget(self.removed)
+            changed= [StatsDelta(self, delta.name, self._rows[delta.name], delta.is_new) for delta in changed]
+
+        return changed
+
+    def _forget(self, names:list)->None:
+        """Drop rows of removed objects, compacting the arrays."""
+        removed= set(names)
+        keep= [row for row, name in enumerate(self._names) if name not in removed]
+
+        self._names= [self._names[row] for row in keep]
+        self._rows= {name: row for row, name in enumerate(self._names)}
+        for columns in (self._values, self._deltas, self._rates):
+            for position, column in enumerate(columns):
+                columns[position]= array("d", (column[row] for row in keep))
+
+    def poll(self)->list:
+        """Fetch the current values.
+
+        Returns:
+            list[StatsDelta]: Objects that are new or whose values changed since the previous poll.
+        """
+        objects= list(self.manager.iterate_objects(self.collection_path, select= self.select, where= self.where,
+                                                   page_size= self.page_size, base_path= self.manager.monitor_base_path))
+        return self._update(objects, time.monotonic())
+
+    async def async_poll(self, session= None)->list:
+        """Async version of poll()."""
+        objects= [item async for item in self.manager.async_iterate_objects(self.collection_path, select= self.select, where= self.where,
+                                                                           page_size= self.page_size,
+                                                                           base_path= self.manager.monitor_base_path,
+                                                                           session= session)]
+        return self._update(objects, time.monotonic())
+
+    def watch(self, polls:int|None= None)->Iterator[list]:
+        """Poll every 'interval' seconds and yield the changed objects of each poll (possibly an empty list).
+
+        Args:
+            polls (int | None, optional): Stop after this many polls. Defaults to None (forever).
+        """
+        next_poll= time.monotonic()
+        count= 0
+        while polls is None or count < polls:
+            yield self.poll()
+            count += 1
+
+            next_poll += self.interval
+            delay= next_poll - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_poll= time.monotonic() #fell behind, do not try to catch up
+
+    async def async_watch(self, polls:int|None= None)->AsyncIterator[list]:
+        """Async version of watch(). All polls share one HTTP session."""
+        async with self.manager.http_client.async_session() as session:
+            next_poll= time.monotonic()
+            count= 0
+            while polls is None or count < polls:
+                yield await self.async_poll(session= session)
+                count += 1
+
+                next_poll += self.interval
+                delay= next_poll - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    next_poll= time.monotonic()
+
+    def snapshot(self)->dict:
+        """Latest values of every object: {name: {field: value}}."""
+        return {name: {field: column[row] for field, column in zip(self.fields, self._values)}
+                for name, row in self._rows.items()}
@@ -0,0 +1,112 @@
+"""Running consumer callbacks in worker processes.
+
+CPU bound callbacks hold the GIL and stall every other delivery handled by the threaded server.
+ProcessOffloader runs them in a process pool instead. Bodies bigger than a threshold are handed over through
+shared memory instead of being pickled, and responses (str, bytes, tuples or ConsumerResponse) are sent back so request-reply keeps working.
+The callback has to be picklable (a function defined at module level).
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory, resource_tracker
+from http.client import HTTPMessage
+from typing import Callable
+import asyncio
+import inspect
+from .response import ConsumerResponse
+
+
+def _warm_up()->None:
+    pass
+
+
+def prewarmed_process_pool(max_workers:int)->ProcessPoolExecutor:
+    """Create a ProcessPoolExecutor and start all of its worker processes right away,
+    so the first deliveries do not pay for starting them."""
+    pool= ProcessPoolExecutor(max_workers= max_workers)
+    wait([pool.submit(_warm_up) for _ in range(max_workers)])
+    return pool
+
+
+class _WorkerKillFunction:
+    """Stand-in for kill_function inside a worker process. The call is replayed in the consumer process."""
+
+    def __init__(self):
+        self.called= False
+        self.return_value= None
+
+    def __call__(self, return_value= None):
+        self.called= True
+        self.return_value= return_value
+
+
+def _run_in_worker(callback_function:Callable, path:str, headers:dict,
+                   body:bytes|None, shm_name:str|None, body_size:int)->tuple:
+    from .consumer import ConsumerEvent #imported here to avoid a circular import at module load
+
+    if shm_name is not None:
+        shm= shared_memory.SharedMemory(name= shm_name)
+        #the consumer process owns (and unlinks) the segment. Attaching registers it with the
+        #resource tracker again, which would report it as leaked when the worker exits.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        try:
+            body= bytes(shm.buf[:body_size])
+        finally:
+            shm.close()
+
+    raw_headers= HTTPMessage() #keeps header lookups case insensitive like in the consumer process
+    for name, value in headers.items():
+        raw_headers[name]= value
+
+    kill_function= _WorkerKillFunction()
+    output= callback_function(event= ConsumerEvent(path, raw_headers, body), kill_function= kill_function)
+
+    if inspect.iscoroutine(output):
+        output= asyncio.run(output)
+
+    #only responses the consumer can use are sent back, memoryviews can not be pickled
+    output= ConsumerResponse.from_output(output)
+    if output is not None and isinstance(output.body, (memoryview, bytearray)):
+        output.body= bytes(output.body)
+
+    return output, kill_function.called, kill_function.return_value
+
+
+class ProcessOffloader:
+    """Callable with the consumer callback signature that runs the wrapped callback in a process pool."""
+
+    def __init__(self, executor:Executor, callback_function:Callable, shared_memory_threshold:int= 64*1024):
+        """
+        Args:
+            executor (Executor): Process pool used to run the callback.
+            callback_function (Callable): Picklable callback, called as callback_function(event, kill_function) in a worker.
+            shared_memory_threshold (int, optional): Bodies of at least this many bytes are passed through shared memory.
+                                                     Defaults to 64 KiB.
+        """
+        self.executor= executor
+        self.callback_function= callback_function
+        self.shared_memory_threshold= shared_memory_threshold
+
+    def __call__(self, event, kill_function:Callable):
+        content= event.content
+        shm= None
+
+        try:
+            if content and len(content) >= self.shared_memory_threshold: #empty shared memory blocks can not be created
+                shm= shared_memory.SharedMemory(create= True, size= len(content))
+                shm.buf[:len(content)]= content
+                future= self.executor.submit(_run_in_worker, self.callback_function, event.path, event.headers,
+                                             None, shm.name, len(content))
+            else:
+                future= self.executor.submit(_run_in_worker, self.callback_function, event.path, event.headers,
+                                             content, None, len(content))
+
+            output, kill_requested, kill_value= future.result()
+
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+        if kill_requested:
+            kill_function(kill_value)
+
+        return output
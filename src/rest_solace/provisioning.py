@@ -0,0 +1,292 @@
+"""Declarative provisioning: describe the objects that should exist, and let the library work out the writes.
+
+A desired state is a dict (or a YAML/JSON file) shaped like the SEMP config API. Each object is a dict of
+its attributes, and the objects it contains are lists under their collection name. Subscriptions can be
+given as plain topic strings:
+
+    {"msgVpns": [
+        {"msgVpnName": "dev", "enabled": True,
+         "queues": [{"queueName": "orders", "egressEnabled": True, "subscriptions": ["orders/>"]}],
+         "restDeliveryPoints": [
+            {"restDeliveryPointName": "orders-rdp", "clientProfileName": "default", "enabled": True,
+             "restConsumers": [{"restConsumerName": "svc", "remoteHost": "10.0.0.5", "remotePort": 9000}],
+             "queueBindings": [{"queueBindingName": "orders", "postRequestTarget": "/orders"}]}]}]}
+
+plan_changes() reads the current state (only selecting the attributes the desired state mentions) and returns
+the creates, updates and deletes needed. apply_plan() runs them in dependency order, independent changes in parallel.
+
+SEMP has no listing across parent objects (for example of the subscriptions of every queue of a VPN), so a
+collection is read once per parent object that exists: a GET by name when a single object of it is desired,
+else a paginated listing. Reconciling N existing queues that list subscriptions costs one listing of the queues
+plus N reads of subscriptions, run 'workers' at a time.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterator
+from urllib.parse import quote
+import json
+
+from .dag import Step, run_steps
+
+
+#name attribute of each collection that can be part of a desired state
+KEY_FIELDS = {"msgVpns": "msgVpnName",
+              "queues": "queueName",
+              "subscriptions": "subscriptionTopic",
+              "topicEndpoints": "topicEndpointName",
+              "clientProfiles": "clientProfileName",
+              "clientUsernames": "clientUsername",
+              "aclProfiles": "aclProfileName",
+              "restDeliveryPoints": "restDeliveryPointName",
+              "restConsumers": "restConsumerName",
+              "queueBindings": "queueBindingName"}
+
+#attributes naming another object of the same message VPN, which is created first when it is part of the plan
+REFERENCES = {"restDeliveryPoints": (("clientProfileName", "clientProfiles"),),
+              "clientUsernames": (("clientProfileName", "clientProfiles"), ("aclProfileName", "aclProfiles")),
+              "queueBindings": (("queueBindingName", "queues"),)}
+
+#collections with at most this many desired objects are read with GETs by name instead of a listing,
+#so a single queue of a VPN holding thousands does not cost a full listing
+LOOKUP_THRESHOLD = 1
+
+_MISSING = object()
+
+
+class Change:
+    """A single write of a plan."""
+
+    __slots__ = ("action", "path", "attributes", "previous", "depends_on")
+
+    def __init__(self, action:str, path:str, attributes:dict|None= None,
+                 previous:dict|None= None, depends_on:tuple= ()):
+        self.action= action          #"create", "update" or "delete"
+        self.path= path              #object path relative to the config API, names url encoded
+        self.attributes= attributes  #create: attributes of the object, update: attributes that change
+        self.previous= previous      #update: current values of the changed attributes
+        self.depends_on= depends_on  #paths of the changes that must be applied first
+
+    @property
+    def collection_path(self)->str:
+        return self.path.rsplit("/", 1)[0]
+
+    def __repr__(self):
+        return f"Change({self.action!r}, {self.path!r})"
+
+    def __str__(self):
+        if self.action == "create":
+            return f"+ {self.path}"
+        if self.action == "delete":
+            return f"- {self.path}"
+        details= ", ".join(f"{name}: {self.previous.get(name)!r} -> {value!r}" for name, value in self.attributes.items())
+        return f"~ {self.path} ({details})"
+
+
+class Plan:
+    """Changes needed to reach a desired state. Printing it lists them."""
+
+    def __init__(self, changes:list):
+        self.changes= changes
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __iter__(self)->Iterator[Change]:
+        return iter(self.changes)
+
+    def __str__(self):
+        return "\n".join(str(change) for change in self.changes) if self.changes else "No changes."
+
+    def summary(self)->dict:
+        counts= {"create": 0, "update": 0, "delete": 0}
+        for change in self.changes:
+            counts[change.action] += 1
+        return counts
+
+
+def load_desired_state(path:str)->dict:
+    """Load a desired state from a JSON file, or a YAML file (needs PyYAML).
+
+    Raises:
+        ImportError: If the file is not JSON and PyYAML is not installed.
+    """
+    with open(path, "r", encoding= "utf-8") as file:
+        if path.endswith(".json"):
+            return json.load(file)
+
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("Loading YAML desired states needs PyYAML: pip install pyyaml") from e
+        return yaml.safe_load(file)
+
+
+def _parse_item(collection:str, item, parent_path:str)->tuple:
+    """Returns (name, object path, attributes, {child collection: items})."""
+    key_field= KEY_FIELDS.get(collection)
+    if key_field is None:
+        raise ValueError(f"Unsupported collection in desired state: {collection!r}")
+
+    if isinstance(item, str):
+        item= {key_field: item}
+    if key_field not in item:
+        raise ValueError(f"Object of {parent_path}/{collection} has no {key_field!r}: {item!r}")
+
+    attributes= dict()
+    children= dict()
+    for name, value in item.items():
+        if name in KEY_FIELDS and isinstance(value, list):
+            children[name]= value
+        else:
+            attributes[name]= value
+
+    name= item[key_field]
+    return name, f"{parent_path}/{collection}/{quote(str(name), safe= '')}", attributes, children
+
+
+def _dependencies(collection:str, path:str, attributes:dict)->tuple:
+    parent_path= path.rsplit("/", 2)[0]
+    dependencies= [parent_path] if parent_path else list()
+
+    vpn_path= "/".join(path.split("/")[:3])
+    for attribute, referenced_collection in REFERENCES.get(collection, ()):
+        if attributes.get(attribute):
+            dependencies.append(f"{vpn_path}/{referenced_collection}/{quote(str(attributes[attribute]), safe= '')}")
+
+    return tuple(dependencies)
+
+
+def _read_collection(manager, parent_path:str, collection:str, items:list, prune:bool)->dict:
+    """Current objects of a collection, keyed by name, with only the attributes the desired state mentions
+    (and, when pruning, the attributes naming other objects, see _order_deletes())."""
+    key_field= KEY_FIELDS[collection]
+
+    selected= {key_field}
+    if prune:
+        selected.update(attribute for attribute, _ in REFERENCES.get(collection, ()))
+    names= list()
+    for item in items:
+        name, _, attributes, _= _parse_item(collection, item, parent_path)
+        selected.update(attributes)
+        names.append(name)
+    select= ",".join(sorted(selected))
+
+    if not prune and len(names) <= LOOKUP_THRESHOLD:
+        current= dict()
+        for name in names:
+            found= manager.get_object(f"{parent_path}/{collection}/{quote(str(name), safe= '')}", select= select)
+            if found is not None:
+                current[name]= found
+        return current
+
+    return {found[key_field]: found for found in
+            manager.iterate_objects(f"{parent_path}/{collection}", select= select, page_size= manager.max_page_size)}
+
+
+def plan_changes(manager, desired_state:dict, prune:bool= False, workers:int= 8,
+                 ignore_attributes:tuple= ())->Plan:
+    """Compare a desired state with the broker and return the changes needed to reach it.
+
+    Args:
+        manager (Manager): Manager of the broker.
+        desired_state (dict): Desired state, see the module documentation.
+        prune (bool, optional): Also delete the objects of the listed collections that are not in the desired state.
+                                Message VPNs themselves are never deleted. Defaults to False.
+        workers (int, optional): Number of collections read at the same time. Defaults to 8.
+        ignore_attributes (tuple, optional): Attributes that are only set on creation, never compared.
+                                             Write only attributes (passwords...) are not returned by the broker,
+                                             so they would otherwise be updated on every run. Defaults to ().
+
+    Returns:
+        Plan: The changes, parents before the objects they contain.
+    """
+    changes= list()
+
+    #(parent path, parent exists on the broker, collection, desired items), one tree level at a time
+    level= [("", True, collection, items) for collection, items in desired_state.items()]
+
+    with ThreadPoolExecutor(max_workers= max(1, workers)) as executor:
+        while level:
+            reads= {position: executor.submit(_read_collection, manager, parent_path, collection, items,
+                                              prune and parent_path != "")
+                    for position, (parent_path, parent_exists, collection, items) in enumerate(level) if parent_exists}
+
+            next_level= list()
+            for position, (parent_path, parent_exists, collection, items) in enumerate(level):
+                current= reads[position].result() if parent_exists else dict()
+                desired_names= set()
+
+                for item in items:
+                    name, path, attributes, children= _parse_item(collection, item, parent_path)
+                    desired_names.add(name)
+                    existing= current.get(name)
+
+                    if existing is None:
+                        changes.append(Change("create", path, attributes,
+                                              depends_on= _dependencies(collection, path, attributes)))
+                    else:
+                        different= {attribute: value for attribute, value in attributes.items()
+                                    if attribute not in ignore_attributes and existing.get(attribute, _MISSING) != value}
+                        if different:
+                            previous= {attribute: existing.get(attribute) for attribute in different}
+                            changes.append(Change("update", path, different, previous,
+                                                  depends_on= _dependencies(collection, path, attributes)))
+
+                    for child_collection, child_items in children.items():
+                        next_level.append((path, existing is not None, child_collection, child_items))
+
+                if prune and parent_exists and parent_path:
+                    for name in current.keys() - desired_names:
+                        changes.append(Change("delete", f"{parent_path}/{collection}/{quote(str(name), safe= '')}",
+                                              previous= current[name]))
+
+            level= next_level
+
+    _order_deletes(changes)
+    return Plan(changes)
+
+
+def _order_deletes(changes:list)->None:
+    """Make each delete wait for the updates and deletes of the objects that still name the deleted object
+    (a client profile is only deleted once the usernames using it have been moved off it or deleted)."""
+    referencing= dict() #referenced object path -> paths of the changes moving off it
+    for change in changes:
+        if change.action == "create" or not change.previous:
+            continue
+
+        collection= change.path.split("/")[-2]
+        vpn_path= "/".join(change.path.split("/")[:3])
+        for attribute, referenced_collection in REFERENCES.get(collection, ()):
+            name= change.previous.get(attribute)
+            if name:
+                referenced_path= f"{vpn_path}/{referenced_collection}/{quote(str(name), safe= '')}"
+                referencing.setdefault(referenced_path, list()).append(change.path)
+
+    for change in changes:
+        if change.action == "delete" and change.path in referencing:
+            change.depends_on= tuple(dict.fromkeys(change.depends_on + tuple(referencing[change.path])))
+
+
+def _apply_change(manager, change:Change)->dict:
+    if change.action == "create":
+        return manager.create_object(change.collection_path, change.attributes)
+    if change.action == "update":
+        return manager.update_object(change.path, change.attributes)
+    return manager.delete_object(change.path)
+
+
+def apply_plan(manager, plan:Plan, workers:int= 8)->dict:
+    """Apply the changes of a plan. A change starts once the changes it depends on are applied,
+    changes that do not depend on each other are applied in parallel.
+
+    Args:
+        manager (Manager): Manager of the broker.
+        plan (Plan): Plan returned by plan_changes().
+        workers (int, optional): Maximum number of requests at the same time. Defaults to 8.
+
+    Returns:
+        dict: {"completed": {path: response}, "failed": {path: exception}, "skipped": [paths]}
+              A change is skipped when a change it depends on failed.
+    """
+    steps= [Step(change.path, partial(_apply_change, manager, change), change.depends_on) for change in plan]
+    return run_steps(steps, workers= workers)
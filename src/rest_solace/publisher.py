@@ -327,6 +327,54 @@ class MessagingPublisher():
             return {"status_code":res.status_code, "headers":res.headers, 
                     "content":res.content, 'timeout':False}
 
+    def raw_message(self, destination:str, message:bytes|str, headers:dict|None= None,
+                    timeout:int|None= 120, throw_exception:bool= False)->dict:
+        """Publish a message body as is (not json encoded) with your own headers.
+        Used to send binary payloads, or to replay captured messages with their original headers.
+
+        Args:
+            destination (str): Either "/QUEUE/<queue name>" or "/TOPIC/<topic string>".
+            message (bytes | str): The message body. A str is sent utf-8 encoded.
+            headers (dict | None, optional): Message headers (like Content-Type, Solace-Delivery-Mode, Solace-Correlation-ID).
+                                             Defaults to None, which sends an application/octet-stream direct message.
+            timeout (str | None, optional): http/https request timeout set on the client side. Defaults to 120.
+            throw_exception (bool, optional): Throw exception incase request error code indicates an error or timeout has been reached.
+                                              Defaults to False.
+
+        Raises:
+            ValueError: destination does not start with "/QUEUE/" or "/TOPIC/".
+            HTTPError: Return code for request indicates an error
+
+        Returns:
+            dict: Dictionary containing request information and {'timeout':False}.
+                  Incase timeout is reached, returned dictionary only contains {'timeout':True}.
+        """
+
+        if not destination.startswith(("/QUEUE/", "/TOPIC/")):
+            raise ValueError(f"destination must start with '/QUEUE/' or '/TOPIC/', got '{destination}'.")
+
+        if headers is None:
+            headers = {'Content-Type': 'application/octet-stream',
+                       'Solace-Delivery-Mode': 'direct'}
+
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+
+        res = None
+        try:
+            res = self.http_client.http_post_raw(endpoint= destination, data= message, headers= headers, timeout=timeout)
+        except ReadTimeout as e:
+            if throw_exception == True:
+                raise e
+            else:
+                return {'timeout':True}
+
+        if res != None:
+            if throw_exception:
+                res.raise_for_status()
+            return {"status_code":res.status_code, "headers":res.headers,
+                    "content":res.content, 'timeout':False}
+
     async def async_direct_message_to_queue(self, queue_name:str, message:str, 
                                             reply_to_queue:str|None= None, reply_for_topic:str|None= None, 
                                             timeout:int|None= 120, throw_exception:bool= False)->dict:
@@ -0,0 +1,84 @@
+"""Responses returned by consumer callbacks.
+
+A callback can return:
+    1) a str: sent as a text/plain response (the original behaviour).
+    2) bytes, bytearray or memoryview: sent as is (no copy, no re-encoding) as application/octet-stream.
+    3) a (status_code, headers, body) tuple, with headers a dict (or None) and body any of the above.
+    4) a ConsumerResponse.
+Anything else gives the default response.
+"""
+
+
+DEFAULT_RESPONSE_MESSAGE = "Message Received!!"
+
+TEXT_CONTENT_TYPE = "text/plain"
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+
+class ConsumerResponse:
+    """Response of a consumer callback, with its status code and extra headers.
+
+    Example:
+        return ConsumerResponse(protobuf_reply.SerializeToString(), content_type= "application/x-protobuf")
+    """
+
+    __slots__ = ("body", "status_code", "headers", "content_type")
+
+    def __init__(self, body:str|bytes|bytearray|memoryview= DEFAULT_RESPONSE_MESSAGE, status_code:int= 200,
+                 headers:dict|None= None, content_type:str|None= None):
+        """
+        Args:
+            body (str | bytes | bytearray | memoryview, optional): Response body. Defaults to the default response message.
+            status_code (int, optional): HTTP status. Anything but 2xx makes the broker redeliver the message. Defaults to 200.
+            headers (dict | None, optional): Extra response headers. Defaults to None.
+            content_type (str | None, optional): Content-Type of the body. Defaults to None, which uses the Content-Type
+                                                 from headers if there is one, else text/plain for a str body and
+                                                 application/octet-stream for a binary body.
+        """
+        self.body= body
+        self.status_code= status_code
+        self.headers= headers
+        self.content_type= content_type
+
+    def __repr__(self):
+        return f"ConsumerResponse(status_code={self.status_code}, content_type={self.get_content_type()!r}, length={len(self.encoded_body())})"
+
+    @classmethod
+    def from_output(cls, output)->"ConsumerResponse|None":
+        """Convert a callback return value into a ConsumerResponse. Returns None for values that are not a response."""
+        if isinstance(output, cls):
+            return output
+        if isinstance(output, (str, bytes, bytearray, memoryview)):
+            return cls(output)
+        if isinstance(output, tuple) and len(output) == 3 and isinstance(output[0], int):
+            status_code, headers, body= output
+            return cls(body if body is not None else b"", status_code= status_code, headers= headers)
+        return None
+
+    def encoded_body(self)->bytes|bytearray|memoryview:
+        """Body ready to be written to the socket. Only str bodies are encoded, binary bodies are used without a copy."""
+        if isinstance(self.body, str):
+            return self.body.encode("utf-8")
+        return self.body
+
+    def get_content_type(self)->str:
+        if self.content_type is not None:
+            return self.content_type
+        if self.headers:
+            for name, value in self.headers.items():
+                if name.lower() == "content-type":
+                    return value
+        return TEXT_CONTENT_TYPE if isinstance(self.body, str) else BINARY_CONTENT_TYPE
+
+    def extra_headers(self)->list:
+        """Headers of the response other than Content-Type and Content-Length, as (name, value) pairs."""
+        if not self.headers:
+            return []
+        return [(name, str(value)) for name, value in self.headers.items()
+                if name.lower() not in ("content-type", "content-length")]
+
+
+def is_response(output)->bool:
+    """True if a callback return value is used as the response (see ConsumerResponse.from_output())."""
+    return ConsumerResponse.from_output(output) is not None
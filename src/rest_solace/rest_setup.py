@@ -0,0 +1,168 @@
+"""Steps of the REST messaging setup and teardown done by Manager.auto_rest_messaging_setup() and
+Manager.auto_rest_messaging_teardown(), run through rest_solace.dag.
+
+Every step checks the broker before writing, so running a setup twice does nothing the second time,
+and returns what it changed so a rollback only reverts its own writes.
+
+Setup steps of one queue/consumer pair and their dependencies:
+
+    enable client username -> allow guaranteed messaging on client profile -> create RDP -> create REST consumer
+    create queue -> subscribe queue to topic                                       \\-> create queue binding (also after the queue)
+"""
+from functools import partial
+from urllib.parse import quote
+
+from .dag import Step
+
+
+def _quote(name)->str:
+    return quote(str(name), safe= "")
+
+
+def _ensure_attributes(manager, object_path:str, attributes:dict)->dict|None:
+    """Update the attributes that differ. Returns their previous values, None if nothing changed."""
+    current= manager.get_object(object_path, select= ",".join(attributes))
+    if current is None:
+        raise LookupError(f"{object_path} does not exist.")
+
+    previous= {name: current.get(name) for name, value in attributes.items() if current.get(name) != value}
+    if not previous:
+        return None
+
+    manager.update_object(object_path, {name: attributes[name] for name in previous})
+    return previous
+
+
+def _restore_attributes(manager, object_path:str, previous:dict|None)->None:
+    if previous:
+        manager.update_object(object_path, previous)
+
+
+def _ensure_object(manager, collection_path:str, key_field:str, attributes:dict)->bool:
+    """Create the object if it does not exist. Returns True if it was created."""
+    if manager.object_exists(f"{collection_path}/{_quote(attributes[key_field])}", key_field):
+        return False
+
+    manager.create_object(collection_path, attributes)
+    return True
+
+
+def _delete_created(manager, object_path:str, created:bool)->None:
+    if created:
+        manager.delete_object(object_path)
+
+
+def _delete_if_exists(manager, object_path:str, key_field:str)->bool:
+    """Returns True if the object existed and was deleted."""
+    if not manager.object_exists(object_path, key_field):
+        return False
+
+    manager.delete_object(object_path)
+    return True
+
+
+def setup_steps(manager, msgVpnName:str, queueName:str, subscriptionTopic:str|None,
+                restDeliveryPointName:str, restConsumerName:str, remoteHost:str, remotePort:int,
+                postRequestTarget:str= "/", clientProfileName:str= "default", clientUsername:str= "default")->list:
+    """Steps setting up one queue delivered to one REST consumer. Keys are tuples naming the object,
+    so steps shared by several setups (same profile, same RDP...) can be merged."""
+
+    vpn_path= f"/msgVpns/{_quote(msgVpnName)}"
+    username_path= f"{vpn_path}/clientUsernames/{_quote(clientUsername)}"
+    profile_path= f"{vpn_path}/clientProfiles/{_quote(clientProfileName)}"
+    queue_path= f"{vpn_path}/queues/{_quote(queueName)}"
+    rdp_path= f"{vpn_path}/restDeliveryPoints/{_quote(restDeliveryPointName)}"
+
+    username_key= ("clientUsername", msgVpnName, clientUsername)
+    profile_key= ("clientProfile", msgVpnName, clientProfileName)
+    queue_key= ("queue", msgVpnName, queueName)
+    rdp_key= ("restDeliveryPoint", msgVpnName, restDeliveryPointName)
+    consumer_key= ("restConsumer", msgVpnName, restDeliveryPointName, restConsumerName)
+
+    steps= [
+        Step(username_key,
+             partial(_ensure_attributes, manager, username_path, {"enabled": True}),
+             undo= partial(_restore_attributes, manager, username_path)),
+
+        Step(profile_key,
+             partial(_ensure_attributes, manager, profile_path, {"allowGuaranteedMsgReceiveEnabled": True, #required for queue binding to work
+                                                                 "allowGuaranteedMsgSendEnabled": True}),
+             depends_on= (username_key,),
+             undo= partial(_restore_attributes, manager, profile_path)),
+
+        Step(queue_key,
+             partial(_ensure_object, manager, f"{vpn_path}/queues", "queueName",
+                     {"msgVpnName": msgVpnName, "queueName": queueName, "ingressEnabled": True, "egressEnabled": True,
+                      "permission": "consume", "respectTtlEnabled": True}),
+             undo= partial(_delete_created, manager, queue_path)),
+
+        Step(rdp_key,
+             partial(_ensure_object, manager, f"{vpn_path}/restDeliveryPoints", "restDeliveryPointName",
+                     {"restDeliveryPointName": restDeliveryPointName, "msgVpnName": msgVpnName, "enabled": True,
+                      "service": "REST", "vendor": "Custom", "clientProfileName": clientProfileName}),
+             depends_on= (profile_key,),
+             undo= partial(_delete_created, manager, rdp_path)),
+
+        Step(consumer_key,
+             partial(_ensure_object, manager, f"{rdp_path}/restConsumers", "restConsumerName",
+                     {"restDeliveryPointName": restDeliveryPointName, "msgVpnName": msgVpnName,
+                      "restConsumerName": restConsumerName, "remoteHost": remoteHost, "remotePort": remotePort,
+                      "enabled": True, "tlsEnabled": False}),
+             depends_on= (rdp_key,),
+             undo= partial(_delete_created, manager, f"{rdp_path}/restConsumers/{_quote(restConsumerName)}")),
+
+        Step(("queueBinding", msgVpnName, restDeliveryPointName, queueName),
+             partial(_ensure_object, manager, f"{rdp_path}/queueBindings", "queueBindingName",
+                     {"restDeliveryPointName": restDeliveryPointName, "queueBindingName": queueName,
+                      "postRequestTarget": postRequestTarget, "gatewayReplaceTargetAuthorityEnabled": False,
+                      "msgVpnName": msgVpnName, "requestTargetEvaluation": "none"}),
+             depends_on= (rdp_key, queue_key, consumer_key),
+             undo= partial(_delete_created, manager, f"{rdp_path}/queueBindings/{_quote(queueName)}")),
+    ]
+
+    if subscriptionTopic != None:
+        steps.append(Step(("subscription", msgVpnName, queueName, subscriptionTopic),
+                          partial(_ensure_object, manager, f"{queue_path}/subscriptions", "subscriptionTopic",
+                                  {"subscriptionTopic": subscriptionTopic, "queueName": queueName, "msgVpnName": msgVpnName}),
+                          depends_on= (queue_key,),
+                          undo= partial(_delete_created, manager, f"{queue_path}/subscriptions/{_quote(subscriptionTopic)}")))
+
+    return steps
+
+
+def teardown_steps(manager, msgVpnName:str, queueName:str, restDeliveryPointName:str,
+                   restConsumerName:str|None= None, subscriptionTopic:str|None= None,
+                   delete_queue:bool= True, delete_rest_delivery_point:bool= True)->list:
+    """Steps undoing what setup_steps() created. Client usernames and profiles are left as they are,
+    since other clients of the message VPN usually rely on them."""
+
+    vpn_path= f"/msgVpns/{_quote(msgVpnName)}"
+    queue_path= f"{vpn_path}/queues/{_quote(queueName)}"
+    rdp_path= f"{vpn_path}/restDeliveryPoints/{_quote(restDeliveryPointName)}"
+
+    binding_key= ("queueBinding", msgVpnName, restDeliveryPointName, queueName)
+    consumer_key= ("restConsumer", msgVpnName, restDeliveryPointName, restConsumerName)
+    subscription_key= ("subscription", msgVpnName, queueName, subscriptionTopic)
+
+    steps= [Step(binding_key, partial(_delete_if_exists, manager, f"{rdp_path}/queueBindings/{_quote(queueName)}", "queueBindingName"))]
+
+    if restConsumerName != None:
+        steps.append(Step(consumer_key,
+                          partial(_delete_if_exists, manager, f"{rdp_path}/restConsumers/{_quote(restConsumerName)}", "restConsumerName"),
+                          depends_on= (binding_key,)))
+
+    if subscriptionTopic != None and not delete_queue: #deleting the queue removes its subscriptions
+        steps.append(Step(subscription_key,
+                          partial(_delete_if_exists, manager, f"{queue_path}/subscriptions/{_quote(subscriptionTopic)}", "subscriptionTopic")))
+
+    if delete_rest_delivery_point:
+        steps.append(Step(("restDeliveryPoint", msgVpnName, restDeliveryPointName),
+                          partial(_delete_if_exists, manager, rdp_path, "restDeliveryPointName"),
+                          depends_on= (binding_key, consumer_key)))
+
+    if delete_queue:
+        steps.append(Step(("queue", msgVpnName, queueName),
+                          partial(_delete_if_exists, manager, queue_path, "queueName"),
+                          depends_on= (binding_key,)))
+
+    return steps
@@ -0,0 +1,102 @@
+"""Bounded ring buffer of deliveries handled by the consumer.
+
+Keeps the last 'capacity' deliveries (event, response status, response body) in a preallocated list.
+When it is full the oldest entry is overwritten. Entries can be drained with an iterator while the consumer runs,
+without any locking in user code.
+"""
+from threading import Condition
+from typing import Iterator
+import time
+
+
+class DeliveryRecord:
+    """A delivery and the response it got."""
+
+    __slots__ = ("timestamp", "event", "status_code", "response", "seconds")
+
+    def __init__(self, timestamp:float, event, status_code:int, response, seconds:float):
+        self.timestamp= timestamp      #time.time() when the response was sent
+        self.event= event              #ConsumerEvent
+        self.status_code= status_code
+        self.response= response        #response body as sent (str or bytes)
+        self.seconds= seconds          #time between receiving the delivery and sending the response
+
+    def __repr__(self):
+        return f"DeliveryRecord(path={self.event.path!r}, status_code={self.status_code}, seconds={self.seconds:.6f})"
+
+
+class RingBuffer:
+    """Thread safe, fixed size, overwrite-on-full buffer."""
+
+    def __init__(self, capacity:int):
+        """
+        Args:
+            capacity (int): Number of entries kept. Older entries are overwritten once it is full.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+
+        self.capacity= capacity
+        self._slots= [None]*capacity
+        self._written= 0  #total number of entries appended
+        self._read= 0     #total number of entries drained or overwritten before being drained
+        self.dropped= 0   #entries overwritten before they were drained
+        self._cleared= 0  #value of _written at the last clear()
+        self._condition= Condition()
+
+    def __len__(self):
+        """Number of entries not drained yet."""
+        return self._written - self._read
+
+    def append(self, item)->None:
+        with self._condition:
+            self._slots[self._written % self.capacity]= item
+            self._written += 1
+            if self._written - self._read > self.capacity:
+                self._read += 1
+                self.dropped += 1
+            self._condition.notify_all()
+
+    def snapshot(self)->list:
+        """The entries currently in the buffer, oldest first, without draining them."""
+        with self._condition:
+            start= max(self._cleared, self._written - self.capacity)
+            return [self._slots[index % self.capacity] for index in range(start, self._written)]
+
+    def drain(self, block:bool= False, timeout:float|None= None)->Iterator:
+        """Iterate over the entries not drained yet, oldest first. Each entry is returned by drain() only once.
+
+        Args:
+            block (bool, optional): Keep waiting for new entries instead of stopping once the buffer is drained. Defaults to False.
+            timeout (float | None, optional): With block, stop after waiting this many seconds without a new entry.
+                                              Defaults to None (wait forever).
+        """
+        while True:
+            with self._condition:
+                if self._read == self._written:
+                    if not block:
+                        return
+                    if not self._condition.wait_for(lambda: self._read != self._written, timeout):
+                        return
+
+                batch= [self._slots[index % self.capacity] for index in range(self._read, self._written)]
+                self._read= self._written
+
+            yield from batch
+
+    def clear(self)->None:
+        with self._condition:
+            self._slots= [None]*self.capacity
+            self._read= self._written
+            self._cleared= self._written
+
+
+def record_delivery(buffer:RingBuffer, event, status_code:int, response, received_at:float)->None:
+    """Append a DeliveryRecord for a delivery whose response was just sent.
+
+    Args:
+        received_at (float): time.perf_counter() value when the delivery was received.
+    """
+    if isinstance(response, (memoryview, bytearray)):
+        response= bytes(response) #the callback might reuse its buffer
+    buffer.append(DeliveryRecord(time.time(), event, status_code, response, time.perf_counter() - received_at))
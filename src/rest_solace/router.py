@@ -0,0 +1,191 @@
+"""Path based routing for the consumer server.
+
+Lets a single consumer serve several queue bindings (each created with its own 'postRequestTarget')
+by dispatching deliveries to a different handler per path.
+"""
+from contextlib import nullcontext
+from threading import BoundedSemaphore
+from typing import Callable
+
+
+ROUTE_MATCH_TYPES = ("exact", "prefix")
+
+
+class Route:
+    """A registered path along with its handler and concurrency limit."""
+
+    __slots__ = ("path", "handler", "match", "max_concurrency", "limiter")
+
+    def __init__(self, path:str, handler:Callable, match:str= "exact", max_concurrency:int|None= None):
+        self.path= path
+        self.handler= handler
+        self.match= match
+        self.max_concurrency= max_concurrency
+        #Limits how many deliveries for this route run the handler at the same time.
+        self.limiter= BoundedSemaphore(max_concurrency) if max_concurrency else nullcontext()
+
+    def __repr__(self):
+        return f"Route(path={self.path!r}, match={self.match!r}, max_concurrency={self.max_concurrency})"
+
+
+class _ParamNode:
+    __slots__ = ("static", "param_name", "param_child", "route")
+
+    def __init__(self):
+        self.static= dict()     #segment -> _ParamNode
+        self.param_name= None
+        self.param_child= None  #node used for a '{name}' segment
+        self.route= None
+
+
+def _split_path(path:str)->list:
+    return [segment for segment in path.split("/") if segment]
+
+
+def _is_param(segment:str)->bool:
+    return segment.startswith("{") and segment.endswith("}")
+
+
+class Router:
+    """Maps request paths to handlers.
+
+    Three kinds of routes can be registered:
+        1) exact: "/orders" only matches "/orders" (and "/orders/").
+        2) prefix: "/audit" with match="prefix" matches "/audit", "/audit/eu" and "/audit/eu/fr". The longest prefix wins.
+        3) parameterized: "/orders/{region}/{order_id}" matches "/orders/eu/42" and gives the handler
+           {"region": "eu", "order_id": "42"} in event.path_params.
+
+    Exact routes are checked first, then parameterized routes, then prefix routes.
+    The query string of a request path is ignored while matching.
+    Lookups only use dicts keyed by path or path segment, so their cost does not depend on the number of routes.
+    """
+
+    def __init__(self):
+        self.routes= list()
+        self._compiled= False
+        self._exact= dict()
+        self._prefix= dict()
+        self._params= _ParamNode()
+
+    def __len__(self):
+        return len(self.routes)
+
+    def add_route(self, path:str, handler:Callable, match:str= "exact", max_concurrency:int|None= None)->Route:
+        """Register a handler for a path.
+
+        Args:
+            path (str): Path to match. Segments written as '{name}' match any single segment (parameterized route).
+            handler (Callable): Function called as handler(event, kill_function), same as the consumer callback_function.
+            match (str, optional): Either "exact" or "prefix". Ignored for parameterized paths. Defaults to "exact".
+            max_concurrency (int | None, optional): Maximum number of deliveries handled at the same time for this route.
+                                                    Others wait for a free slot. Defaults to None (no limit).
+
+        Raises:
+            ValueError: Invalid match type, or a prefix route with path parameters.
+
+        Returns:
+            Route: The registered route.
+        """
+        if match not in ROUTE_MATCH_TYPES:
+            raise ValueError(f"match must be one of {ROUTE_MATCH_TYPES}, got '{match}'.")
+
+        segments= _split_path(path)
+        has_params= any(_is_param(segment) for segment in segments)
+
+        if has_params and match == "prefix":
+            raise ValueError("Prefix routes can not contain path parameters.")
+
+        route= Route(path, handler, match= "param" if has_params else match, max_concurrency= max_concurrency)
+        self.routes.append(route)
+        self._compiled= False
+        return route
+
+    def route(self, path:str, match:str= "exact", max_concurrency:int|None= None)->Callable:
+        """Decorator version of add_route()."""
+        def decorator(handler:Callable)->Callable:
+            self.add_route(path, handler, match= match, max_concurrency= max_concurrency)
+            return handler
+        return decorator
+
+    def compile(self)->None:
+        """Build the lookup tables. Called automatically on the first lookup after routes change."""
+        exact, prefix, params= dict(), dict(), _ParamNode()
+
+        for route in self.routes:
+            segments= _split_path(route.path)
+            key= "/" + "/".join(segments)
+
+            if route.match == "exact":
+                exact[key]= route
+
+            elif route.match == "prefix":
+                prefix[key]= route
+
+            else:
+                node= params
+                for segment in segments:
+                    if _is_param(segment):
+                        name= segment[1:-1]
+                        if node.param_child is None:
+                            node.param_child= _ParamNode()
+                            node.param_name= name
+                        elif node.param_name != name:
+                            raise ValueError(f"Conflicting parameter names '{node.param_name}' and '{name}' in route '{route.path}'.")
+                        node= node.param_child
+                    else:
+                        node= node.static.setdefault(segment, _ParamNode())
+                node.route= route
+
+        self._exact, self._prefix, self._params= exact, prefix, params
+        self._compiled= True
+
+    def resolve(self, path:str)->tuple:
+        """Find the route for a request path.
+
+        Returns:
+            tuple: (Route, dict of path parameters), or (None, None) if no route matches.
+        """
+        if not self._compiled:
+            self.compile()
+
+        path= path.split("?", 1)[0]
+        segments= _split_path(path)
+        key= "/" + "/".join(segments)
+
+        route= self._exact.get(key)
+        if route is not None:
+            return route, dict()
+
+        found= self._match_params(self._params, segments, 0, dict())
+        if found is not None:
+            return found
+
+        if self._prefix:
+            for end in range(len(segments), -1, -1):
+                route= self._prefix.get("/" + "/".join(segments[:end]))
+                if route is not None:
+                    return route, dict()
+
+        return None, None
+
+    def _match_params(self, node:_ParamNode, segments:list, index:int, values:dict):
+        if index == len(segments):
+            return (node.route, dict(values)) if node.route is not None else None
+
+        segment= segments[index]
+
+        #static segments take priority over parameters
+        child= node.static.get(segment)
+        if child is not None:
+            found= self._match_params(child, segments, index + 1, values)
+            if found is not None:
+                return found
+
+        if node.param_child is not None:
+            values[node.param_name]= segment
+            found= self._match_params(node.param_child, segments, index + 1, values)
+            del values[node.param_name]
+            if found is not None:
+                return found
+
+        return None
@@ -0,0 +1,120 @@
+"""Read-through cache of SEMP objects for Manager.
+
+Objects fetched by name (get_object(), the lookup/exists helpers, get_message_vpn_info()...) are kept for a TTL
+that depends on their type. Writes made through the same Manager (create, update, replace, delete...) drop the
+cached copies of the object they touch and of everything below it, so a Manager never reads back its own stale data.
+"""
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import unquote, urlsplit
+import time
+
+
+def object_type(object_path:str)->str:
+    """Type of the object at a path: the name of its collection, for example "queues" for "/msgVpns/default/queues/q1"."""
+    parts= object_path.strip("/").split("/")
+    return parts[-2] if len(parts) >= 2 else parts[0]
+
+
+def normalize_path(object_path:str)->str:
+    """Path without query string and with the names url decoded, so encoded and plain paths compare equal."""
+    return unquote(urlsplit(object_path).path).rstrip("/")
+
+
+class SempCache:
+    """Bounded LRU + TTL cache, keyed by object path and request variant (select, opaquePassword...).
+    Pass it as 'cache' to Manager()."""
+
+    def __init__(self, ttl_seconds:float= 30, type_ttls:dict|None= None, max_entries:int= 10_000):
+        """
+        Args:
+            ttl_seconds (float, optional): How long an object is kept when its type has no TTL of its own. Defaults to 30.
+            type_ttls (dict | None, optional): TTL per object type, keyed by collection name,
+                                               for example {"msgVpns": 300, "clientProfiles": 300, "queues": 10}.
+                                               A TTL of 0 disables caching for the type. Defaults to None.
+            max_entries (int, optional): Maximum number of cached responses. The least recently used are dropped first.
+                                         Defaults to 10_000.
+        """
+        self.ttl_seconds= ttl_seconds
+        self.type_ttls= dict(type_ttls or dict())
+        self.max_entries= max_entries
+
+        self._lock= Lock()
+        self._entries= OrderedDict() #(path, variant) -> (expiry, value), least recently used first
+
+        self.hits= 0
+        self.misses= 0
+        self.invalidations= 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl_for(self, object_path:str)->float:
+        return self.type_ttls.get(object_type(object_path), self.ttl_seconds)
+
+    def get(self, object_path:str, variant= None)->tuple:
+        """
+        Returns:
+            tuple: (True, cached value) on a hit, else (False, None).
+        """
+        key= (normalize_path(object_path), variant)
+        now= time.monotonic()
+
+        with self._lock:
+            entry= self._entries.get(key)
+
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+
+            self.misses += 1
+            return False, None
+
+    def put(self, object_path:str, variant, value)->None:
+        """Cache a value. None is a valid value (the object does not exist)."""
+        ttl= self.ttl_for(object_path)
+        if ttl <= 0:
+            return
+
+        key= (normalize_path(object_path), variant)
+
+        with self._lock:
+            self._entries[key]= (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last= False)
+
+    def invalidate(self, object_path:str)->int:
+        """Drop the cached copies of an object and of everything below it.
+
+        Args:
+            object_path (str): Path of the object, or of a collection (creating an object invalidates its collection).
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        path= normalize_path(object_path)
+        prefix= path + "/"
+
+        with self._lock:
+            stale= [key for key in self._entries if key[0] == path or key[0].startswith(prefix)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+        return len(stale)
+
+    def clear(self)->None:
+        with self._lock:
+            self._entries= OrderedDict()
+
+    def stats(self)->dict:
+        with self._lock:
+            lookups= self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": self.hits/lookups if lookups else 0.0, "invalidations": self.invalidations}
@@ -0,0 +1,230 @@
+"""Solace topic subscription matching.
+
+Follows the Solace wildcard rules (https://docs.solace.com/Messaging/Wildcard-Charaters-Topic-Subs.htm):
+    * Topic levels are separated by '/'.
+    * '*' at the end of a level matches zero or more characters in that level ('*' alone matches any single level,
+      'ord*' matches 'orders' and 'ord'). A '*' anywhere else in a level is a literal character.
+    * '>' as the last level matches one or more levels. A '>' anywhere else is a literal character.
+"""
+from typing import Callable, Any
+from .response import is_response
+
+
+class _TopicNode:
+    __slots__ = ("literal", "prefix", "gt_values", "values")
+
+    def __init__(self):
+        self.literal= None      #level -> _TopicNode
+        self.prefix= None       #level prefix (without '*') -> _TopicNode. '*' alone is the empty prefix.
+        self.gt_values= None    #values of patterns ending with '>' at this point
+        self.values= None       #values of patterns ending at this node
+
+    def is_empty(self)->bool:
+        return not (self.literal or self.prefix or self.gt_values or self.values)
+
+
+class TopicMatcher:
+    """Trie of Solace topic subscriptions mapped to values (usually handler functions).
+
+    Matching a topic only walks the trie one level at a time, so its cost depends on the depth of the topic
+    (and the wildcards actually present on that path), not on the number of subscriptions.
+    Can be used on its own, or as a consumer callback through dispatch().
+
+    Example:
+        matcher = TopicMatcher()
+        matcher.add("orders/*/created", handle_created)
+        matcher.add("orders/eu/>", handle_eu)
+        matcher.match("orders/eu/created")  # [handle_created, handle_eu]
+    """
+
+    def __init__(self, default_handler:Callable|None= None):
+        """
+        Args:
+            default_handler (Callable | None, optional): Handler used by dispatch() when no subscription matches the topic.
+                                                         Defaults to None.
+        """
+        self._root= _TopicNode()
+        self._count= 0
+        self.default_handler= default_handler
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, pattern:str)->bool:
+        node, kind= self._find(pattern)
+        if node is None:
+            return False
+        return bool(node.gt_values if kind == ">" else node.values)
+
+    def add(self, pattern:str, value:Any)->None:
+        """Register a value (usually a handler function) for a topic subscription pattern.
+        The same pattern can hold several values.
+
+        Raises:
+            ValueError: Empty pattern.
+        """
+        if not pattern:
+            raise ValueError("Topic pattern can not be empty.")
+
+        levels= pattern.split("/")
+        node= self._root
+
+        for index, level in enumerate(levels):
+            if level == ">" and index == len(levels) - 1:
+                if node.gt_values is None:
+                    node.gt_values= list()
+                node.gt_values.append(value)
+                self._count += 1
+                return
+
+            if level.endswith("*"):
+                if node.prefix is None:
+                    node.prefix= dict()
+                node= node.prefix.setdefault(level[:-1], _TopicNode())
+            else:
+                if node.literal is None:
+                    node.literal= dict()
+                node= node.literal.setdefault(level, _TopicNode())
+
+        if node.values is None:
+            node.values= list()
+        node.values.append(value)
+        self._count += 1
+
+    def subscribe(self, pattern:str)->Callable:
+        """Decorator version of add()."""
+        def decorator(handler:Callable)->Callable:
+            self.add(pattern, handler)
+            return handler
+        return decorator
+
+    def remove(self, pattern:str, value:Any= None)->int:
+        """Remove a value from a pattern, or every value of the pattern if value is None.
+
+        Returns:
+            int: Number of values removed.
+        """
+        path= list()
+        node= self._root
+        levels= pattern.split("/")
+
+        for index, level in enumerate(levels):
+            if level == ">" and index == len(levels) - 1:
+                removed= self._remove_values(node, "gt_values", value)
+                self._prune(path, node)
+                return removed
+
+            table_name, key= ("prefix", level[:-1]) if level.endswith("*") else ("literal", level)
+            table= getattr(node, table_name)
+            if not table or key not in table:
+                return 0
+            path.append((node, table_name, key))
+            node= table[key]
+
+        removed= self._remove_values(node, "values", value)
+        self._prune(path, node)
+        return removed
+
+    def match(self, topic:str)->list:
+        """Get the values of every subscription matching a topic.
+
+        Args:
+            topic (str): A published topic (without wildcards).
+
+        Returns:
+            list: Matching values. A value registered on several matching patterns is returned once for each.
+        """
+        matches= list()
+        self._match(self._root, topic.split("/"), 0, matches)
+        return matches
+
+    def matches(self, topic:str)->bool:
+        """True if at least one subscription matches the topic."""
+        return bool(self.match(topic))
+
+    def dispatch(self, event, kill_function:Callable):
+        """Consumer callback that calls every handler subscribed to the topic of the delivery (Solace-Topic header).
+        Pass it as callback_function to Consumer.startConsumer() or as a route handler.
+
+        Returns:
+            The first response (str, bytes, tuple or ConsumerResponse) returned by a handler, else None.
+        """
+        topic= event.topic if hasattr(event, "topic") else event["headers"].get("Solace-Topic")
+        handlers= self.match(topic) if topic else list()
+
+        if not handlers and self.default_handler is not None:
+            handlers= [self.default_handler]
+
+        response= None
+        for handler in handlers:
+            output= handler(event= event, kill_function= kill_function)
+            if response is None and is_response(output):
+                response= output
+
+        return response
+
+    def _match(self, node:_TopicNode, levels:list, index:int, matches:list)->None:
+        #walk literal levels iteratively, only branching when the node has wildcards
+        while True:
+            if node.gt_values is not None and index < len(levels):
+                matches.extend(node.gt_values)
+
+            if index == len(levels):
+                if node.values is not None:
+                    matches.extend(node.values)
+                return
+
+            level= levels[index]
+
+            if node.prefix is not None:
+                prefix= node.prefix
+                for end in range(len(level) + 1):
+                    child= prefix.get(level[:end])
+                    if child is not None:
+                        self._match(child, levels, index + 1, matches)
+
+            if node.literal is None:
+                return
+            node= node.literal.get(level)
+            if node is None:
+                return
+            index += 1
+
+    def _find(self, pattern:str)->tuple:
+        node= self._root
+        levels= pattern.split("/")
+        for index, level in enumerate(levels):
+            if level == ">" and index == len(levels) - 1:
+                return node, ">"
+            table, key= (node.prefix, level[:-1]) if level.endswith("*") else (node.literal, level)
+            if not table or key not in table:
+                return None, None
+            node= table[key]
+        return node, ""
+
+    def _remove_values(self, node:_TopicNode, attribute:str, value:Any)->int:
+        values= getattr(node, attribute)
+        if not values:
+            return 0
+
+        if value is None:
+            removed= len(values)
+            setattr(node, attribute, None)
+        else:
+            remaining= [item for item in values if item != value]
+            removed= len(values) - len(remaining)
+            setattr(node, attribute, remaining or None)
+
+        self._count -= removed
+        return removed
+
+    def _prune(self, path:list, node:_TopicNode)->None:
+        #delete nodes that no longer lead to any subscription
+        for parent, table_name, key in reversed(path):
+            if not node.is_empty():
+                return
+            table= getattr(parent, table_name)
+            del table[key]
+            if not table:
+                setattr(parent, table_name, None)
+            node= parent
@@ -0,0 +1,101 @@
+"""Offline tests of rest_solace.dag (step ordering, skip on failure, rollback)
+and of the teardown steps built from it. Run with pytest.
+"""
+import threading
+import time
+
+from rest_solace import rest_setup
+from rest_solace.dag import Step, merge_steps, run_steps
+
+
+def test_dependencies_run_first():
+    order= list()
+    steps= [Step("c", lambda: order.append("c"), depends_on= ("b",)),
+            Step("b", lambda: order.append("b"), depends_on= ("a",)),
+            Step("a", lambda: order.append("a"))]
+
+    result= run_steps(steps, workers= 4)
+
+    assert order == ["a", "b", "c"]
+    assert list(result["completed"]) == ["a", "b", "c"]
+    assert result["failed"] == {} and result["skipped"] == []
+
+
+def test_failure_skips_dependents_only():
+    def fail():
+        raise RuntimeError("boom")
+
+    steps= [Step("a", fail),
+            Step("b", lambda: 1, depends_on= ("a",)),
+            Step("c", lambda: 2, depends_on= ("b",)),
+            Step("d", lambda: 3)]
+
+    result= run_steps(steps)
+
+    assert list(result["failed"]) == ["a"]
+    assert sorted(result["skipped"]) == ["b", "c"]
+    assert result["completed"] == {"d": 3}
+    assert "rolled_back" not in result
+
+
+def test_rollback_undoes_in_reverse_dependency_order():
+    undone= list()
+    release= threading.Event()
+
+    def fail():
+        release.wait(1)
+        raise RuntimeError("boom")
+
+    steps= [Step("a", lambda: "A", undo= lambda result: undone.append(("a", result))),
+            Step("b", lambda: "B", depends_on= ("a",), undo= lambda result: undone.append(("b", result))),
+            Step("c", lambda: release.set(), depends_on= ("b",)), #no undo
+            Step("x", fail)]
+
+    result= run_steps(steps, workers= 4, rollback= True)
+
+    assert list(result["failed"]) == ["x"]
+    assert undone == [("b", "B"), ("a", "A")]
+    assert result["rolled_back"] == ["b", "a"]
+    assert result["rollback_failed"] == {}
+
+
+def test_duplicate_keys_and_cycles_are_rejected():
+    for steps in ([Step("a", int), Step("a", int)],
+                  [Step("a", int, depends_on= ("b",)), Step("b", int, depends_on= ("a",))]):
+        try:
+            run_steps(steps)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected ValueError")
+
+
+def test_merge_steps_unions_dependencies():
+    merged= merge_steps([Step("rdp", int, depends_on= ("binding1",)),
+                         Step("rdp", float, depends_on= ("binding2", "binding1"))])
+
+    assert len(merged) == 1
+    assert merged[0].function is int
+    assert merged[0].depends_on == ("binding1", "binding2")
+
+
+def test_shared_rdp_is_deleted_after_every_binding(monkeypatch):
+    log= list()
+
+    def fake_delete_if_exists(manager, object_path, key_field):
+        if "/queueBindings/" in object_path:
+            time.sleep(0.05) #the RDP delete must still wait for this
+        log.append(object_path)
+        return True
+
+    monkeypatch.setattr(rest_setup, "_delete_if_exists", fake_delete_if_exists)
+
+    steps= merge_steps(step for queue in ("q1", "q2")
+                       for step in rest_setup.teardown_steps(None, "default", queue, "rdp", restConsumerName= "c"))
+    result= run_steps(steps, workers= 8)
+
+    assert result["failed"] == {}
+    rdp_position= log.index("/msgVpns/default/restDeliveryPoints/rdp")
+    for queue in ("q1", "q2"):
+        assert log.index(f"/msgVpns/default/restDeliveryPoints/rdp/queueBindings/{queue}") < rdp_position
+    assert log.index("/msgVpns/default/restDeliveryPoints/rdp/restConsumers/c") < rdp_position
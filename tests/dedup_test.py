@@ -0,0 +1,82 @@
+"""Offline tests of rest_solace.DuplicateCache. Run with pytest."""
+import time
+
+from rest_solace import DuplicateCache
+
+
+def event(message_id:str)->dict:
+    return {"headers": {"Solace-Message-ID": message_id}}
+
+
+def test_recorded_keys_are_duplicates():
+    cache= DuplicateCache()
+    key= cache.key_for(event("id-1"))
+
+    assert cache.lookup(key) == (False, None)
+    cache.record(key, response= b"done")
+    assert cache.lookup(key) == (True, b"done")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_events_without_key_are_never_duplicates():
+    cache= DuplicateCache()
+    assert cache.key_for({"headers": {}}) is None
+    assert cache.key_for(event("a")) != cache.key_for(event("b"))
+
+
+def test_least_recently_used_key_is_evicted():
+    cache= DuplicateCache(max_entries= 3)
+    keys= [cache.key_for(event(str(number))) for number in range(4)]
+    for key in keys[:3]:
+        cache.record(key)
+
+    cache.lookup(keys[0]) #keys[1] is now the least recently used
+    cache.record(keys[3])
+
+    assert len(cache) == 3
+    assert cache.lookup(keys[1]) == (False, None)
+    assert cache.lookup(keys[0])[0] and cache.lookup(keys[2])[0] and cache.lookup(keys[3])[0]
+
+
+def test_default_response_is_not_stored_again():
+    cache= DuplicateCache()
+    key= cache.key_for(event("id"))
+    cache.record(key, response= b"first")
+    cache.record(key)
+
+    assert cache.lookup(key) == (True, None)
+
+
+def test_expired_keys_are_forgotten():
+    cache= DuplicateCache(ttl_seconds= -1)
+    key= cache.key_for(event("id"))
+    cache.record(key)
+
+    assert cache.lookup(key) == (False, None)
+    assert len(cache) == 0
+
+
+def test_keys_survive_a_restart(tmp_path):
+    path= str(tmp_path / "handled.db")
+    cache= DuplicateCache(persist_path= path)
+    key= cache.key_for(event("id"))
+    cache.record(key, response= b"kept")
+    cache.close()
+
+    reopened= DuplicateCache(persist_path= path)
+    assert len(reopened) == 0
+    assert reopened.lookup(key) == (True, b"kept")
+    reopened.close()
+
+
+def test_eviction_stays_fast_when_full():
+    cache= DuplicateCache(max_entries= 100_000)
+    for key in range(100_000):
+        cache.record(key)
+
+    start= time.perf_counter()
+    for key in range(100_000, 150_000):
+        cache.record(key)
+
+    assert len(cache) == 100_000
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,101 @@
+"""Offline tests of rest_solace.Inventory. Run with pytest."""
+from array import array
+
+from rest_solace import Inventory
+
+
+QUEUES= [{"queueName": "q1", "accessType": "exclusive", "egressEnabled": True, "maxMsgSpoolUsage": 5000},
+         {"queueName": "q2", "accessType": "non-exclusive", "egressEnabled": False, "maxMsgSpoolUsage": 1500},
+         {"queueName": "q3", "accessType": "exclusive", "egressEnabled": True}]
+
+
+def make_inventory()->Inventory:
+    inventory= Inventory(["queueName", "accessType", "egressEnabled", "maxMsgSpoolUsage"])
+    inventory.extend(QUEUES)
+    inventory.freeze()
+    return inventory
+
+
+def test_columns_are_typed_arrays():
+    inventory= make_inventory()
+
+    assert len(inventory) == 3
+    assert inventory.kind("accessType") == "str"
+    assert isinstance(inventory.column("accessType"), array)
+    assert list(inventory.column("accessType")) == [0, 1, 0]
+    assert inventory.categories("accessType") == ["exclusive", "non-exclusive"]
+
+    assert inventory.kind("egressEnabled") == "bool"
+    assert inventory.values("egressEnabled") == [True, False, True]
+
+    assert inventory.kind("maxMsgSpoolUsage") == "int"
+    assert inventory.values("maxMsgSpoolUsage") == [5000, 1500, None]
+    assert list(inventory.nulls("maxMsgSpoolUsage")) == [0, 0, 1]
+    assert inventory.nulls("egressEnabled") is None
+
+
+def test_rows_are_views():
+    inventory= make_inventory()
+
+    assert inventory[1]["queueName"] == "q2"
+    assert inventory[-1].as_dict() == {"queueName": "q3", "accessType": "exclusive",
+                                       "egressEnabled": True, "maxMsgSpoolUsage": None}
+    assert inventory[2].get("maxMsgSpoolUsage", 0) == 0
+    assert [row["queueName"] for row in inventory] == ["q1", "q2", "q3"]
+
+    try:
+        inventory[3]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("Expected IndexError")
+
+
+def test_filters_and_counts():
+    inventory= make_inventory()
+
+    assert inventory.rows_where("accessType", "exclusive") == [0, 2]
+    assert inventory.rows_where("accessType", "unknown") == []
+    assert inventory.rows_where("egressEnabled", False) == [1]
+    assert inventory.rows_where("maxMsgSpoolUsage", None) == [2]
+    assert inventory.value_counts("accessType") == {"exclusive": 2, "non-exclusive": 1}
+
+
+def test_rows_where_none_matches_missing_values_of_every_kind():
+    inventory= Inventory(["text", "number", "flag", "other"])
+    inventory.extend([{"text": "a", "number": 1, "flag": True, "other": [1]}, {}])
+
+    for field in inventory.fields:
+        assert inventory.rows_where(field, None) == [1]
+
+
+def test_columns_widen_when_types_change():
+    inventory= Inventory(["value"])
+    inventory.extend([{}, {"value": 1}, {"value": 2.5}])
+    assert inventory.kind("value") == "float"
+    assert inventory.values("value") == [None, 1.0, 2.5]
+
+    inventory.extend([{"value": "text"}])
+    assert inventory.kind("value") == "object"
+    assert inventory.values("value") == [None, 1.0, 2.5, "text"]
+
+    inventory= Inventory(["value"])
+    inventory.extend([{"value": 2**70}])
+    assert inventory.kind("value") == "object" and inventory.values("value") == [2**70]
+
+
+def test_repeated_strings_are_stored_once():
+    inventory= Inventory(["msgVpnName"])
+    inventory.extend({"msgVpnName": "".join(["def", "ault"])} for _ in range(1000))
+
+    assert inventory.categories("msgVpnName") == ["default"]
+    assert inventory.values("msgVpnName")[0] is inventory.values("msgVpnName")[999]
+
+
+def test_extend_after_freeze():
+    inventory= make_inventory()
+    inventory.extend([{"queueName": "q4", "accessType": "non-exclusive"}, {"queueName": "q5", "accessType": "exclusive"}])
+
+    assert inventory.values("queueName")[-2:] == ["q4", "q5"]
+    assert inventory.categories("accessType") == ["exclusive", "non-exclusive"]
+    assert inventory.rows_where("accessType", "non-exclusive") == [1, 3]
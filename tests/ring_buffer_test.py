@@ -0,0 +1,77 @@
+"""Offline tests of rest_solace.RingBuffer. Run with pytest."""
+import threading
+import time
+
+from rest_solace import RingBuffer
+
+
+def test_keeps_the_last_entries():
+    buffer= RingBuffer(3)
+    for number in range(5):
+        buffer.append(number)
+
+    assert buffer.snapshot() == [2, 3, 4]
+    assert len(buffer) == 3
+    assert buffer.dropped == 2
+
+
+def test_drain_returns_each_entry_once():
+    buffer= RingBuffer(10)
+    for number in range(4):
+        buffer.append(number)
+
+    assert list(buffer.drain()) == [0, 1, 2, 3]
+    assert list(buffer.drain()) == []
+    assert len(buffer) == 0
+    assert buffer.snapshot() == [0, 1, 2, 3] #snapshot does not depend on draining
+
+    buffer.append(4)
+    assert list(buffer.drain()) == [4]
+
+
+def test_overwritten_entries_are_not_drained():
+    buffer= RingBuffer(2)
+    buffer.append("a")
+    assert list(buffer.drain()) == ["a"]
+
+    for item in "bcd":
+        buffer.append(item)
+
+    assert list(buffer.drain()) == ["c", "d"]
+    assert buffer.dropped == 1
+
+
+def test_clear():
+    buffer= RingBuffer(3)
+    buffer.append(1)
+    buffer.clear()
+
+    assert buffer.snapshot() == []
+    assert list(buffer.drain()) == []
+    buffer.append(2)
+    assert buffer.snapshot() == [2]
+
+
+def test_blocking_drain_waits_for_new_entries():
+    buffer= RingBuffer(10)
+
+    def produce():
+        for number in range(3):
+            time.sleep(0.02)
+            buffer.append(number)
+
+    producer= threading.Thread(target= produce)
+    producer.start()
+    drained= list(buffer.drain(block= True, timeout= 0.5))
+    producer.join()
+
+    assert drained == [0, 1, 2]
+
+
+def test_invalid_capacity():
+    try:
+        RingBuffer(0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError")
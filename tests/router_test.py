@@ -0,0 +1,96 @@
+"""Offline tests of rest_solace.Router. Run with pytest."""
+from rest_solace import Router
+
+
+def handler(event, kill_function):
+    return None
+
+
+def test_exact_routes():
+    router= Router()
+    route= router.add_route("/orders", handler)
+
+    assert router.resolve("/orders") == (route, dict())
+    assert router.resolve("/orders/") == (route, dict())
+    assert router.resolve("/orders?x=1") == (route, dict())
+    assert router.resolve("/orders/eu") == (None, None)
+
+
+def test_path_parameters():
+    router= Router()
+    route= router.add_route("/orders/{region}/{order_id}", handler)
+
+    assert router.resolve("/orders/eu/42") == (route, {"region": "eu", "order_id": "42"})
+    assert router.resolve("/orders/eu") == (None, None)
+    assert router.resolve("/orders/eu/42/x") == (None, None)
+
+
+def test_static_segments_win_over_parameters():
+    router= Router()
+    param_route= router.add_route("/orders/{region}/summary", handler)
+    static_route= router.add_route("/orders/eu/{order_id}", handler)
+
+    assert router.resolve("/orders/eu/42") == (static_route, {"order_id": "42"})
+    #falls back to the parameter when the static branch does not lead to a route
+    assert router.resolve("/orders/eu/summary") == (static_route, {"order_id": "summary"})
+    assert router.resolve("/orders/us/summary") == (param_route, {"region": "us"})
+
+
+def test_longest_prefix_wins():
+    router= Router()
+    audit= router.add_route("/audit", handler, match= "prefix")
+    audit_eu= router.add_route("/audit/eu", handler, match= "prefix")
+
+    assert router.resolve("/audit")[0] is audit
+    assert router.resolve("/audit/us/x")[0] is audit
+    assert router.resolve("/audit/eu")[0] is audit_eu
+    assert router.resolve("/audit/eu/fr")[0] is audit_eu
+    assert router.resolve("/auditing") == (None, None)
+
+
+def test_exact_before_parameters_before_prefix():
+    router= Router()
+    prefix= router.add_route("/orders", handler, match= "prefix")
+    param= router.add_route("/orders/{region}", handler)
+    exact= router.add_route("/orders/new", handler)
+
+    assert router.resolve("/orders/new")[0] is exact
+    assert router.resolve("/orders/eu")[0] is param
+    assert router.resolve("/orders/eu/42")[0] is prefix
+
+
+def test_routes_added_after_a_lookup():
+    router= Router()
+    router.add_route("/a", handler)
+    router.resolve("/a")
+    route= router.add_route("/b", handler)
+
+    assert router.resolve("/b") == (route, dict())
+
+
+def test_invalid_routes():
+    router= Router()
+    for path, match in (("/orders", "regex"), ("/orders/{region}", "prefix")):
+        try:
+            router.add_route(path, handler, match= match)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected ValueError")
+
+    router.add_route("/orders/{region}", handler)
+    router.add_route("/orders/{country}/x", handler)
+    try:
+        router.compile()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for conflicting parameter names")
+
+
+def test_max_concurrency_limiter():
+    route= Router().add_route("/orders", handler, max_concurrency= 1)
+
+    assert route.limiter.acquire(blocking= False)
+    assert not route.limiter.acquire(blocking= False)
+    route.limiter.release()
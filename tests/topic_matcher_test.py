@@ -0,0 +1,98 @@
+"""Offline tests of rest_solace.TopicMatcher against the Solace wildcard rules. Run with pytest."""
+from rest_solace import TopicMatcher
+
+
+def matcher_of(*patterns)->TopicMatcher:
+    matcher= TopicMatcher()
+    for pattern in patterns:
+        matcher.add(pattern, pattern)
+    return matcher
+
+
+def test_literal_topics():
+    matcher= matcher_of("orders/eu/created")
+
+    assert matcher.match("orders/eu/created") == ["orders/eu/created"]
+    assert matcher.match("orders/eu") == []
+    assert matcher.match("orders/eu/created/x") == []
+
+
+def test_star_matches_exactly_one_level():
+    matcher= matcher_of("orders/*/created")
+
+    assert matcher.matches("orders/eu/created")
+    assert matcher.matches("orders/us/created")
+    assert not matcher.matches("orders/created")
+    assert not matcher.matches("orders/eu/fr/created")
+
+
+def test_prefix_star_matches_rest_of_level():
+    matcher= matcher_of("orders/ord*/x")
+
+    assert matcher.matches("orders/orders/x")
+    assert matcher.matches("orders/ord/x") #zero characters
+    assert not matcher.matches("orders/or/x")
+    assert not matcher.matches("orders/xord/x")
+
+
+def test_star_inside_a_level_is_literal():
+    matcher= matcher_of("a*b/c")
+
+    assert matcher.matches("a*b/c")
+    assert not matcher.matches("axb/c")
+
+
+def test_greater_than_matches_one_or_more_levels():
+    matcher= matcher_of("orders/>")
+
+    assert matcher.matches("orders/eu")
+    assert matcher.matches("orders/eu/created/today")
+    assert not matcher.matches("orders")
+
+
+def test_greater_than_not_last_is_literal():
+    matcher= matcher_of("a/>/b")
+
+    assert matcher.matches("a/>/b")
+    assert not matcher.matches("a/x/b")
+
+
+def test_every_matching_pattern_is_returned():
+    matcher= matcher_of("orders/*/created", "orders/eu/>", "orders/e*/created", "payments/>")
+
+    assert sorted(matcher.match("orders/eu/created")) == ["orders/*/created", "orders/e*/created", "orders/eu/>"]
+
+
+def test_remove_and_contains():
+    matcher= TopicMatcher()
+    matcher.add("orders/>", "a")
+    matcher.add("orders/>", "b")
+    matcher.add("orders/*", "c")
+
+    assert len(matcher) == 3 and "orders/>" in matcher
+    assert matcher.remove("orders/>", "a") == 1
+    assert matcher.match("orders/x") == ["b", "c"]
+    assert matcher.remove("orders/>") == 1
+    assert "orders/>" not in matcher
+    assert matcher.remove("missing/topic") == 0
+    assert len(matcher) == 1
+
+
+def test_dispatch_calls_every_handler():
+    calls= list()
+    matcher= TopicMatcher(default_handler= lambda event, kill_function: "default")
+
+    @matcher.subscribe("orders/>")
+    def first(event, kill_function):
+        calls.append("first")
+        return "from first"
+
+    @matcher.subscribe("orders/eu/*")
+    def second(event, kill_function):
+        calls.append("second")
+
+    event= {"headers": {"Solace-Topic": "orders/eu/created"}}
+    assert matcher.dispatch(event, None) == "from first"
+    assert sorted(calls) == ["first", "second"]
+
+    assert matcher.dispatch({"headers": {"Solace-Topic": "payments/x"}}, None) == "default"